@@ -0,0 +1,409 @@
+"""
+Analytics over past interviews: memory.db's message_store and the response logs.
+
+`ingest` only reads what is new since the last run: message_store rows past
+the stored high-water mark on id, and response log lines past each file's
+stored byte offset. Each JSON blob is parsed exactly once, into typed numpy
+columns appended to analytics/ as .npz segments. Queries load the columns
+(no JSON) and aggregate with numpy; group-bys are np.bincount over integer
+codes, so dashboards over a million turns answer well within a second.
+
+A candidate is a session: nothing else identifies who answered.
+
+    python analytics.py ingest
+    python analytics.py questions
+    python analytics.py sessions [--top 20]
+    python analytics.py weaknesses [--top 10]
+"""
+import os
+import re
+import json
+import sqlite3
+import argparse
+
+import numpy as np
+
+from local_feedback import assess
+from response_log import LOG_DIR
+
+ANALYTICS_DIR = "analytics"
+
+# One row per answered question, from the response logs
+TURNS = {
+    "session": np.int32,
+    "question": np.int32,
+    "answer_words": np.int32,
+    "speech_seconds": np.float32,
+    "wpm": np.float32,
+    "latency": np.float32,
+    "feedback_words": np.int32,
+    "coverage": np.float32,
+    "filler_rate": np.float32,
+    "trivial": np.bool_,
+}
+# One row per LLM reply stored in message_store
+CALLS = {
+    "session": np.int32,
+    "message_id": np.int64,
+    "feedback_words": np.int32,
+    "input_tokens": np.int32,
+    "output_tokens": np.int32,
+}
+# One row per expected key point an answer missed
+MISSED = {
+    "session": np.int32,
+    "question": np.int32,
+    "point": np.int32,
+}
+TABLES = {"turns": TURNS, "calls": CALLS, "missed": MISSED}
+
+SESSION_TIME = re.compile(r"session_(\d+)$")
+
+# Segments per table before they are merged into one
+MAX_SEGMENTS = 16
+
+
+def _grouped_mean(codes, values, groups):
+    valid = ~np.isnan(values)
+    counts = np.bincount(codes[valid], minlength=groups)
+    sums = np.bincount(codes[valid], weights=values[valid], minlength=groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def _grouped_percentiles(codes, values, groups, qs):
+    """Nearest-rank percentiles `qs` of `values` within each group, NaN for empty groups."""
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    counts = np.bincount(codes, minlength=groups)
+    results = [np.full(groups, np.nan) for _ in qs]
+    if not len(values):
+        return results
+    # One sort of a combined key orders by group and then by value, several times faster than lexsort
+    low = values.min()
+    span = values.max() - low + 1
+    keys = np.sort(codes * span + (values - low))
+    values = keys - np.repeat(np.arange(groups), counts) * span + low
+    starts = np.cumsum(counts) - counts
+    present = counts > 0
+    for result, q in zip(results, qs):
+        ranks = np.maximum(np.ceil(counts[present] * q).astype(np.int64) - 1, 0)
+        result[present] = values[starts[present] + ranks]
+    return results
+
+
+class Analytics:
+    """
+    Incrementally ingested columnar store of interview turns.
+
+    state.json records the high-water marks, the string dictionaries behind
+    the integer codes and the committed segments. It is replaced atomically
+    after new segments are written, so a crash mid-ingest leaves stray
+    segment files that are ignored and rebuilt, never duplicate rows.
+    """
+
+    def __init__(self, directory=ANALYTICS_DIR, db_path="memory.db", log_dir=LOG_DIR, key_points=None):
+        self.directory = directory
+        self.db_path = db_path
+        self.log_dir = log_dir
+        self._key_points = key_points
+        os.makedirs(directory, exist_ok=True)
+        self.state = self._load_state()
+        self._codes = {name: {value: code for code, value in enumerate(values)}
+                       for name, values in self.state["dictionaries"].items()}
+        self._tables = None
+        self._started = []
+
+    # --- storage ---
+
+    def _load_state(self):
+        path = os.path.join(self.directory, "state.json")
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        return {
+            "message_id": 0,
+            "logs": {},
+            "dictionaries": {"session": [], "question": [], "point": []},
+            "segments": {table: [] for table in TABLES},
+        }
+
+    def _save_state(self):
+        path = os.path.join(self.directory, "state.json")
+        with open(path + ".tmp", "w", encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(path + ".tmp", path)
+
+    def _code(self, dictionary, value):
+        codes = self._codes[dictionary]
+        if value not in codes:
+            codes[value] = len(codes)
+            self.state["dictionaries"][dictionary].append(value)
+        return codes[value]
+
+    def _write_segment(self, table, columns):
+        segments = self.state["segments"][table]
+        number = int(segments[-1].split(".")[0].split("_")[1]) + 1 if segments else 1
+        name = f"{table}_{number:06d}.npz"
+        np.savez(os.path.join(self.directory, name), **columns)
+        return name
+
+    def _read_segment(self, name):
+        with np.load(os.path.join(self.directory, name)) as data:
+            return {column: data[column] for column in data.files}
+
+    def _columns(self, table, rows):
+        return {column: np.array([row[i] for row in rows], dtype=dtype)
+                for i, (column, dtype) in enumerate(TABLES[table].items())}
+
+    def tables(self):
+        """Every table as a dict of numpy columns, loaded once and kept up to date by ingest()."""
+        if self._tables is None:
+            self._tables = {}
+            for table, dtypes in TABLES.items():
+                parts = [self._read_segment(name) for name in self.state["segments"][table]]
+                self._tables[table] = {
+                    column: np.concatenate([part[column] for part in parts]) if parts else np.empty(0, dtype)
+                    for column, dtype in dtypes.items()
+                }
+        return self._tables
+
+    def _compact(self, table):
+        segments = self.state["segments"][table]
+        if len(segments) <= MAX_SEGMENTS:
+            return
+        name = self._write_segment(table, self.tables()[table])
+        self.state["segments"][table] = [name]
+        self._save_state()
+        for old in segments:
+            os.remove(os.path.join(self.directory, old))
+
+    # --- ingestion ---
+
+    def key_points(self, question):
+        if self._key_points is None:
+            from question_bank import get_question_bank
+
+            self._key_points = get_question_bank().key_points
+        return self._key_points(question)
+
+    def _ingest_messages(self, calls, batch=10000):
+        if not os.path.exists(self.db_path):
+            return
+        # Read-only, so analytics never takes a write lock on the live history database
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            while True:
+                rows = conn.execute(
+                    "SELECT id, session_id, message FROM message_store WHERE id > ? ORDER BY id LIMIT ?",
+                    (self.state["message_id"], batch)
+                ).fetchall()
+                for row_id, session_id, message in rows:
+                    payload = json.loads(message)
+                    if payload.get("type") == "ai":
+                        data = payload["data"]
+                        usage = data.get("usage_metadata") or {}
+                        calls.append((
+                            self._code("session", session_id), row_id, len(str(data.get("content", "")).split()),
+                            usage.get("input_tokens", -1), usage.get("output_tokens", -1)
+                        ))
+                if len(rows) < batch:
+                    if rows:
+                        self.state["message_id"] = rows[-1][0]
+                    break
+                self.state["message_id"] = rows[-1][0]
+        except sqlite3.OperationalError as e:
+            # A database that has never held a conversation has no message_store yet
+            if "no such table" not in str(e):
+                raise
+        finally:
+            conn.close()
+
+    def _ingest_logs(self, turns, missed):
+        if not os.path.isdir(self.log_dir):
+            return
+        for filename in sorted(os.listdir(self.log_dir)):
+            if not filename.endswith(".jsonl"):
+                continue
+            path = os.path.join(self.log_dir, filename)
+            offset = self.state["logs"].get(filename, 0)
+            if os.path.getsize(path) <= offset:
+                continue
+            session = self._code("session", filename[:-len(".jsonl")])
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    # A line without its newline is still being written; pick it up next time
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    try:
+                        response = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._add_turn(session, response, turns, missed)
+            self.state["logs"][filename] = offset
+
+    def _add_turn(self, session, response, turns, missed):
+        question = self._code("question", response["question"])
+        speech_seconds = response.get("speech_seconds")
+        checks = assess(response.get("answer", ""), self.key_points(response["question"]), speech_seconds,
+                        question=response["question"])
+        latency = response.get("latency")
+        turns.append((
+            session, question, checks["words"],
+            speech_seconds if speech_seconds else np.nan,
+            checks["wpm"] if checks["wpm"] is not None else np.nan,
+            latency if latency is not None else np.nan,
+            len(response.get("feedback", "").split()),
+            checks["coverage"] if checks["coverage"] is not None else np.nan,
+            checks["filler_rate"], checks["trivial"],
+        ))
+        for point in checks["missed"]:
+            missed.append((session, question, self._code("point", point)))
+
+    def ingest(self):
+        """Pulls in new message_store rows and response log lines; returns how many rows each table gained."""
+        tables = self.tables()
+        turns, calls, missed = [], [], []
+        self._ingest_messages(calls)
+        self._ingest_logs(turns, missed)
+        added = {"turns": turns, "calls": calls, "missed": missed}
+        for table, rows in added.items():
+            if rows:
+                columns = self._columns(table, rows)
+                self.state["segments"][table].append(self._write_segment(table, columns))
+                tables[table] = {name: np.concatenate([tables[table][name], columns[name]]) for name in columns}
+        self._save_state()
+        for table in TABLES:
+            self._compact(table)
+        return {table: len(rows) for table, rows in added.items()}
+
+    # --- queries ---
+
+    def summary(self):
+        turns = self.tables()["turns"]
+        calls = self.tables()["calls"]
+        return {
+            "sessions": len(self.state["dictionaries"]["session"]),
+            "turns": len(turns["session"]),
+            "llm_replies": len(calls["session"]),
+            "mean_answer_words": float(turns["answer_words"].mean()) if len(turns["session"]) else None,
+            "mean_wpm": float(np.nanmean(turns["wpm"])) if np.isfinite(turns["wpm"]).any() else None,
+            "latency_p95": float(np.nanpercentile(turns["latency"], 95)) if np.isfinite(turns["latency"]).any() else None,
+            "trivial_share": float(turns["trivial"].mean()) if len(turns["session"]) else None,
+        }
+
+    def question_stats(self):
+        """Per question: answers, mean words, wpm and coverage, latency p50/p95 and the share of trivial answers."""
+        turns = self.tables()["turns"]
+        names = self.state["dictionaries"]["question"]
+        groups = len(names)
+        codes = turns["question"]
+        counts = np.bincount(codes, minlength=groups)
+        words = _grouped_mean(codes, turns["answer_words"].astype(np.float64), groups)
+        wpm = _grouped_mean(codes, turns["wpm"].astype(np.float64), groups)
+        coverage = _grouped_mean(codes, turns["coverage"].astype(np.float64), groups)
+        latency = turns["latency"].astype(np.float64)
+        p50, p95 = _grouped_percentiles(codes, latency, groups, (0.5, 0.95))
+        trivial = _grouped_mean(codes, turns["trivial"].astype(np.float64), groups)
+        words, wpm, coverage, p50, p95, trivial = (a.tolist() for a in (words, wpm, coverage, p50, p95, trivial))
+        return [
+            {"question": names[i], "answers": int(counts[i]), "mean_words": words[i], "mean_wpm": wpm[i],
+             "coverage": coverage[i], "latency_p50": p50[i], "latency_p95": p95[i], "trivial_share": trivial[i]}
+            for i in np.argsort(-counts, kind="stable") if counts[i]
+        ]
+
+    def session_stats(self, top=None):
+        """Per session (candidate), most recent first: answers, mean words, wpm, coverage, latency and LLM usage."""
+        tables = self.tables()
+        turns, calls = tables["turns"], tables["calls"]
+        names = self.state["dictionaries"]["session"]
+        groups = len(names)
+        codes = turns["session"]
+        counts = np.bincount(codes, minlength=groups)
+        words = _grouped_mean(codes, turns["answer_words"].astype(np.float64), groups)
+        wpm = _grouped_mean(codes, turns["wpm"].astype(np.float64), groups)
+        coverage = _grouped_mean(codes, turns["coverage"].astype(np.float64), groups)
+        latency = _grouped_mean(codes, turns["latency"].astype(np.float64), groups)
+        replies = np.bincount(calls["session"], minlength=groups)
+        tokens = np.bincount(calls["session"], weights=np.maximum(calls["output_tokens"], 0), minlength=groups)
+        started = self._session_starts()
+        # Sessions without a timestamp sort last
+        order = np.argsort(-np.nan_to_num(started, nan=-np.inf), kind="stable")[:top]
+        words, wpm, coverage, latency, started = (a.tolist() for a in (words, wpm, coverage, latency, started))
+        return [
+            {"session": names[i], "started": None if np.isnan(started[i]) else started[i], "answers": int(counts[i]),
+             "mean_words": words[i], "mean_wpm": wpm[i], "coverage": coverage[i], "mean_latency": latency[i],
+             "llm_replies": int(replies[i]), "output_tokens": int(tokens[i])}
+            for i in order
+        ]
+
+    def _session_starts(self):
+        # Parsed from the session ids once; the dictionary only ever grows
+        names = self.state["dictionaries"]["session"]
+        self._started.extend(float(m.group(1)) if (m := SESSION_TIME.search(name)) else np.nan
+                             for name in names[len(self._started):])
+        return np.array(self._started)
+
+    def weaknesses(self, top=10):
+        """
+        Expected key points candidates miss most. `recurring` counts sessions
+        that missed the same point more than once.
+        """
+        missed = self.tables()["missed"]
+        names = self.state["dictionaries"]["point"]
+        groups = len(names)
+        points = missed["point"].astype(np.int64)
+        misses = np.bincount(points, minlength=groups)
+        pairs, pair_counts = np.unique(missed["session"].astype(np.int64) * max(groups, 1) + points, return_counts=True)
+        pair_points = pairs % max(groups, 1)
+        sessions = np.bincount(pair_points, minlength=groups)
+        recurring = np.bincount(pair_points, weights=pair_counts > 1, minlength=groups).astype(np.int64)
+        order = np.lexsort((-misses, -recurring))[:top]
+        return [
+            {"key_point": names[i], "misses": int(misses[i]), "sessions": int(sessions[i]), "recurring": int(recurring[i])}
+            for i in order if misses[i]
+        ]
+
+
+def _fmt(value, digits=1):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "-"
+    return f"{value:.{digits}f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=["ingest", "questions", "sessions", "weaknesses"])
+    parser.add_argument("--top", type=int, default=None)
+    parser.add_argument("--db", default="memory.db")
+    parser.add_argument("--logs", default=LOG_DIR)
+    parser.add_argument("--dir", default=ANALYTICS_DIR)
+    args = parser.parse_args()
+
+    analytics = Analytics(args.dir, args.db, args.logs)
+    added = analytics.ingest()
+    if args.command == "ingest":
+        print(f"✅ Ingested {added['turns']} turns and {added['calls']} LLM replies")
+        print(f"📊 {analytics.summary()}")
+    elif args.command == "questions":
+        print(f"{'answers':>7} {'words':>6} {'wpm':>6} {'cover':>6} {'lat p50':>8} {'lat p95':>8} {'trivial':>8}  question")
+        for row in analytics.question_stats()[:args.top]:
+            print(f"{row['answers']:>7} {_fmt(row['mean_words']):>6} {_fmt(row['mean_wpm']):>6} "
+                  f"{_fmt(row['coverage'], 2):>6} {_fmt(row['latency_p50'], 2):>8} {_fmt(row['latency_p95'], 2):>8} "
+                  f"{_fmt(row['trivial_share'], 2):>8}  {row['question']}")
+    elif args.command == "sessions":
+        print(f"{'answers':>7} {'words':>6} {'wpm':>6} {'cover':>6} {'latency':>8} {'llm':>4} {'tokens':>7}  session")
+        for row in analytics.session_stats(args.top or 20):
+            print(f"{row['answers']:>7} {_fmt(row['mean_words']):>6} {_fmt(row['mean_wpm']):>6} "
+                  f"{_fmt(row['coverage'], 2):>6} {_fmt(row['mean_latency'], 2):>8} {row['llm_replies']:>4} "
+                  f"{row['output_tokens']:>7}  {row['session']}")
+    else:
+        print(f"{'misses':>6} {'sessions':>8} {'recurring':>9}  key point")
+        for row in analytics.weaknesses(args.top or 10):
+            print(f"{row['misses']:>6} {row['sessions']:>8} {row['recurring']:>9}  {row['key_point']}")
+
+
+if __name__ == "__main__":
+    main()
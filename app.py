@@ -1,26 +1,55 @@
 import os
-import json
-import pyttsx3
-import speech_recognition as sr
-
-from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+import time
+
+from audio_buffer import buffer_stats
+from tts_stream import speak_stream, format_metrics
+from feedback_cache import FeedbackCache
+import feedback_turn
+from local_feedback import LocalFeedback
+from question_bank import get_question_bank
+from question_audio import make_question_speaker
+from response_log import ResponseLog, export
+from tracing import span, set_session
+from warmup import Lazy
 from dotenv import load_dotenv
 
+# LangChain, the Gemini client, pyttsx3 and speech_recognition load lazily (the
+# slow ones in the background while the welcome prompt plays), so importing
+# this module opens no devices
+
 # Load environment variables
 load_dotenv()
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
 # Initialize TTS engine
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)
+def init_tts():
+    import pyttsx3
 
-# Initialize recognizer and mic
-recognizer = sr.Recognizer()
-mic = sr.Microphone()
+    engine = pyttsx3.init()
+    engine.setProperty('rate', 150)
+    return engine
 
-# LLM setup
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+tts_engine = Lazy(init_tts, "tts")
+
+# Initialize recognizer and mic. The mic stays open for the whole interview and
+# is calibrated for ambient noise once, then tracked in the background.
+def init_capture():
+    import speech_recognition as sr
+    from audio_capture import AudioCapture
+    from vad import Endpointer
+
+    # Answers end once the silence is longer than this candidate's usual pauses
+    return AudioCapture(sr.Recognizer(), sr.Microphone(), endpointer=Endpointer())
+
+capture = Lazy(init_capture, "mic")
+
+# Speech-to-text backend (STT_BACKEND=google|vosk|whisper)
+def init_stt():
+    from recognizers import get_backend
+
+    return get_backend()
+
+stt_backend = Lazy(init_stt, "stt")
 
 # Prompt template
 feedback_template = """
@@ -43,20 +72,40 @@ Guidelines:
 - End by clearly stating "Now for your next question:" followed by the exact text of the follow-up question, if there is no follow-up question conclude it key point to improve 
 """
 
-feedback_prompt = PromptTemplate(
-    input_variables=["question", "answer", "followup_question"],
-    template=feedback_template
+# LLM setup
+def init_chain():
+    from langchain.prompts import PromptTemplate
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from llm_client import FALLBACK_MODEL, ResilientLLM, local_fallback
+
+    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+    feedback_prompt = PromptTemplate(
+        input_variables=["question", "answer", "followup_question"],
+        template=feedback_template
+    )
+    # Resilient calls (see llm_client.py); the local tier skips the first-pass sentence already spoken
+    return ResilientLLM(
+        feedback_prompt | llm,
+        fallback=feedback_prompt | ChatGoogleGenerativeAI(model=FALLBACK_MODEL),
+        local_fallback=local_fallback(question_bank.key_points, first_pass_spoken=True),
+    )
+
+chain = Lazy(init_chain, "llm")
+
+# Reuse feedback for near-identical answers instead of calling the LLM again
+feedback_cache = FeedbackCache("feedback_cache.db")
+
+# Questions, with their expected key points, come from the shared question bank
+# (question_bank.json, imported into questions.db)
+question_bank = get_question_bank()
+questions = question_bank.questions("visa")
+
+# Trivial or unrecognized answers are answered locally; the rest get one local
+# sentence (filler words, speaking rate) while the LLM works on the full reply
+local_feedback = LocalFeedback(
+    key_points=question_bank.key_points,
+    speech_seconds=lambda: capture.get().last_speech_seconds if capture.ready else None
 )
-chain = feedback_prompt | llm
-
-questions = [
-    "Why did you choose this particular time to travel?",
-    "What is the purpose of getting visa?",
-    "Why are you traveling at this time?",
-    "Have you traveled abroad before?",
-    "Do you have travel insurance?",
-    "What do you do for a living in your home country?"
-]
 
 def clean_text(text):
     """Removes extra spaces, newlines, etc., so it's spoken in one smooth line."""
@@ -64,59 +113,88 @@ def clean_text(text):
 
 def speak(text):
     line = clean_text(text)
-    engine.say(line)
-    engine.runAndWait()
+    with span("tts.speak", chars=len(line)):
+        engine = tts_engine.get()
+        engine.say(line)
+        engine.runAndWait()
+
+# Fixed questions play from the pre-rendered audio bundle when it has been built
+speak_question = make_question_speaker(speak)
+
+def show_partial(text):
+    print(f"\r📝 {text}", end="", flush=True)
 
 def listen_to_answer():
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source)
-        print("🎙️ Listening...")
-        audio = recognizer.listen(source)
+    import speech_recognition as sr
 
     try:
-        response = recognizer.recognize_google(audio)
-        print(f"🗣️ You said: {response}")
+        print("🎙️ Listening...")
+        # Audio is transcribed chunk by chunk while the answer is still being spoken
+        response = capture.get().listen_streaming(stt_backend.get(), on_partial=show_partial)
+        print(f"\n🗣️ You said: {response}")
         return response
     except sr.UnknownValueError:
-        print("❌ Sorry, I couldn't understand you.")
+        print("\n❌ Sorry, I couldn't understand you.")
         return "[Unrecognized speech]"
     except sr.RequestError:
-        print("⚠️ Could not reach the speech service.")
+        print("\n⚠️ Could not reach the speech service.")
         return "[Speech service error]"
 
 def run_mock_interview():
-    responses = []
+    # Every turn is appended to responses/<session_id>.jsonl as soon as it completes
+    session_id = f"session_{int(time.time())}"
+    response_log = ResponseLog(session_id)
+    set_session(session_id)
     print("🤖 Starting your mock interview...")
+    # Load the LLM client, speech backend and microphone while the welcome prompt plays
+    for resource in (chain, stt_backend, capture):
+        resource.start()
     speak("Welcome to your mock interview. Let's begin.")
-    speak(questions[0])
-
-    for i, q in enumerate(questions):
-        print(f"\n🧠 Question: {q}")
-
-        answer = listen_to_answer()
-        next_question = questions[i + 1] if i + 1 < len(questions) else "No further questions."
+    speak_question(questions[0])
 
-        result = chain.invoke({
-            'question': q,
-            'answer': answer,
-            'followup_question': next_question
-        })
-
-        speak(result.content)
-
-        responses.append({
-            "question": q,
-            "answer": answer,
-            "feedback": result.content
-        })
-
-        # input("Press Enter for the next question...")
-
-    with open("interview_responses.json", "w", encoding='utf-8') as f:
-        json.dump(responses, f, indent=4)
+    try:
+        for i, q in enumerate(questions):
+            print(f"\n🧠 Question: {q}")
+
+            with span("turn.capture"):
+                answer = listen_to_answer()
+            next_question = questions[i + 1] if i + 1 < len(questions) else "No further questions."
+
+            # Stream the feedback so the first sentence is spoken while the rest generates
+            with span("turn.feedback"):
+                feedback, metrics = speak_stream(feedback_turn.stream_feedback(
+                    local_feedback, feedback_cache, q, answer, next_question,
+                    lambda: chain.get().stream({
+                        'question': q,
+                        'answer': answer,
+                        'followup_question': next_question
+                    })
+                ), speak)
+            print(format_metrics(metrics))
+
+            response_log.append({
+                "question": q,
+                "answer": answer,
+                "feedback": feedback,
+                "speech_seconds": capture.get().last_speech_seconds,
+                "latency": round(metrics["generation_time"], 3)
+            })
+
+            # input("Press Enter for the next question...")
+    finally:
+        if capture.ready:
+            capture.get().close()
+        response_log.close()
+    export(session_id, "interview_responses.json")
 
     speak("Thank you. This concludes your mock interview.")
+    print(f"📦 Feedback cache: {feedback_cache.stats()}")
+    print(f"⚡ Local feedback: {local_feedback.stats()}")
+    if chain.ready:
+        print(f"🛡️ LLM client: {chain.get().stats()}")
+    print(f"🎙️ Audio buffers: {buffer_stats()}")
     print("\n✅ Done! Your responses have been saved to 'interview_responses.json'.")
 
 # Start the mock interview
-run_mock_interview()
+if __name__ == "__main__":
+    run_mock_interview()
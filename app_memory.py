@@ -1,33 +1,79 @@
 # Import required libraries
 import os
-import json
+import sys
 import time
-import pyttsx3
-import speech_recognition as sr
+import asyncio
+from audio_buffer import buffer_stats
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.chat_message_histories import SQLChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
+from interview_engine import InterviewEngine
+from feedback_cache import FeedbackCache
+import feedback_turn
+from local_feedback import LocalFeedback
+from prompts import feedback_chain, feedback_inputs, turn_message
+from question_bank import get_question_bank, AdaptiveSelector
+from question_audio import make_question_speaker
+from response_log import ResponseLog
+from speculative import SpeculativeFeedback
+from tracing import span
+from warmup import Lazy
+
+# LangChain, the Gemini client, pyttsx3 and speech_recognition are imported
+# inside the factories below, so importing this module opens no devices and
+# the slow ones can load in the background while the welcome prompt plays
 
 # Load environment variables (for API keys)
 load_dotenv()
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
 # Initialize TTS engine
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)
+def init_tts():
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty('rate', 150)
+    return engine
+
+tts_engine = Lazy(init_tts, "tts")
 
 # Initialize speech recognition
-recognizer = sr.Recognizer()
-mic = sr.Microphone()
+def init_capture():
+    import speech_recognition as sr
+    from audio_capture import AudioCapture
+
+    from vad import Endpointer
+
+    recognizer = sr.Recognizer()
+
+    # Make the recognizer more responsive with these settings
+    recognizer.dynamic_energy_threshold = True
 
-# Initialize LLM
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+    # The mic stays open for the whole interview and is calibrated for ambient
+    # noise once, then tracked in the background between answers. Answers end
+    # once the silence is longer than this candidate's usual pauses (at most 2 seconds)
+    return AudioCapture(recognizer, sr.Microphone(), endpointer=Endpointer(max_pause=2))
+
+capture = Lazy(init_capture, "mic")
+
+# Speech-to-text backend (STT_BACKEND=google|vosk|whisper)
+def init_stt():
+    from recognizers import get_backend
+
+    return get_backend()
+
+stt_backend = Lazy(init_stt, "stt")
+
+# Chat history handler (one shared, indexed connection pool for memory.db).
+# Only the last few exchanges plus a rolling summary are replayed to the LLM.
+# prompts.py --check reads these two to simulate this app's prompts
+HISTORY_TURNS = 3
+HISTORY_TOKEN_BUDGET = 1200
 
-# Chat history handler
 def get_session_history(session_id):
-    return SQLChatMessageHistory(session_id, "sqlite:///memory.db")
+    from history_store import get_history_store
+    from history_window import WindowedChatHistory
+
+    return WindowedChatHistory(session_id, get_history_store("memory.db"),
+                               max_turns=HISTORY_TURNS, token_budget=HISTORY_TOKEN_BUDGET)
 
 # Define feedback template
 feedback_template = """
@@ -49,40 +95,60 @@ Example of good response style:
 "I like how you explained your experience with model deployment. Consider going into more detail about the specific metrics you used to evaluate performance. Now for your next question: How would you handle imbalanced data in a classification problem?"
 """
 
-# Set up the prompt and runnable
-feedback_prompt = ChatPromptTemplate.from_messages([
-    ("system", feedback_template),
-    MessagesPlaceholder(variable_name="history"),
-    ("human", "Question: {question}\nAnswer: {answer}\nNext question: {followup_question}")
-])
+# Set up the LLM, prompt and runnable
+def init_feedback_runnable():
+    from langchain_core.runnables.history import RunnableWithMessageHistory
+    from llm_client import FALLBACK_MODEL, ResilientLLM, local_fallback
 
-runnable = feedback_prompt | llm
+    def with_history(runnable):
+        return RunnableWithMessageHistory(
+            runnable,
+            get_session_history,
+            input_messages_key="input",
+            history_messages_key="history",
+        )
 
-runnable_with_history = RunnableWithMessageHistory(
-    runnable,
-    get_session_history,
-    input_messages_key="input",
-    history_messages_key="history",
-)
+    # Resilient calls (see llm_client.py); the local tier skips the first-pass sentence already spoken
+    return ResilientLLM(
+        with_history(feedback_chain("gemini-2.0-flash", feedback_template)),
+        fallback=with_history(feedback_chain(FALLBACK_MODEL, feedback_template)),
+        local_fallback=local_fallback(question_bank.key_points, first_pass_spoken=True),
+    )
+
+runnable_with_history = Lazy(init_feedback_runnable, "llm")
+
+# Speculative drafts go through the plain chain: the history is passed in and only
+# written once a draft is actually used
+def init_draft_chain():
+    return feedback_chain("gemini-2.0-flash", feedback_template)
+
+draft_chain = Lazy(init_draft_chain, "draft llm")
+
+# Reuse feedback for near-identical answers instead of calling the LLM again
+feedback_cache = FeedbackCache("feedback_cache.db")
 
-questions = [
-    "Tell me about a challenging machine learning project you've worked on.",
-    "How do you approach feature selection in your ML models?",
-    # "Explain how you would implement a recommendation system from scratch.",
-    "What's your experience with deploying ML models to production?",
-    "How do you handle missing data in a dataset?",
-    "Explain the difference between supervised and unsupervised learning with examples.",
-    # "How would you detect and handle outliers in your dataset?",
-    "What metrics would you use to evaluate a classification model?",
-    # "Describe your experience with deep learning frameworks.",
-    # "How do you approach A/B testing for model improvements?"
-]
+# Questions, with their expected key points, come from the shared question bank
+# (question_bank.json, imported into questions.db)
+question_bank = get_question_bank()
+questions = question_bank.questions("ml")
+
+# Trivial or unrecognized answers are answered locally; the rest get one local
+# sentence (filler words, speaking rate) while the LLM works on the full reply
+local_feedback = LocalFeedback(
+    key_points=question_bank.key_points,
+    speech_seconds=lambda: capture.get().last_speech_seconds if capture.ready else None
+)
 
 
 # Text-to-speech function
 def speak(text):
-    engine.say(text)
-    engine.runAndWait()
+    with span("tts.speak", chars=len(text)):
+        engine = tts_engine.get()
+        engine.say(text)
+        engine.runAndWait()
+
+# Fixed questions play from the pre-rendered audio bundle when it has been built
+speak_question = make_question_speaker(speak)
 
 # def listen_to_answer():
 #     with mic as source:
@@ -130,84 +196,122 @@ def speak(text):
 #         print("⚠️ Could not reach the speech service.")
 #         return "[Speech service error]"
 
-def listen_to_answer():
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source)
-        print("🎙️ Listening... Recording will stop after 3 seconds of silence.")
-        
-        # Lower the pause threshold to 3 seconds instead of 5
-        recognizer.pause_threshold = 2
-        
-        # Make the recognizer more responsive with these settings
-        recognizer.dynamic_energy_threshold = True
-       
-       # May need adjustment based on your microphone
-        
-        # Listen with shorter phrase_time_limit to process speech more quickly
-        audio = recognizer.listen(source, phrase_time_limit=180)
+def show_partial(text):
+    print(f"\r📝 {text}", end="", flush=True)
+
+def listen_to_answer(speculation=None):
+    import speech_recognition as sr
+
+    def on_partial(text):
+        show_partial(text)
+        if speculation:
+            speculation.update(text)
 
     try:
-        response = recognizer.recognize_google(audio)
-        print(f"🗣️ You said: {response}")
+        print("🎙️ Listening... Recording will stop when you pause at the end of your answer.")
+        
+        # Transcribe chunk by chunk while the candidate is still speaking; with speculation,
+        # feedback is drafted from the transcript so far whenever they pause
+        response = capture.get().listen_streaming(stt_backend.get(), on_partial=on_partial,
+                                                  on_pause=speculation.pause if speculation else None,
+                                                  phrase_time_limit=180)
+        print(f"\n🗣️ You said: {response}")
         return response
     except sr.UnknownValueError:
-        print("❌ Sorry, I couldn't understand you.")
+        print("\n❌ Sorry, I couldn't understand you.")
         return "[Unrecognized speech]"
     except sr.RequestError:
-        print("⚠️ Could not reach the speech service.")
+        print("\n⚠️ Could not reach the speech service.")
         return "[Speech service error]"
     
 
 # Main interview function
-def run_mock_interview(session_id="default"):
-    responses = []
+def run_mock_interview(session_id=None, prefetch=False, adaptive=False, speculative=False):
+    # Every run is its own session (log, chat history and analytics candidate) unless one is given
+    session_id = session_id or f"session_{int(time.time())}"
     print("🤖 Starting your mock interview...")
-    speak("Welcome to your mock interview. Let's begin.")
-    speak(questions[0])
-    
-    for i, q in enumerate(questions):
-        print(f"\n🧠 Question: {q}")
-        # speak(q)
-        
-        # Listen to the candidate's answer
-        answer = listen_to_answer()
-        
-        # Determine the follow-up question
-        next_question = questions[i + 1] if i + 1 < len(questions) else "No further questions."
-        
-        # Pass the question, answer, and follow-up question to the LLM
-        result = runnable_with_history.invoke(
-            {
-                'question': q, 
-                "answer": answer, 
-                "followup_question": next_question, 
-                'input': "some_input_value"
-            },
-            config={"configurable": {"session_id": session_id}}
-        )
-        
-        # Speak the LLM's response
-        feedback = result.content
-        print(f"🤖 Feedback: {feedback}")
-        speak(feedback)
-        
-        # Save the response
-        responses.append({
-            "question": q,
-            "answer": answer,
-            "feedback": feedback
-        })
-        
-        if i < len(questions) - 1:
-            input("Press Enter for the next question...")
 
-    # Save responses to a file
-    with open("interview_responses.json", "w", encoding='utf-8') as f:
-        json.dump(responses, f, indent=4)
+    # Load the LLM client, speech backend and microphone while the welcome prompt plays
+    for resource in (runnable_with_history, stt_backend, capture) + ((draft_chain,) if speculative else ()):
+        resource.start()
+
+    # Archive sessions older than 30 days out of memory.db in the background
+    from history_retention import HistoryMaintenance
+
+    HistoryMaintenance("memory.db", active=lambda: [session_id]).start()
+
+    # Same prompt and history window as the real call, without writing to the history
+    def draft_feedback(question, answer, followup_question):
+        inputs = feedback_inputs(question, answer, followup_question)
+        return draft_chain.get().stream({**inputs, "history": get_session_history(session_id).messages})
+
+    # What RunnableWithMessageHistory would have stored for the turn
+    def commit_draft(question, answer, followup_question, text):
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        human = HumanMessage(content=turn_message(question, answer))
+        get_session_history(session_id).add_messages([human, AIMessage(content=text)])
+
+    # Only streaming speech backends (vosk, whisper) report partial transcripts to draft from
+    speculation = SpeculativeFeedback(draft_feedback, commit_draft) if speculative else None
+
+    def generate(question, answer, followup_question):
+        return feedback_turn.llm_stream(runnable_with_history.get(), session_id, question, answer, followup_question)
+
+    # Stream the LLM's response for one answer; the engine speaks it sentence by sentence
+    def stream_feedback(question, answer, followup_question):
+        make_stream = lambda: generate(question, answer, followup_question)
+        if speculation:
+            make_stream = lambda: speculation.take(question, answer, followup_question,
+                                                   lambda: generate(question, answer, followup_question))
+        return feedback_turn.stream_feedback(local_feedback, feedback_cache,
+                                             question, answer, followup_question, make_stream)
+
+    def wait_for_next():
+        input("Press Enter for the next question...")
+
+    # Capture, feedback and saving run as overlapping stages; each turn is
+    # appended to responses/<session_id>.jsonl as soon as it completes
+    # Adaptive interviews pick each next question from how well the last answer
+    # covered its key points, harder after strong answers and easier after weak ones
+    selector = AdaptiveSelector("ml", question_bank, max_questions=len(questions)) if adaptive else None
+
+    interview = InterviewEngine(
+        [selector.first()] if adaptive else questions,
+        listen=lambda: listen_to_answer(speculation),
+        stream_feedback=stream_feedback,
+        speak=speak,
+        response_log=ResponseLog(session_id),
+        speak_question=speak_question,
+        wait_for_next=wait_for_next,
+        prefetch=prefetch,
+        choose_next=selector.next if adaptive else None,
+        speech_seconds=lambda: capture.get().last_speech_seconds,
+        speech_ended=lambda: capture.get().last_speech_end,
+        speculate=speculation
+    )
+    try:
+        asyncio.run(interview.run(
+            intro=["Welcome to your mock interview. Let's begin."],
+            outro="Thank you. This concludes your mock interview."
+        ))
+    finally:
+        if capture.ready:
+            capture.get().close()
 
-    speak("Thank you. This concludes your mock interview.")
+    interview.report()
+    print(f"📦 Feedback cache: {feedback_cache.stats()}")
+    print(f"⚡ Local feedback: {local_feedback.stats()}")
+    if speculation:
+        print(f"🔮 Speculative drafts: {speculation.stats()}")
+    if runnable_with_history.ready:
+        print(f"🛡️ LLM client: {runnable_with_history.get().stats()}")
+    print(f"🎙️ Audio buffers: {buffer_stats()}")
     print("\n✅ Done! Your responses have been saved to 'interview_responses.json'.")
 
 # Entry point
 if __name__ == "__main__":
-    run_mock_interview("session_" + str(int(time.time())))
+    # python app_memory.py --adaptive picks questions by how well each answer went
+    # python app_memory.py --speculative drafts feedback while the candidate pauses (vosk/whisper)
+    run_mock_interview(adaptive="--adaptive" in sys.argv,
+                       speculative="--speculative" in sys.argv)
@@ -1,14 +1,23 @@
 import os
-import json
 import time
-import pyttsx3
 import streamlit as st
 import speech_recognition as sr
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.chat_message_histories import SQLChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
+from feedback_cache import FeedbackCache
+import feedback_turn
+from prompts import feedback_chain
+from question_bank import get_question_bank
+from tts_audio import AudioCache, audio_format
+from question_audio import load_bundle
+from recognizers import get_backend
+from tracing import span, set_session
+from audio_capture import AudioCapture
+from vad import Endpointer
+from response_log import ResponseLog, export
+from warmup import Lazy
+
+# Rerun timing probe: Streamlit re-executes this whole script on every interaction
+rerun_start = time.perf_counter()
 
 # App title and description
 st.set_page_config(page_title="Visa Interview Coach", page_icon="🎙️")
@@ -26,6 +35,13 @@ if 'interview_active' not in st.session_state:
     st.session_state.interview_active = False
 if 'interview_complete' not in st.session_state:
     st.session_state.interview_complete = False
+if 'rerun_times' not in st.session_state:
+    st.session_state.rerun_times = []
+if 'llm_setup_times' not in st.session_state:
+    st.session_state.llm_setup_times = []
+
+# Spans from this rerun are tagged with the interview session (INTERVIEW_TRACE=spans.jsonl)
+set_session(st.session_state.session_id)
 
 # Load environment variables (for API keys)
 load_dotenv()
@@ -35,19 +51,23 @@ api_key = st.sidebar.text_input("Enter your Google API Key", type="password")
 if api_key:
     os.environ["GOOGLE_API_KEY"] = api_key
 
-# Define interview questions
-questions = [
-    "Why did you choose this particular time to travel?",
-    "What is the purpose of getting a visa?",
-    "Why are you traveling at this time?",
-    "Have you traveled abroad before?",
-    "Do you have travel insurance?",
-    "What do you do for a living in your home country?"
-]
-
-# Chat history handler
+# Define interview questions (from the shared question bank: question_bank.json,
+# imported into questions.db), with the key points each answer should cover
+question_bank = get_question_bank()
+questions = question_bank.questions("visa")
+
+# Chat history handler (one shared, indexed connection pool for memory.db).
+# Only the last few exchanges plus a rolling summary are replayed to the LLM.
+# prompts.py --check reads these two to simulate this app's prompts
+HISTORY_TURNS = 3
+HISTORY_TOKEN_BUDGET = 1200
+
 def get_session_history(session_id):
-    return SQLChatMessageHistory(session_id, "sqlite:///memory.db")
+    from history_store import get_history_store
+    from history_window import WindowedChatHistory
+
+    return WindowedChatHistory(session_id, get_history_store("memory.db"),
+                               max_turns=HISTORY_TURNS, token_budget=HISTORY_TOKEN_BUDGET)
 
 # Define feedback template
 feedback_template = """
@@ -69,58 +89,110 @@ Example of good response style:
 "That's a good point about your return ticket. You might want to mention your job commitments back home as well, as this shows ties to your country. Now for your next question: What is the purpose of your visit?"
 """
 
-# Set up the prompt and runnable
-feedback_prompt = ChatPromptTemplate.from_messages([
-    ("system", feedback_template),
-    MessagesPlaceholder(variable_name="history"),
-    ("human", "Question: {question}\nAnswer: {answer}\nNext question: {followup_question}")
-])
+# LangChain and the Gemini client take seconds to import, so the first page
+# renders right away while they load on a background thread
+def import_llm_stack():
+    import langchain_google_genai
+    import langchain_core.runnables.history
+    import history_window
 
-# Initialize LLM (when API key is provided)
-def get_llm_feedback(question, answer, followup_question):
-    if not os.environ.get("GOOGLE_API_KEY"):
-        return "Please provide a Google API key in the sidebar to get AI feedback."
-    
-    try:
-        llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
-        runnable = feedback_prompt | llm
-        runnable_with_history = RunnableWithMessageHistory(
+@st.cache_resource
+def get_llm_warmup():
+    return Lazy(import_llm_stack, "llm").start()
+
+get_llm_warmup()
+
+# One LLM client and runnable per API key and model, shared across reruns and
+# sessions so the client's HTTP connection is reused between calls. The prompt's
+# system text is rendered once per process (prompts.py)
+@st.cache_resource(show_spinner=False)
+def get_feedback_runnable(api_key, model="gemini-2.0-flash"):
+    get_llm_warmup().get()
+    from langchain_core.runnables.history import RunnableWithMessageHistory
+    from llm_client import FALLBACK_MODEL, ResilientLLM, local_fallback
+
+    def with_history(runnable):
+        return RunnableWithMessageHistory(
             runnable,
             get_session_history,
             input_messages_key="input",
             history_messages_key="history",
         )
-        
-        result = runnable_with_history.invoke(
-            {
-                'question': question, 
-                "answer": answer, 
-                "followup_question": followup_question, 
-                'input': "some_input_value"
-            },
-            config={"configurable": {"session_id": st.session_state.session_id}}
+
+    # Resilient calls (see llm_client.py); the local tier skips the first-pass sentence already shown
+    return ResilientLLM(
+        with_history(feedback_chain(model, feedback_template, api_key=api_key)),
+        fallback=with_history(feedback_chain(FALLBACK_MODEL, feedback_template, api_key=api_key)),
+        local_fallback=local_fallback(question_bank.key_points, first_pass_spoken=True),
+    )
+
+# Feedback cache shared by every session, kept across reruns
+@st.cache_resource
+def get_feedback_cache():
+    return FeedbackCache("feedback_cache.db")
+
+# One background thread per process archives sessions older than 30 days out of memory.db
+@st.cache_resource
+def get_history_maintenance():
+    from history_retention import HistoryMaintenance
+
+    # Live sessions were active minutes ago, so they are never old enough to be archived
+    return HistoryMaintenance("memory.db").start()
+
+get_history_maintenance()
+
+# Initialize LLM (when API key is provided)
+def get_llm_feedback(question, answer, followup_question):
+    def get_runnable():
+        if not os.environ.get("GOOGLE_API_KEY"):
+            return None
+        start = time.perf_counter()
+        runnable_with_history = get_feedback_runnable(os.environ["GOOGLE_API_KEY"])
+        # Kept for the sidebar, which must not build the client itself on a rerun
+        st.session_state.llm_client = runnable_with_history
+        st.session_state.llm_setup_times.append((time.perf_counter() - start) * 1000)
+        return runnable_with_history
+
+    try:
+        result = feedback_turn.feedback(
+            question, answer, followup_question, get_feedback_cache(), get_runnable,
+            st.session_state.session_id, key_points=question_bank.key_points(question), show=st.info
         )
-        
-        return result.content
     except Exception as e:
         st.error(f"Error getting feedback: {str(e)}")
         return f"Sorry, there was an error generating feedback: {str(e)}"
+    if result is None:
+        return "Please provide a Google API key in the sidebar to get AI feedback."
+    return result
+
+# Pre-rendered question audio (python question_audio.py build), memory-mapped once
+@st.cache_resource(show_spinner=False)
+def get_question_audio():
+    return load_bundle()
+
+# Synthesized speech cached in memory by (text, voice, rate) for the whole process.
+# Questions missing from the bundle are rendered in the background at startup.
+@st.cache_resource(show_spinner=False)
+def get_audio_cache():
+    audio_cache = AudioCache()
+    bundle = get_question_audio()
+    audio_cache.prewarm(bundle.missing(questions) if bundle else questions, rate=150)
+    return audio_cache
+
+get_audio_cache()
 
 # Text-to-speech function using pyttsx3
 def text_to_speech(text):
-    # In a Streamlit app, we can't directly use pyttsx3 as it requires a GUI
-    # Instead, we'll save the audio to a file and play it back
+    # Audio is produced into memory per call, so concurrent sessions never share a file
     try:
-        engine = pyttsx3.init()
-        engine.setProperty('rate', 150)
-        engine.save_to_file(text, 'temp_speech.mp3')
-        engine.runAndWait()
-        
-        # Play the audio file
-        audio_file = open('temp_speech.mp3', 'rb')
-        audio_bytes = audio_file.read()
-        st.audio(audio_bytes, format='audio/mp3')
-        audio_file.close()
+        with span("tts.synthesize", chars=len(text)):
+            bundle = get_question_audio()
+            audio_bytes = bundle.lookup(text) if bundle else None
+            if audio_bytes is None:
+                audio_bytes = get_audio_cache().get(text, rate=150)
+            else:
+                audio_bytes = bytes(audio_bytes)
+        st.audio(audio_bytes, format=audio_format(audio_bytes))
     except Exception as e:
         st.warning(f"Could not generate speech: {str(e)}")
 
@@ -131,15 +203,21 @@ def speech_to_text():
     status_placeholder.info("Initializing microphone...")
     
     try:
-        recognizer = sr.Recognizer()
-        with sr.Microphone() as source:
+        # One open, calibrated microphone per session instead of a new one per answer.
+        # Answers end once the silence is longer than this candidate's usual pauses.
+        if 'audio_capture' not in st.session_state:
             status_placeholder.info("Adjusting for ambient noise... Please wait.")
-            recognizer.adjust_for_ambient_noise(source, duration=1)
-            status_placeholder.info("🎙️ Listening... Speak now!")
-            audio = recognizer.listen(source, timeout=10)
-        
-        status_placeholder.info("Processing your speech...")
-        response = recognizer.recognize_google(audio)
+            st.session_state.audio_capture = AudioCapture(calibration_seconds=1, endpointer=Endpointer()).open()
+        # One speech backend per session too: its worker pool and utterance buffer are reused
+        if 'stt_backend' not in st.session_state:
+            st.session_state.stt_backend = get_backend()
+        status_placeholder.info("🎙️ Listening... Speak now!")
+        # Transcribe while the candidate speaks (STT_BACKEND=google|vosk|whisper)
+        response = st.session_state.audio_capture.listen_streaming(
+            st.session_state.stt_backend,
+            on_partial=lambda text: status_placeholder.info(f"🎙️ {text}"),
+            timeout=10
+        )
         status_placeholder.success("Speech recognized!")
         return response
     except sr.UnknownValueError:
@@ -152,13 +230,22 @@ def speech_to_text():
         status_placeholder.error(f"Error during speech recognition: {str(e)}")
         return ""
 
+# The session's microphone is released when its interview ends, so a finished
+# (or restarted) tab doesn't keep the server's device and reader thread busy
+def close_audio_capture():
+    capture = st.session_state.pop('audio_capture', None)
+    if capture is not None:
+        capture.close()
+
 # Function to start the interview
 def start_interview():
+    close_audio_capture()
     st.session_state.interview_active = True
     st.session_state.current_question_index = 0
     st.session_state.responses = []
     st.session_state.interview_complete = False
     st.session_state.session_id = f"session_{int(time.time())}"
+    set_session(st.session_state.session_id)
 
 # Function to handle next question
 def next_question():
@@ -166,16 +253,31 @@ def next_question():
         st.session_state.current_question_index += 1
     else:
         st.session_state.interview_complete = True
+        close_audio_capture()
 
-# Function to save responses to file
+# Append-only log of this session's responses (responses/<session_id>.jsonl)
+def get_response_log():
+    response_log = st.session_state.get('response_log')
+    if response_log is None or response_log.session_id != st.session_state.session_id:
+        if response_log is not None:
+            response_log.close()
+        response_log = st.session_state.response_log = ResponseLog(st.session_state.session_id)
+    return response_log
+
+# Function to save responses to file (one file per session, so sessions never clobber each other)
 def save_responses():
-    with open("interview_responses.json", "w", encoding='utf-8') as f:
-        json.dump(st.session_state.responses, f, indent=4)
-    return "interview_responses.json"
+    get_response_log().sync()
+    return export(st.session_state.session_id, f"interview_responses_{st.session_state.session_id}.json")
 
 # Sidebar controls
 with st.sidebar:
     st.header("Controls")
+    with st.expander("Feedback cache"):
+        st.json(get_feedback_cache().stats())
+    # Only once a call has built the client, so the first render stays lazy
+    if st.session_state.get("llm_client") is not None:
+        with st.expander("LLM client"):
+            st.json(st.session_state.llm_client.stats())
     if not st.session_state.interview_active:
         if st.button("Start Interview", use_container_width=True):
             start_interview()
@@ -222,7 +324,9 @@ if st.session_state.interview_active:
             
             # Get feedback
             with st.spinner("Getting feedback on your answer..."):
+                feedback_start = time.perf_counter()
                 feedback = get_llm_feedback(current_q, user_answer, next_q)
+                latency = round(time.perf_counter() - feedback_start, 3)
             
             # Display feedback
             st.markdown("### Feedback")
@@ -233,11 +337,14 @@ if st.session_state.interview_active:
                 text_to_speech(feedback)
             
             # Save the response
-            st.session_state.responses.append({
+            response = {
                 "question": current_q,
                 "answer": user_answer,
-                "feedback": feedback
-            })
+                "feedback": feedback,
+                "latency": latency
+            }
+            st.session_state.responses.append(response)
+            get_response_log().append(response)
             
             # Button to continue to next question
             if st.button("Next Question"):
@@ -290,4 +397,15 @@ else:
 # Show progress bar
 if st.session_state.interview_active and not st.session_state.interview_complete:
     progress = (st.session_state.current_question_index) / len(questions)
-    st.progress(progress)
\ No newline at end of file
+    st.progress(progress)
+
+# Report how long this rerun took and how long LLM setup took per submit
+rerun_ms = (time.perf_counter() - rerun_start) * 1000
+st.session_state.rerun_times = st.session_state.rerun_times[-199:] + [rerun_ms]
+with st.sidebar.expander("Performance"):
+    reruns = sorted(st.session_state.rerun_times)
+    st.write(f"Last rerun: {rerun_ms:.1f} ms")
+    st.write(f"Median rerun: {reruns[len(reruns) // 2]:.1f} ms over {len(reruns)} reruns")
+    if st.session_state.llm_setup_times:
+        setups = st.session_state.llm_setup_times
+        st.write(f"LLM setup: first {setups[0]:.1f} ms, last {setups[-1]:.1f} ms")
@@ -0,0 +1,187 @@
+"""
+Bounded, preallocated PCM buffers for audio capture.
+
+recognizer.listen() collects a whole answer (up to phrase_time_limit, three
+minutes in app_memory) at the microphone's native rate as one AudioData,
+which is then copied again on its way to the recognizer. Here audio is
+converted to 16 kHz 16-bit mono as it is read, passes through small ring
+buffers, and only backends that need the whole answer keep it, in an
+UtteranceBuffer allocated once and reused for every answer. Memory per
+session is fixed up front; buffer_stats() reports it.
+"""
+import wave
+import weakref
+
+from audioop_compat import audioop
+
+TARGET_RATE = 16000
+
+# Every live buffer, for buffer_stats()
+_buffers = weakref.WeakSet()
+
+
+class PcmConverter:
+    """Converts chunks from the capture format to 16-bit mono at `target_rate`, keeping resampler state across chunks."""
+
+    def __init__(self, sample_rate, sample_width=2, channels=1, target_rate=TARGET_RATE):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.target_rate = target_rate
+        self._state = None
+
+    @property
+    def passthrough(self):
+        return self.sample_rate == self.target_rate and self.sample_width == 2 and self.channels == 1
+
+    def max_output(self, frames):
+        """Upper bound on the converted size of `frames` input frames, in bytes."""
+        return (frames * self.target_rate // self.sample_rate + 2) * 2
+
+    def convert(self, chunk):
+        if self.passthrough:
+            return chunk
+        if self.channels == 2:
+            chunk = audioop.tomono(chunk, self.sample_width, 0.5, 0.5)
+        if self.sample_width != 2:
+            chunk = audioop.lin2lin(chunk, self.sample_width, 2)
+        if self.sample_rate != self.target_rate:
+            chunk, self._state = audioop.ratecv(chunk, 2, 1, self.sample_rate, self.target_rate, self._state)
+        return chunk
+
+
+class RingBuffer:
+    """
+    Fixed-size FIFO of bytes. Once full, writes overwrite the oldest bytes
+    (counted in `dropped`), so it never grows.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self._view = memoryview(self._data)
+        self._start = 0
+        self._length = 0
+        self.dropped = 0
+        self.high_water = 0
+        _buffers.add(self)
+
+    def __len__(self):
+        return self._length
+
+    def write(self, chunk):
+        chunk = memoryview(chunk).cast("B")
+        size = len(chunk)
+        if size >= self.capacity:
+            self.dropped += self._length + size - self.capacity
+            chunk = chunk[size - self.capacity:]
+            size = self.capacity
+            self._start = self._length = 0
+        overflow = self._length + size - self.capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self.capacity
+            self._length -= overflow
+            self.dropped += overflow
+        end = (self._start + self._length) % self.capacity
+        first = min(size, self.capacity - end)
+        self._view[end:end + first] = chunk[:first]
+        self._view[:size - first] = chunk[first:]
+        self._length += size
+        self.high_water = max(self.high_water, self._length)
+
+    def read_into(self, out):
+        """Moves the oldest len(out) bytes (or fewer) into `out`; returns a memoryview of what was read."""
+        out = memoryview(out).cast("B")
+        size = min(len(out), self._length)
+        first = min(size, self.capacity - self._start)
+        out[:first] = self._view[self._start:self._start + first]
+        out[first:size] = self._view[:size - first]
+        self._start = (self._start + size) % self.capacity
+        self._length -= size
+        return out[:size]
+
+    def peek(self):
+        """The buffered bytes as at most two memoryviews, oldest first, without copying."""
+        end = self._start + self._length
+        if end <= self.capacity:
+            return [self._view[self._start:end]] if self._length else []
+        return [self._view[self._start:], self._view[:end - self.capacity]]
+
+    def clear(self):
+        self._start = self._length = 0
+
+    @property
+    def in_use(self):
+        return self._length
+
+
+class UtteranceBuffer:
+    """
+    Holds one whole answer as 16-bit mono PCM in storage allocated once for
+    `max_seconds`. Audio past that is counted in `truncated` and dropped, the
+    same cut-off phrase_time_limit applies.
+    """
+
+    def __init__(self, max_seconds=180, sample_rate=TARGET_RATE):
+        self.sample_rate = sample_rate
+        self.capacity = int(max_seconds * sample_rate) * 2
+        self._data = bytearray(self.capacity)
+        self._view = memoryview(self._data)
+        self._length = 0
+        self.truncated = 0
+        self.high_water = 0
+        _buffers.add(self)
+
+    def __len__(self):
+        return self._length
+
+    def reset(self):
+        self._length = 0
+        self.truncated = 0
+
+    def append(self, chunk):
+        chunk = memoryview(chunk).cast("B")
+        size = min(len(chunk), self.capacity - self._length)
+        self._view[self._length:self._length + size] = chunk[:size]
+        self._length += size
+        self.truncated += len(chunk) - size
+        self.high_water = max(self.high_water, self._length)
+
+    def view(self):
+        """The answer so far, without copying. Only valid until the next reset()."""
+        return self._view[:self._length]
+
+    def samples(self):
+        """The answer as an int16 numpy array sharing the buffer's memory."""
+        import numpy as np
+
+        return np.frombuffer(self._data, dtype=np.int16, count=self._length // 2)
+
+    @property
+    def seconds(self):
+        return self._length / 2 / self.sample_rate
+
+    @property
+    def in_use(self):
+        return self._length
+
+    def write_wav(self, path):
+        """Streams the answer to a WAV file straight from the buffer."""
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(self.view())
+
+
+def buffer_stats():
+    """Allocated and peak-used bytes over every live capture buffer."""
+    buffers = list(_buffers)
+    return {
+        "buffers": len(buffers),
+        "allocated_kb": round(sum(b.capacity for b in buffers) / 1024, 1),
+        "in_use_kb": round(sum(b.in_use for b in buffers) / 1024, 1),
+        "peak_kb": round(sum(b.high_water for b in buffers) / 1024, 1),
+        # Answers cut off at max_seconds (ring buffers overwrite by design, so they don't count)
+        "truncated_kb": round(sum(getattr(b, "truncated", 0) for b in buffers) / 1024, 1),
+    }
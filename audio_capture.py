@@ -0,0 +1,154 @@
+import threading
+from collections import deque
+
+import speech_recognition as sr
+
+from audioop_compat import audioop
+from recognizers import listen_streaming
+from vad import listen_vad
+from tracing import span
+
+
+class AudioCapture:
+    """
+    Keeps the microphone open for a whole session and calibrates for ambient noise once.
+
+    Between answers a background thread keeps reading the stream, which keeps
+    the device buffer drained and tracks the ambient noise floor (a low
+    percentile of recent chunk energies, so TTS playback doesn't count as
+    noise). With adaptive=True the recognizer's energy threshold follows the
+    noise floor continuously; otherwise the threshold stays put and a full
+    recalibration only happens before an answer when the floor has drifted
+    by more than drift_ratio.
+
+    With an `endpointer` (vad.Endpointer), streamed answers are endpointed by
+    a frame-level VAD that learns the candidate's pauses instead of the
+    recognizer's fixed pause_threshold.
+    """
+
+    def __init__(self, recognizer=None, microphone=None, calibration_seconds=1.0,
+                 adaptive=True, drift_ratio=1.5, window_seconds=5.0, endpointer=None, vad=None):
+        self.recognizer = recognizer or sr.Recognizer()
+        self.microphone = microphone or sr.Microphone()
+        self.calibration_seconds = calibration_seconds
+        self.adaptive = adaptive
+        self.drift_ratio = drift_ratio
+        self.window_seconds = window_seconds
+        self.endpointer = endpointer
+        self.vad = vad
+        # Seconds from the first to the last detected word of the last answer, and the
+        # perf_counter time that last word ended (VAD only)
+        self.last_speech_seconds = None
+        self.last_speech_end = None
+        self.source = None
+        self.baseline = None
+        self.calibrations = 0
+        self._levels = deque()
+        self._lock = threading.Lock()
+        self._listening = threading.Event()
+        # Set while no answer is being captured; the watcher sleeps on it instead of polling
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stop = threading.Event()
+        self._monitor = None
+
+    def open(self):
+        if self.source is not None:
+            return self
+        self.source = self.microphone.__enter__()
+        self._levels = deque(maxlen=max(1, int(self.window_seconds * self.source.SAMPLE_RATE / self.source.CHUNK)))
+        self.calibrate()
+        self._stop.clear()
+        self._monitor = threading.Thread(target=self._watch_noise_floor, daemon=True)
+        self._monitor.start()
+        return self
+
+    def close(self):
+        if self.source is None:
+            return
+        self._stop.set()
+        self._idle.set()
+        self._monitor.join()
+        self.microphone.__exit__(None, None, None)
+        self.source = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def calibrate(self):
+        with self._lock, span("mic.calibrate"):
+            self.recognizer.adjust_for_ambient_noise(self.source, duration=self.calibration_seconds)
+            self.baseline = self.recognizer.energy_threshold / self.recognizer.dynamic_energy_ratio
+            self._levels.clear()
+            self.calibrations += 1
+
+    def noise_floor(self):
+        if not self._levels:
+            return None
+        levels = sorted(self._levels)
+        return levels[len(levels) // 5]
+
+    def drifted(self):
+        floor = self.noise_floor()
+        if floor is None or not self.baseline:
+            return False
+        ratio = max(floor, 1) / max(self.baseline, 1)
+        return ratio > self.drift_ratio or ratio < 1 / self.drift_ratio
+
+    def _watch_noise_floor(self):
+        damping = self.recognizer.dynamic_energy_adjustment_damping
+        while not self._stop.is_set():
+            # Step aside while an answer is being captured
+            if self._listening.is_set():
+                self._idle.wait()
+                continue
+            with self._lock:
+                buffer = self.source.stream.read(self.source.CHUNK)
+            self._levels.append(audioop.rms(buffer, self.source.SAMPLE_WIDTH))
+            if self.adaptive and len(self._levels) == self._levels.maxlen:
+                target = self.noise_floor() * self.recognizer.dynamic_energy_ratio
+                self.recognizer.energy_threshold = (
+                    self.recognizer.energy_threshold * damping + target * (1 - damping)
+                )
+
+    def _prepare(self):
+        self.open()
+        if not self.adaptive and self.drifted():
+            self.calibrate()
+
+    def listen(self, **listen_kwargs):
+        self._prepare()
+        self._idle.clear()
+        self._listening.set()
+        try:
+            with self._lock:
+                return self.recognizer.listen(self.source, **listen_kwargs)
+        finally:
+            self._listening.clear()
+            self._idle.set()
+
+    def listen_streaming(self, backend, on_partial=None, on_pause=None, **listen_kwargs):
+        """
+        Like recognizers.listen_streaming, on the already open microphone.
+        on_pause(seconds) is called during pauses in the answer (VAD only).
+        """
+        self._prepare()
+        self._idle.clear()
+        self._listening.set()
+        try:
+            with self._lock:
+                if self.endpointer is not None:
+                    self.last_speech_seconds = self.last_speech_end = None
+                    transcript = listen_vad(self.source, backend, self.endpointer, self.vad, on_partial,
+                                            listen_kwargs.get("timeout"), listen_kwargs.get("phrase_time_limit"),
+                                            noise_floor=self.noise_floor(), on_pause=on_pause)
+                    self.last_speech_seconds = self.endpointer.speech_end - self.endpointer.speech_start
+                    self.last_speech_end = self.endpointer.ended_at
+                    return transcript
+                return listen_streaming(self.recognizer, self.source, backend, on_partial, **listen_kwargs)
+        finally:
+            self._listening.clear()
+            self._idle.set()
@@ -0,0 +1,22 @@
+"""
+The audioop module on every Python the apps run on.
+
+audioop is deprecated since Python 3.11 and removed from the standard
+library in 3.13, where requirements.txt installs audioop-lts (the same
+module, maintained outside CPython; SpeechRecognition needs it there too).
+Modules import it from here, so 3.11 and 3.12 don't print the deprecation
+warning and 3.13 without the package fails with a clear message.
+
+    from audioop_compat import audioop
+"""
+import warnings
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop
+    except ImportError as e:
+        raise ImportError("audioop was removed from the standard library in Python 3.13; "
+                          "install it with: pip install audioop-lts") from e
+
+__all__ = ["audioop"]
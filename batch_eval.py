@@ -0,0 +1,200 @@
+"""
+Headless batch scoring of recorded answers.
+
+Reads (question, answer) records from JSONL (or an interview_responses.json
+export), sends them through the feedback prompt with bounded concurrency and
+a token-bucket rate limit, retries failures with exponential backoff and
+streams results to a JSONL file as they finish. Records already in the
+output file are skipped, so a crashed run resumes where it stopped.
+
+    python batch_eval.py answers.jsonl results.jsonl --concurrency 16 --rate 10
+    python batch_eval.py answers.jsonl results.jsonl --fake --fake-latency 0.3
+"""
+import os
+import ast
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+
+NO_FOLLOWUP = "No further questions."
+
+
+def read_constant(path, name):
+    """Reads a module-level literal constant (a string, number, ...) from an app file without importing it."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == name for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"{name} not found in {path}")
+
+
+def record_id(record):
+    if "id" in record:
+        return str(record["id"])
+    key = f"{record['question']}\n{record['answer']}\n{record.get('followup_question', '')}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def load_records(path):
+    """Yields records from JSONL, or from a JSON list like interview_responses.json."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        items = json.loads(text)
+        # In an interview export the follow-up is simply the next question
+        for i, item in enumerate(items):
+            followup = items[i + 1]["question"] if i + 1 < len(items) else NO_FOLLOWUP
+            yield {"question": item["question"], "answer": item["answer"], "followup_question": followup}
+    else:
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_checkpoint(path):
+    """Ids of records that already have feedback in the output file."""
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partial last line from a crash
+                if "feedback" in result:
+                    done.add(result["id"])
+    return done
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def score(chain, record, limiter, semaphore, max_retries=4, base_delay=1.0):
+    async with semaphore:
+        start = time.perf_counter()
+        for attempt in range(1, max_retries + 2):
+            await limiter.acquire()
+            try:
+                result = await chain.ainvoke({
+                    'question': record["question"],
+                    'answer': record["answer"],
+                    'followup_question': record.get("followup_question", NO_FOLLOWUP)
+                })
+                return {"feedback": result.content, "attempts": attempt,
+                        "latency": round(time.perf_counter() - start, 3)}
+            except Exception as e:
+                if attempt > max_retries:
+                    return {"error": f"{type(e).__name__}: {e}", "attempts": attempt}
+                # Exponential backoff with full jitter
+                await asyncio.sleep(random.uniform(0, base_delay * 2 ** (attempt - 1)))
+
+
+async def evaluate(records, chain, output_path, concurrency=8, rate=5.0, max_retries=4):
+    """Scores records not yet in output_path and appends results as they complete."""
+    done = load_checkpoint(output_path)
+    todo = []
+    skipped = 0
+    for record in records:
+        rid = record_id(record)
+        if rid in done:
+            skipped += 1
+            continue
+        done.add(rid)
+        todo.append((rid, record))
+
+    limiter = TokenBucket(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(rid, record):
+        return rid, record, await score(chain, record, limiter, semaphore, max_retries)
+
+    stats = {"scored": 0, "failed": 0, "skipped": skipped}
+    start = time.perf_counter()
+    with open(output_path, "a", encoding='utf-8') as out:
+        for finished in asyncio.as_completed([run(rid, record) for rid, record in todo]):
+            rid, record, result = await finished
+            out.write(json.dumps({"id": rid, **record, **result}) + "\n")
+            out.flush()
+            stats["failed" if "error" in result else "scored"] += 1
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    stats["answers_per_sec"] = round(stats["scored"] / stats["seconds"], 2) if stats["seconds"] else 0.0
+    return stats
+
+
+def build_chain(args):
+    from langchain_core.prompts import PromptTemplate
+    from prompts import feedback_llm, feedback_prompt
+
+    template = read_constant(args.template_from, "feedback_template")
+    chat = "{answer}" not in template
+    if args.fake:
+        from benchmarks.fakes import FakeChatModel
+        llm = FakeChatModel(latency=args.fake_latency, jitter=args.fake_latency / 4,
+                            failure_rate=args.fake_failure_rate)
+    elif chat:
+        from dotenv import load_dotenv
+        load_dotenv()
+        llm = feedback_llm(args.model)
+    else:
+        from dotenv import load_dotenv
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        load_dotenv()
+        llm = ChatGoogleGenerativeAI(model=args.model)
+    if chat:
+        # The chat apps keep the template as a system message and send the answer separately
+        prompt = feedback_prompt(template, history=False)
+    else:
+        prompt = PromptTemplate(input_variables=["question", "answer", "followup_question"], template=template)
+    return prompt | llm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=5.0, help="max requests per second")
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--model", default="gemini-2.0-flash")
+    parser.add_argument("--template-from", default="app.py",
+                        help="app file whose feedback_template is used")
+    parser.add_argument("--fake", action="store_true", help="use the offline fake LLM")
+    parser.add_argument("--fake-latency", type=float, default=0.5)
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stats = asyncio.run(evaluate(
+        load_records(args.input), build_chain(args), args.output,
+        concurrency=args.concurrency, rate=args.rate, max_retries=args.retries
+    ))
+    print(f"✅ Scored {stats['scored']} answers ({stats['failed']} failed, {stats['skipped']} already done) "
+          f"in {stats['seconds']}s: {stats['answers_per_sec']} answers/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Analytics ingest throughput and dashboard query latency.
+
+Ingest: writes --log-turns turns of synthetic response logs plus matching
+message_store rows and times a cold Analytics.ingest() and a second,
+incremental one after a few more turns arrive.
+
+Queries: fills a store with --turns synthetic turns (columns written
+directly) and times loading it cold and each dashboard query on it.
+
+    python -m benchmarks.bench_analytics --turns 1000000
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from analytics import Analytics, TABLES
+from history_store import HistoryStore
+from response_log import ResponseLog
+
+QUESTIONS = [f"Synthetic question {i}?" for i in range(40)]
+POINTS = [[f"point {i} {j}" for j in range(4)] for i in range(len(QUESTIONS))]
+KEY_POINTS = dict(zip(QUESTIONS, POINTS))
+ANSWER = "I would start with point and then um cover the details with a concrete example from my last project"
+
+
+def write_logs(directory, db_path, sessions, turns_per_session, rng, first_session=0):
+    store = HistoryStore(db_path)
+    for s in range(first_session, first_session + sessions):
+        session_id = f"session_{1745000000 + s}"
+        with ResponseLog(session_id, directory, fsync_every=10 ** 9, fsync_interval=10 ** 9) as log:
+            for _ in range(turns_per_session):
+                log.append({"question": QUESTIONS[rng.integers(len(QUESTIONS))], "answer": ANSWER,
+                            "feedback": "Good answer, add a metric next time.",
+                            "speech_seconds": float(rng.uniform(5, 60)), "latency": float(rng.gamma(2, 0.4))})
+        store.append(session_id, [
+            payload for _ in range(turns_per_session) for payload in (
+                {"type": "human", "data": {"content": "Question: ...", "type": "human"}},
+                {"type": "ai", "data": {"content": "Good answer, add a metric next time.", "type": "ai",
+                                        "usage_metadata": {"input_tokens": 900, "output_tokens": 70}}},
+            )
+        ])
+
+
+def fill(analytics, turns, sessions, rng):
+    columns = {
+        "session": rng.integers(sessions, size=turns),
+        "question": rng.integers(len(QUESTIONS), size=turns),
+        "answer_words": rng.integers(1, 200, size=turns),
+        "speech_seconds": rng.uniform(2, 90, size=turns),
+        "wpm": rng.normal(140, 30, size=turns),
+        "latency": rng.gamma(2, 0.4, size=turns),
+        "feedback_words": rng.integers(40, 90, size=turns),
+        "coverage": rng.uniform(0, 1, size=turns),
+        "filler_rate": rng.uniform(0, 0.1, size=turns),
+        "trivial": rng.uniform(size=turns) < 0.05,
+    }
+    missed = rng.uniform(size=turns) < 0.5
+    point_columns = {
+        "session": columns["session"][missed],
+        "question": columns["question"][missed],
+        "point": columns["question"][missed] * 4 + rng.integers(4, size=int(missed.sum())),
+    }
+    calls = {
+        "session": columns["session"], "message_id": np.arange(turns), "feedback_words": columns["feedback_words"],
+        "input_tokens": np.full(turns, 900), "output_tokens": np.full(turns, 70),
+    }
+    state = analytics.state
+    state["dictionaries"] = {
+        "session": [f"session_{1745000000 + s}" for s in range(sessions)],
+        "question": QUESTIONS,
+        "point": [point for points in POINTS for point in points],
+    }
+    for table, data in (("turns", columns), ("calls", calls), ("missed", point_columns)):
+        typed = {column: np.asarray(data[column], dtype=dtype) for column, dtype in TABLES[table].items()}
+        state["segments"][table] = [analytics._write_segment(table, typed)]
+    analytics._save_state()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--log-turns", type=int, default=20_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logs, db_path = os.path.join(tmp, "responses"), os.path.join(tmp, "memory.db")
+        per_session = 10
+        write_logs(logs, db_path, args.log_turns // per_session, per_session, rng)
+        analytics = Analytics(os.path.join(tmp, "ingest"), db_path, logs, key_points=KEY_POINTS.get)
+        ms, added = timed(analytics.ingest)
+        print(f"📥 Cold ingest: {added['turns']} turns, {added['calls']} replies in {ms:.0f} ms "
+              f"({added['turns'] / ms * 1000:.0f} turns/s)")
+        write_logs(logs, db_path, 5, per_session, rng, first_session=args.log_turns // per_session)
+        ms, added = timed(analytics.ingest)
+        print(f"📥 Incremental ingest: {added['turns']} new turns in {ms:.1f} ms")
+
+        directory = os.path.join(tmp, "dashboard")
+        fill(Analytics(directory, db_path=os.path.join(tmp, "none.db"), log_dir=os.path.join(tmp, "none")),
+             args.turns, args.sessions, rng)
+        dashboard = Analytics(directory, db_path=os.path.join(tmp, "none.db"), log_dir=os.path.join(tmp, "none"))
+        print(f"\n📊 Dashboard over {args.turns} turns, {args.sessions} sessions")
+        total = 0.0
+        for name, query in (
+            ("load", dashboard.tables),
+            ("summary", dashboard.summary),
+            ("question_stats", dashboard.question_stats),
+            ("session_stats", lambda: dashboard.session_stats(20)),
+            ("weaknesses", dashboard.weaknesses),
+        ):
+            ms, _ = timed(query)
+            total += ms
+            print(f"  {name:<16} {ms:8.1f} ms")
+        print(f"  {'total':<16} {total:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
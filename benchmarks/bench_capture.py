@@ -0,0 +1,85 @@
+"""
+Memory per session while capturing one long answer.
+
+Replays a WAV answer at the microphone's native rate (44.1 kHz by default)
+through three capture paths and reports the peak Python memory each one
+allocates, backend included:
+
+    listen()            recognizer.listen() -> one AudioData (the old path)
+    vad + google        listen_vad into GoogleBackend's preallocated 16 kHz buffer
+    vad + streaming     listen_vad into a backend that keeps nothing (vosk/whisper style)
+
+    python -m benchmarks.bench_capture --seconds 60 90 180
+"""
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import speech_recognition as sr
+
+from audio_buffer import buffer_stats
+from benchmarks.fakes import FakeSpeechBackend, WavMicrophone, write_speech_wav
+from recognizers import GoogleBackend
+from vad import Endpointer, listen_vad
+
+
+class OfflineGoogleBackend(GoogleBackend):
+    """GoogleBackend up to the point the request would be sent."""
+
+    def finish(self):
+        return sr.AudioData(self.buffer.view(), self.buffer.sample_rate, 2)
+
+
+def capture_listen(source):
+    recognizer = sr.Recognizer()
+    recognizer.energy_threshold = 1000
+    recognizer.dynamic_energy_threshold = False
+    return recognizer.listen(source, phrase_time_limit=600)
+
+
+def capture_vad(source, backend):
+    return listen_vad(source, backend, Endpointer())
+
+
+PATHS = {
+    "listen()": capture_listen,
+    "vad + google": lambda source: capture_vad(source, OfflineGoogleBackend(max_seconds=180)),
+    "vad + streaming": lambda source: capture_vad(source, FakeSpeechBackend(latency=0)),
+}
+
+
+def measure(path, capture):
+    with WavMicrophone(path, chunk_size=1024, speed=0) as source:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = capture(source)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    del result
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, nargs="+", default=[30, 60])
+    parser.add_argument("--rate", type=int, default=44100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'answer s':>8} {'path':<16} {'peak MB':>8} {'capture s':>10}")
+        for seconds in args.seconds:
+            # Two-second bursts with short pauses, so neither endpointer ends the answer early
+            bursts = [2.0] * max(1, int(seconds / 2.3))
+            path = os.path.join(tmp, f"answer_{seconds:g}.wav")
+            write_speech_wav(path, bursts, [0.3] * len(bursts), lead=0.5, tail=3.0, rate=args.rate)
+            for name, capture in PATHS.items():
+                peak, elapsed = measure(path, capture)
+                print(f"{seconds:8g} {name:<16} {peak / 1024 ** 2:8.2f} {elapsed:10.2f}")
+    print(f"\nLive capture buffers: {buffer_stats()}")
+
+
+if __name__ == "__main__":
+    main()
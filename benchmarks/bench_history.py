@@ -0,0 +1,82 @@
+"""
+History lookup latency as memory.db grows.
+
+Fills a scratch database with interview sessions in steps up to --max-rows and
+times random session lookups through HistoryStore after each step, with and
+without the session_id index.
+
+    python -m benchmarks.bench_history --max-rows 1000000
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+from history_store import HistoryStore
+
+MESSAGES_PER_SESSION = 12
+SAMPLE_MESSAGE = json.dumps({
+    "type": "ai",
+    "data": {"content": "That's a good start. Now for your next question: Have you traveled abroad before?"}
+})
+
+
+def fill(store, start_session, rows):
+    sessions = rows // MESSAGES_PER_SESSION
+    with store.connection() as conn, conn:
+        conn.executemany(
+            "INSERT INTO message_store (session_id, message) VALUES (?, ?)",
+            (
+                (f"session_{start_session + s}", SAMPLE_MESSAGE)
+                for s in range(sessions)
+                for _ in range(MESSAGES_PER_SESSION)
+            )
+        )
+    return start_session + sessions
+
+
+def time_lookups(store, session_count, lookups=200):
+    timings = []
+    for _ in range(lookups):
+        session_id = f"session_{random.randrange(session_count)}"
+        start = time.perf_counter()
+        store.load(session_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    parser.add_argument("--steps", type=int, default=4)
+    args = parser.parse_args()
+
+    sizes = [args.max_rows // 10 ** (args.steps - 1 - i) for i in range(args.steps)]
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {
+            "indexed": HistoryStore(os.path.join(tmp, "indexed.db")),
+            "no index": HistoryStore(os.path.join(tmp, "plain.db")),
+        }
+        with stores["no index"].connection() as conn:
+            conn.execute("DROP INDEX ix_message_store_session_id")
+
+        print(f"{'rows':>10}  {'store':<9} {'p50 ms':>8} {'p99 ms':>8}")
+        sessions = {name: 0 for name in stores}
+        filled = 0
+        for size in sizes:
+            for name, store in stores.items():
+                sessions[name] = fill(store, sessions[name], size - filled)
+            filled = size
+            for name, store in stores.items():
+                # Full scans get slow quickly, so sample the unindexed table less
+                lookups = 200 if name == "indexed" else 20
+                p50, p99 = time_lookups(store, sessions[name], lookups)
+                print(f"{size:>10}  {name:<9} {p50:8.3f} {p99:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
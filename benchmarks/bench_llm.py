@@ -0,0 +1,104 @@
+"""
+Tail latency of feedback calls against a faulty model, with and without llm_client.
+
+Sends --calls feedback requests at --rate calls per second to a
+FaultyChatModel with a slow tail, occasional hung requests, errors, broken
+streams and an outage, and reports the time to the first chunk and to the
+end of the reply, plus how many calls failed outright:
+
+    raw             prompt | model, streamed directly (the old path)
+    resilient       ResilientLLM with deadlines, retries, hedging and the local fallback
+    + cheaper model ResilientLLM falling back to a second, healthy fake model
+
+    python -m benchmarks.bench_llm --calls 400
+"""
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.prompts import PromptTemplate
+
+from benchmarks.fakes import FakeChatModel, FaultyChatModel
+from llm_client import ResilientLLM, local_fallback, percentile
+
+TEMPLATE = "QUESTION ASKED: {question}\nAPPLICANT'S ANSWER: {answer}\nNEXT QUESTION IN QUEUE: {followup_question}"
+INPUTS = {"question": "What is the purpose of your trip?",
+          "answer": "I am visiting my sister and attending her graduation in May",
+          "followup_question": "How long will you stay?"}
+
+
+def faulty_model(args):
+    return FaultyChatModel(
+        latency=args.latency, jitter=args.latency / 4, token_latency=0.002, failure_rate=0.03,
+        slow_rate=0.05, slow_latency=args.latency * 10, hang_rate=0.01, hang_seconds=args.hang,
+        outage_start=args.outage_start, outage_seconds=args.outage, break_rate=0.02, seed=1,
+    )
+
+
+def call(stream, at):
+    # Calls arrive on a fixed schedule, as turns do, however fast earlier ones returned
+    time.sleep(max(0.0, at - time.perf_counter()))
+    start = time.perf_counter()
+    first = None
+    try:
+        for _ in stream(INPUTS):
+            if first is None:
+                first = time.perf_counter() - start
+        return first, time.perf_counter() - start, False
+    except Exception:
+        return first, time.perf_counter() - start, True
+
+
+def run(stream, calls, rate):
+    start = time.perf_counter()
+    # Enough threads that hung calls never delay the ones scheduled after them
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        return list(pool.map(lambda i: call(stream, start + i / rate), range(calls)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=50, help="calls started per second")
+    parser.add_argument("--latency", type=float, default=0.2, help="median time to first token of the fake model")
+    parser.add_argument("--hang", type=float, default=10.0, help="seconds a hung request takes")
+    parser.add_argument("--outage-start", type=float, default=3.0, help="seconds into the run the outage starts")
+    parser.add_argument("--outage", type=float, default=2.0, help="seconds the outage lasts")
+    args = parser.parse_args()
+    prompt = PromptTemplate.from_template(TEMPLATE)
+    # Deadlines scaled to the fake model's latency, as the defaults are to Gemini's
+    options = dict(attempt_timeout=args.latency * 5, deadline=args.latency * 12, stall_timeout=args.latency * 5,
+                   base_delay=args.latency / 4, min_hedge_delay=args.latency,
+                   initial_hedge_delay=args.latency * 3, cooldown=args.latency * 10,
+                   # As server.py allows with its default --max-llm-calls 32
+                   max_attempts=64)
+
+    clients = {}
+    modes = {
+        "raw": lambda: (prompt | faulty_model(args)).stream,
+        "resilient": lambda: clients.setdefault("resilient", ResilientLLM(
+            prompt | faulty_model(args), local_fallback=local_fallback(), **options)).stream,
+        "+ cheaper model": lambda: clients.setdefault("+ cheaper model", ResilientLLM(
+            prompt | faulty_model(args), fallback=prompt | FakeChatModel(latency=args.latency / 2),
+            local_fallback=local_fallback(), **options)).stream,
+    }
+    print(f"{args.calls} calls, {args.rate:g} per second; model p50 {args.latency * 1000:.0f} ms, "
+          f"5% at {args.latency * 10:.1f}s, 1% hung for {args.hang:.0f}s, 3% errors, 2% broken streams, "
+          f"outage for {args.outage:g}s\n")
+    print(f"{'mode':<16} {'first p50':>10} {'p95':>8} {'p99':>8} {'max':>8} {'done p99':>9} {'failed':>7} {'wall s':>7}")
+    for name, make in modes.items():
+        start = time.perf_counter()
+        results = run(make(), args.calls, args.rate)
+        wall = time.perf_counter() - start
+        first = [f for f, _, _ in results if f is not None]
+        done = [d for _, d, _ in results]
+        failed = sum(error for _, _, error in results)
+        print(f"{name:<16} " + " ".join(f"{percentile(first, p) * 1000:>{w}.0f}" for p, w in
+                                        ((50, 10), (95, 8), (99, 8), (100, 8)))
+              + f" {percentile(done, 99) * 1000:9.0f} {failed:7d} {wall:7.1f}")
+    for name, client in clients.items():
+        print(f"\n🛡️ {name}: {client.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Question selection latency as the question bank grows.
+
+Fills a scratch QuestionBank with synthetic questions in steps up to
+--max-questions and times QuestionBank.select (with and without a tag
+filter) and a full AdaptiveSelector.next step, which also scores the answer
+against the question's key points.
+
+    python -m benchmarks.bench_questions --max-questions 100000
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from question_bank import QuestionBank, AdaptiveSelector
+
+TAGS = ["purpose", "timing", "finances", "home-ties", "travel-history", "data", "modeling", "mlops", "evaluation", "experience"]
+ANSWER = "I would check the missingness pattern first and then use imputation or a missing indicator feature"
+
+
+def fill(store, start, count, rng):
+    conn = store._db
+    with conn:
+        rows = [
+            (f"bench_{i}", f"Synthetic question number {i}?", rng.randint(1, 5),
+             json.dumps(rng.sample(TAGS, 2)), json.dumps(["imputation", "missing indicator", "dropping rows"]))
+            for i in range(start, start + count)
+        ]
+        conn.executemany(
+            "INSERT INTO questions (bank, text, difficulty, tags, key_points) VALUES ('bench', ?, ?, ?, ?)",
+            [(text, difficulty, tags, points) for _, text, difficulty, tags, points in rows]
+        )
+        conn.executemany(
+            "INSERT INTO question_tags (tag, bank, difficulty, question_id) "
+            "SELECT ?, 'bench', difficulty, id FROM questions WHERE bank = 'bench' AND text = ?",
+            [(tag, text) for _, text, _, tags, _ in rows for tag in json.loads(tags)]
+        )
+    store._key_points = None
+    store._id_ranges.clear()
+
+
+def timed(func, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1e6, times[int(len(times) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-questions", type=int, default=100_000)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = QuestionBank(os.path.join(tmp, "questions.db"))
+        print(f"{'questions':>10} {'select p50 us':>14} {'p99 us':>8} {'tagged p50 us':>14} {'p99 us':>8} "
+              f"{'adaptive p50 us':>16} {'p99 us':>8}")
+        total = 0
+        step = args.max_questions // args.steps
+        for _ in range(args.steps):
+            fill(store, total, step, rng)
+            total += step
+            plain = timed(lambda: store.select("bench", rng.randint(1, 5), rng=rng), args.runs)
+            tagged = timed(lambda: store.select("bench", rng.randint(1, 5), tag=rng.choice(TAGS), rng=rng), args.runs)
+
+            selector = AdaptiveSelector("bench", store, max_questions=args.runs + 1, seed=0)
+            question = selector.first()
+            store.key_points(question)
+
+            def step_once():
+                nonlocal question
+                question = selector.next(question, ANSWER)
+
+            adaptive = timed(step_once, min(args.runs, 200))
+            print(f"{total:>10} {plain[0]:14.1f} {plain[1]:8.1f} {tagged[0]:14.1f} {tagged[1]:8.1f} "
+                  f"{adaptive[0]:16.1f} {adaptive[1]:8.1f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+History retention: database size, lookup latency and live-write stalls.
+
+Fills a scratch memory.db with --sessions sessions (most of them older than
+the retention age), then runs one history_retention pass while a writer
+thread keeps appending turns for a live session, as an interview would.
+Reports size and session-load latency before and after, and the live
+writer's append latency while idle vs. during maintenance.
+
+    python -m benchmarks.bench_retention --sessions 5000
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+from history_retention import run_maintenance
+from history_store import HistoryStore
+
+MESSAGES_PER_SESSION = 12
+PAYLOAD = {"type": "ai", "data": {"content": "That's a good start, now add a concrete example. " * 20}}
+
+
+def fill(store, sessions, old_share):
+    old = int(sessions * old_share)
+    now = time.time()
+    with store.connection() as conn:
+        with conn:
+            conn.executemany(
+                "INSERT INTO message_store (session_id, message) VALUES (?, ?)",
+                ((f"session_{s}", json.dumps(PAYLOAD)) for s in range(sessions) for _ in range(MESSAGES_PER_SESSION))
+            )
+            conn.executemany(
+                "INSERT INTO session_activity (session_id, started, last_active) VALUES (?, ?, ?)",
+                ((f"session_{s}", now - 90 * 86400, now - 60 * 86400) if s < old else (f"session_{s}", now, now)
+                 for s in range(sessions))
+            )
+        # Start from a checkpointed file, as a long-running database would be
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def live_writer(store, stop, timings):
+    while not stop.is_set():
+        start = time.perf_counter()
+        store.append("session_live", [PAYLOAD, PAYLOAD])
+        timings.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.01)
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], timings[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--old-share", type=float, default=0.9)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "memory.db")
+        store = HistoryStore(path)
+        fill(store, args.sessions, args.old_share)
+
+        results = {}
+        for phase in ("idle", "maintenance"):
+            stop, timings = threading.Event(), []
+            writer = threading.Thread(target=live_writer, args=(store, stop, timings))
+            writer.start()
+            if phase == "idle":
+                time.sleep(2)
+            else:
+                start = time.perf_counter()
+                report = run_maintenance(path, os.path.join(tmp, "archive"), max_age_days=30, active=["session_live"])
+                elapsed = time.perf_counter() - start
+            stop.set()
+            writer.join()
+            results[phase] = percentiles(timings)
+
+        archive_kb = sum(os.path.getsize(os.path.join(tmp, "archive", f)) for f in os.listdir(os.path.join(tmp, "archive")))
+        before, after = report["before"], report["after"]
+        print(f"🗄️ Archived {report['archived']['sessions']} sessions ({report['archived']['messages']} messages) "
+              f"in {elapsed:.2f}s into {archive_kb / 1024:.0f} KB of gzip, freed {report['vacuumed_pages']} pages")
+        print(f"💾 Size: {before['file_kb']:.0f} KB -> {after['file_kb']:.0f} KB")
+        print(f"⏱️ Session load: {before['load_ms']} ms -> {after['load_ms']} ms")
+        print(f"\n{'live append':<14} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for phase, (p50, p99, worst) in results.items():
+            print(f"{phase:<14} {p50:8.2f} {p99:8.2f} {worst:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
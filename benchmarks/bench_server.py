@@ -0,0 +1,114 @@
+"""
+Load test for the interview server with mocked LLM and speech recognition.
+
+Runs N concurrent candidates through a full interview each, uploading a WAV
+answer per question, and reports p50/p99 turn latency and throughput for
+each concurrency level.
+
+    python -m benchmarks.bench_server --sessions 10 100 1000
+    python -m benchmarks.bench_server --url http://127.0.0.1:8080   # a running server
+"""
+import io
+import time
+import wave
+import asyncio
+import argparse
+import resource
+import tempfile
+
+from benchmarks.fakes import FakeChatModel, FakeSpeechBackend
+from history_store import HistoryStore
+from server import InterviewServer, build_feedback_runnable, read_wav
+
+QUESTIONS = [
+    "Why did you choose this particular time to travel?",
+    "What is the purpose of getting a visa?",
+    "Have you traveled abroad before?",
+]
+TEMPLATE = "You are a helpful visa interview coach. Give brief feedback."
+
+
+def silent_wav(seconds=2.0, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"\0\0" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def candidate_in_process(server, wav, latencies):
+    session_id = server.create_session()["session_id"]
+    for _ in QUESTIONS:
+        start = time.perf_counter()
+        await server.answer(session_id, audio=read_wav(wav))
+        latencies.append(time.perf_counter() - start)
+    server.close_session(session_id)
+
+
+async def candidate_over_http(http, url, wav, latencies):
+    async with http.post(f"{url}/sessions") as response:
+        session_id = (await response.json())["session_id"]
+    for _ in QUESTIONS:
+        start = time.perf_counter()
+        async with http.post(f"{url}/sessions/{session_id}/answer", data=wav,
+                             headers={"Content-Type": "audio/wav"}) as response:
+            await response.read()
+        latencies.append(time.perf_counter() - start)
+    await http.delete(f"{url}/sessions/{session_id}")
+
+
+async def run_level(sessions, args, tmp):
+    wav = silent_wav()
+    latencies = []
+    start = time.perf_counter()
+    if args.url:
+        import aiohttp
+
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as http:
+            await asyncio.gather(*[candidate_over_http(http, args.url, wav, latencies) for _ in range(sessions)])
+    else:
+        llm = FakeChatModel(latency=args.llm_latency, jitter=args.llm_latency / 4)
+        server = InterviewServer(
+            build_feedback_runnable(llm, HistoryStore(f"{tmp}/memory_{sessions}.db"), TEMPLATE),
+            QUESTIONS,
+            stt_backend=lambda: FakeSpeechBackend(latency=args.stt_latency),
+            stt_workers=args.stt_workers,
+            max_llm_calls=args.max_llm_calls,
+            log_dir=f"{tmp}/responses_{sessions}",
+        )
+        await asyncio.gather(*[candidate_in_process(server, wav, latencies) for _ in range(sessions)])
+        server.shutdown()
+    elapsed = time.perf_counter() - start
+    return percentile(latencies, 50), percentile(latencies, 99), len(latencies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--url", help="load-test a running server instead of an in-process one")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--stt-latency", type=float, default=0.1)
+    parser.add_argument("--stt-workers", type=int, default=16)
+    parser.add_argument("--max-llm-calls", type=int, default=256)
+    args = parser.parse_args()
+
+    # One response log file per open session
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    print(f"{'sessions':>8} {'p50 ms':>9} {'p99 ms':>9} {'turns/s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sessions in args.sessions:
+            p50, p99, throughput = asyncio.run(run_level(sessions, args, tmp))
+            print(f"{sessions:>8} {p50 * 1000:9.1f} {p99 * 1000:9.1f} {throughput:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
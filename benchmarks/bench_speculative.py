@@ -0,0 +1,113 @@
+"""
+End of answer to start of feedback audio, with and without speculative drafts.
+
+Each answer is a WAV of speech segments (one thinking pause in the middle
+is long enough to start a draft that is later replaced) replayed in real
+time through listen_vad and the adaptive Endpointer, as app_memory.py
+captures it. A streaming fake backend reveals each segment's words when
+the VAD closes it. Feedback comes from FakeChatModel through the app's
+RunnableWithMessageHistory, or from a speculative draft. The local first
+pass is left out, so the first sentence spoken is the model's.
+
+    python -m benchmarks.bench_speculative --answers 4
+"""
+import os
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from batch_eval import read_constant
+from benchmarks.fakes import FakeChatModel, FakeStreamingBackend, NullTTS, WavMicrophone, write_speech_wav
+from history_store import HistoryStore
+from history_window import WindowedChatHistory
+from interview_engine import InterviewEngine
+from llm_client import percentile
+from response_log import ResponseLog
+from prompts import feedback_inputs, feedback_prompt, turn_message
+from server import build_feedback_runnable
+from speculative import SpeculativeFeedback
+from vad import Endpointer, listen_vad
+
+SEGMENTS = [
+    "I led the migration of our recommendation model",
+    "from batch scoring to a real time service",
+    "we cut latency from seconds to about forty milliseconds",
+    "and I measured the impact with an online experiment",
+]
+BURSTS = [1.6, 1.8, 1.8, 1.6]
+PAUSES = [0.3, 0.7, 0.3]
+QUESTIONS = [f"Tell me about a project you are proud of, part {i + 1}?" for i in range(8)]
+
+
+def run(args, wav, tmp, speculative):
+    store = HistoryStore(os.path.join(tmp, f"memory_{speculative}.db"))
+    template = read_constant("app_memory.py", "feedback_template")
+    llm = FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency)
+    runnable = build_feedback_runnable(llm, store, template)
+    # Same prompt and model, without the history wrapper
+    draft_chain = feedback_prompt(template) | llm
+    session_id = f"bench_{speculative}"
+
+    def history():
+        return WindowedChatHistory(session_id, store, log_tokens=False)
+
+    def draft(question, answer, followup_question):
+        return draft_chain.stream({**feedback_inputs(question, answer, followup_question), "history": history().messages})
+
+    def commit(question, answer, followup_question, text):
+        history().add_messages([HumanMessage(content=turn_message(question, answer)), AIMessage(content=text)])
+
+    speculation = SpeculativeFeedback(draft, commit) if speculative else None
+    endpointer = Endpointer(max_pause=2)
+
+    def listen():
+        backend = FakeStreamingBackend(SEGMENTS, latency=args.stt_latency)
+        with WavMicrophone(wav, speed=1) as source:
+            return listen_vad(source, backend, endpointer,
+                              on_partial=speculation.update if speculation else None,
+                              on_pause=speculation.pause if speculation else None)
+
+    def stream_feedback(question, answer, followup_question):
+        def generate():
+            return runnable.stream(feedback_inputs(question, answer, followup_question),
+                                   config={"configurable": {"session_id": session_id}})
+        if speculation:
+            return speculation.take(question, answer, followup_question, generate)
+        return generate()
+
+    engine = InterviewEngine(
+        QUESTIONS[:args.answers], listen=listen, stream_feedback=stream_feedback, speak=NullTTS().speak,
+        response_log=ResponseLog(session_id, os.path.join(tmp, "responses")), output_file=None,
+        speech_ended=lambda: endpointer.ended_at, speculate=speculation,
+    )
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(engine.run())
+    return engine.stage_times["answer_to_audio"], speculation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--answers", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="time to first token")
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--stt-latency", type=float, default=0.3, help="time to transcribe the last segment")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wav = os.path.join(tmp, "answer.wav")
+        write_speech_wav(wav, BURSTS, PAUSES, lead=0.5, tail=4.0)
+        print(f"{args.answers} answers; LLM first token {args.llm_latency:g}s, STT finish {args.stt_latency:g}s\n")
+        print(f"{'mode':<12} {'p50 ms':>8} {'max ms':>8}")
+        for speculative in (False, True):
+            times, speculation = run(args, wav, tmp, speculative)
+            print(f"{'speculative' if speculative else 'baseline':<12} {percentile(times, 50) * 1000:8.0f} "
+                  f"{max(times) * 1000:8.0f}")
+            if speculation:
+                print(f"\n🔮 {speculation.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Startup cost of the app entry points, measured with `python -X importtime`.
+
+Imports each module in a fresh interpreter --repeat times, reports the median
+cumulative import time and process wall time, plus the slowest imports of
+the last run, and exits non-zero when a module goes over --budget-ms.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --modules app app_memory app_new --budget-ms 250
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_once(module):
+    """Returns (wall seconds, {module: (self us, cumulative us)}) for one cold import."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            # Top-level imports have no indent; keep those over nested duplicates
+            if name not in timings or not indent:
+                timings[name] = (int(self_us), int(cumulative_us))
+    return wall, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", nargs="+", default=["app", "app_memory"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="max median import time per module")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per module")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        try:
+            runs = [import_once(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"\n{module}: import failed ({e})")
+            over_budget.append(module)
+            continue
+        import_ms = statistics.median(timings[module][1] for _, timings in runs) / 1000
+        wall_ms = statistics.median(wall for wall, _ in runs) * 1000
+        status = "✅" if import_ms <= args.budget_ms else "❌"
+        print(f"\n{status} {module}: import {import_ms:.1f} ms, process {wall_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+        slowest = sorted(runs[-1][1].items(), key=lambda item: -item[1][0])[:args.top]
+        for name, (self_us, cumulative_us) in slowest:
+            print(f"  {name:<40} self {self_us / 1000:7.1f} ms  cumulative {cumulative_us / 1000:7.1f} ms")
+        if import_ms > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        sys.exit(f"\n❌ Over the startup budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
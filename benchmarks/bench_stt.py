@@ -0,0 +1,108 @@
+"""
+Real-time factor and end-of-speech latency of the speech-to-text backends.
+
+Every WAV fixture is fed to each backend in microphone-sized chunks. RTF is
+processing time divided by audio duration (below 1.0 keeps up with live
+speech) and "final" is how long finish() takes after the last chunk, i.e. the
+wait between end of speech and a usable transcript. If a fixture has a .txt
+file next to it, the word error rate is reported too.
+
+    python -m benchmarks.bench_stt --backends vosk whisper google
+    python -m benchmarks.bench_stt --render   # create fixtures from the question texts
+"""
+import os
+import glob
+import time
+import wave
+import argparse
+
+from audioop_compat import audioop
+from recognizers import get_backend
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+CHUNK_FRAMES = 1024
+
+
+def read_wav(path):
+    """Returns 16-bit mono PCM and its sample rate."""
+    with wave.open(path, 'rb') as f:
+        pcm = f.readframes(f.getnframes())
+        width, channels, rate = f.getsampwidth(), f.getnchannels(), f.getframerate()
+    if channels == 2:
+        pcm = audioop.tomono(pcm, width, 0.5, 0.5)
+    if width != 2:
+        pcm = audioop.lin2lin(pcm, width, 2)
+    return pcm, rate
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[-1] / max(len(ref), 1)
+
+
+def run(backend, pcm, rate):
+    step = CHUNK_FRAMES * 2
+    start = time.perf_counter()
+    backend.start(rate, 2)
+    for offset in range(0, len(pcm), step):
+        backend.accept(pcm[offset:offset + step])
+    end_of_speech = time.perf_counter()
+    try:
+        transcript = backend.finish()
+    except Exception:
+        transcript = ""
+    done = time.perf_counter()
+    return transcript, done - start, done - end_of_speech
+
+
+def render_fixtures():
+    from tts_audio import synthesize
+    from question_audio import collect_question_banks
+
+    os.makedirs(FIXTURES, exist_ok=True)
+    texts = dict.fromkeys(t for bank in collect_question_banks().values() for t in bank)
+    for i, text in enumerate(texts):
+        name = os.path.join(FIXTURES, f"question_{i:02d}")
+        with open(name + ".wav", 'wb') as f:
+            f.write(synthesize(text))
+        with open(name + ".txt", 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(f"Rendered {len(texts)} fixtures into {FIXTURES}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backends", nargs="+", default=["vosk", "whisper"])
+    parser.add_argument("--fixtures", default=os.path.join(FIXTURES, "*.wav"))
+    parser.add_argument("--render", action="store_true")
+    args = parser.parse_args()
+
+    if args.render:
+        render_fixtures()
+    paths = sorted(glob.glob(args.fixtures))
+    if not paths:
+        parser.error(f"no fixtures match {args.fixtures} (use --render to create some)")
+
+    print(f"{'backend':<8} {'fixture':<24} {'audio s':>8} {'RTF':>6} {'final ms':>9} {'WER':>6}")
+    for name in args.backends:
+        backend = get_backend(name)
+        for path in paths:
+            pcm, rate = read_wav(path)
+            duration = len(pcm) / 2 / rate
+            transcript, elapsed, final = run(backend, pcm, rate)
+            reference = os.path.splitext(path)[0] + ".txt"
+            wer = "-"
+            if os.path.exists(reference):
+                with open(reference, encoding='utf-8') as f:
+                    wer = f"{word_error_rate(f.read(), transcript):.2f}"
+            print(f"{name:<8} {os.path.basename(path):<24} {duration:8.2f} "
+                  f"{elapsed / duration:6.2f} {final * 1000:9.1f} {wer:>6}")
+
+
+if __name__ == "__main__":
+    main()
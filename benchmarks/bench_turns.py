@@ -0,0 +1,311 @@
+"""
+Offline benchmark of the interview turn loop, with fake LLM, microphone and TTS.
+
+Drives the app_memory.py turn logic (InterviewEngine with streamed feedback,
+microphone capture and spoken sentences) and the app_new.py turn logic
+(feedback cache, one LLM call, response log) against a scratch SQLite
+history. Feedback goes through the apps' own feedback_turn functions and a
+ResilientLLM client, as in the apps. Questions and feedback templates are read from the app files, the
+LLM is benchmarks.fakes.FakeChatModel, the microphone replays a WAV answer
+and speech goes to a NullTTS sink.
+
+Reports throughput, turn latency percentiles and peak Python memory per
+scenario. --check compares the stable ones to benchmarks/baseline.json and
+exits non-zero on a regression beyond --tolerance. Turn times are checked as
+ratios to a reference turn measured in the same process (the fakes alone,
+without the app code), so a loaded or slower machine scales both sides;
+tail percentiles are reported but not checked, since a handful of turns
+cannot pin them down.
+
+    python -m benchmarks.bench_turns
+    python -m benchmarks.bench_turns --check
+    python -m benchmarks.bench_turns --update-baseline
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import statistics
+
+import speech_recognition as sr
+
+from audio_capture import AudioCapture
+from batch_eval import read_constant
+from benchmarks.fakes import FakeChatModel, FakeSpeechBackend, NullTTS, WavMicrophone, write_answer_wav
+from feedback_cache import FeedbackCache
+import feedback_turn
+from history_store import HistoryStore
+from interview_engine import InterviewEngine
+from llm_client import ResilientLLM, local_fallback
+from local_feedback import LocalFeedback
+from question_bank import get_question_bank
+from response_log import ResponseLog
+from server import build_feedback_runnable
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Distinct enough that the feedback cache only hits when an answer comes round again
+ANSWERS = [
+    "I want to visit my sister who lives in Toronto for her wedding in June",
+    "My company is sending me to a two week training course at the head office",
+    "I have been to Germany and Japan for conferences and always came back on time",
+    "Yes, I bought a comprehensive policy that covers medical emergencies and cancellations",
+    "I work as a software engineer at a bank and have been there for six years",
+    "This is the only time my whole family can take leave together this year",
+    "I am going to study a one year master's programme in data science",
+]
+
+# Question bank each app interviews from
+APP_BANKS = {"app_memory": "ml", "app_new": "visa"}
+
+# Metrics where a larger value is better; every other metric is a cost
+HIGHER_IS_BETTER = {"turns_per_ref"}
+
+# Metrics --check compares against the baseline (see checked_metrics)
+CHECKED = ("turn_p50_x", "turn_mean_x", "turns_per_ref", "peak_mem_mb", "first_audio_p50_ms")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Scenario:
+    """Shared fakes and scratch storage for one scenario run."""
+
+    def __init__(self, app, args, tmp):
+        bank = get_question_bank()
+        self.questions = bank.questions(APP_BANKS[app])
+        self.key_points = bank.key_points
+        self.store = HistoryStore(os.path.join(tmp, f"{app}_memory.db"))
+        self.cache = FeedbackCache(os.path.join(tmp, f"{app}_cache.db"))
+        self.llm = FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency, seed=args.seed)
+        # The apps' client: the app's prompt and history window behind ResilientLLM
+        self.runnable = ResilientLLM(
+            build_feedback_runnable(self.llm, self.store, read_constant(f"{app}.py", "feedback_template")),
+            local_fallback=local_fallback(self.key_points, first_pass_spoken=True),
+        )
+        self.local = LocalFeedback(key_points=self.key_points)
+        self.tts = NullTTS()
+        self.log_dir = os.path.join(tmp, f"{app}_responses")
+        self.args = args
+
+    def stream_feedback(self, session_id):
+        # run_mock_interview's stream_feedback in app_memory.py
+        def stream_feedback(question, answer, followup_question):
+            return feedback_turn.stream_feedback(
+                self.local, self.cache, question, answer, followup_question,
+                lambda: feedback_turn.llm_stream(self.runnable, session_id, question, answer, followup_question)
+            )
+        return stream_feedback
+
+    def feedback(self, session_id, question, answer, followup_question):
+        # get_llm_feedback in app_new.py, with the first-pass sentence shown nowhere
+        return feedback_turn.feedback(question, answer, followup_question, self.cache, lambda: self.runnable,
+                                      session_id, key_points=self.key_points(question), show=lambda text: None)
+
+
+class TimedResponseLog(ResponseLog):
+    """Notes when each turn reaches the persist stage."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.appended = []
+
+    def append(self, response):
+        self.appended.append(time.perf_counter())
+        super().append(response)
+
+
+def run_app_memory(scenario, session, wav):
+    """One app_memory.py interview; returns (turn latencies, time to first audio)."""
+    args = scenario.args
+    session_id = f"bench_{session}"
+    recognizer = sr.Recognizer()
+    recognizer.pause_threshold = 0.5
+    capture = AudioCapture(recognizer, WavMicrophone(wav, speed=args.mic_speed), calibration_seconds=0.2)
+    answers = iter(ANSWERS[(session + i) % len(ANSWERS)] for i in range(len(scenario.questions)))
+
+    captured = []
+
+    def listen():
+        backend = FakeSpeechBackend(latency=args.stt_latency, transcript=next(answers))
+        answer = capture.listen_streaming(backend)
+        captured.append(time.perf_counter())
+        return answer
+
+    response_log = TimedResponseLog(session_id, scenario.log_dir)
+
+    engine = InterviewEngine(
+        scenario.questions,
+        listen=listen,
+        stream_feedback=scenario.stream_feedback(session_id),
+        speak=scenario.tts.speak,
+        response_log=response_log,
+        output_file=None,
+    )
+    try:
+        asyncio.run(engine.run())
+    finally:
+        capture.close()
+    # A turn is answer captured -> feedback generated, spoken and handed to the log
+    turns = [done - start for start, done in zip(captured, response_log.appended)]
+    return turns, engine.stage_times["first_audio"]
+
+
+def run_app_new(scenario, session, wav):
+    """One app_new.py interview; returns (turn latencies, [])."""
+    session_id = f"bench_{session}"
+    turns = []
+    with ResponseLog(session_id, scenario.log_dir) as response_log:
+        for i, question in enumerate(scenario.questions):
+            start = time.perf_counter()
+            answer = FakeSpeechBackend(latency=scenario.args.stt_latency,
+                                       transcript=ANSWERS[(session + i) % len(ANSWERS)]).finish()
+            followup = scenario.questions[i + 1] if i + 1 < len(scenario.questions) else "No further questions."
+            feedback = scenario.feedback(session_id, question, answer, followup)
+            response_log.append({"question": question, "answer": answer, "feedback": feedback})
+            scenario.tts.synthesize(followup)
+            turns.append(time.perf_counter() - start)
+    return turns, []
+
+
+SCENARIOS = {
+    "app_memory": run_app_memory,
+    "app_new": run_app_new,
+}
+
+
+def reference_turn_ms(args, turns=20):
+    """
+    Median time of one turn's fake services alone (STT, then a streamed LLM
+    reply), with no app code around them: the yardstick for checked turn times.
+    """
+    llm = FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency, seed=args.seed)
+    times = []
+    for i in range(turns):
+        start = time.perf_counter()
+        answer = FakeSpeechBackend(latency=args.stt_latency, transcript=ANSWERS[i % len(ANSWERS)]).finish()
+        for _ in llm.stream(f"Answer: {answer}"):
+            pass
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def measure(app, args, wav):
+    with tempfile.TemporaryDirectory() as tmp:
+        scenario = Scenario(app, args, tmp)
+        run = SCENARIOS[app]
+        turns, first_audio = [], []
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for session in range(args.sessions):
+                session_turns, session_first_audio = run(scenario, session, wav)
+                turns += session_turns
+                first_audio += session_first_audio
+        elapsed = time.perf_counter() - start
+
+        # Memory is traced on a separate session; tracemalloc would skew the timings
+        tracemalloc.start()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            run(scenario, args.sessions, wav)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    reference_ms = reference_turn_ms(args)
+    metrics = {
+        "reference_turn_ms": reference_ms,
+        "turns_per_s": len(turns) / elapsed,
+        "turn_p50_ms": percentile(turns, 50) * 1000,
+        "turn_p95_ms": percentile(turns, 95) * 1000,
+        "turn_p99_ms": percentile(turns, 99) * 1000,
+        "turn_mean_ms": statistics.fmean(turns) * 1000,
+        "peak_mem_mb": peak / 1024 ** 2,
+    }
+    if first_audio:
+        metrics["first_audio_p50_ms"] = percentile(first_audio, 50) * 1000
+        metrics["first_audio_p95_ms"] = percentile(first_audio, 95) * 1000
+    return metrics
+
+
+def checked_metrics(metrics):
+    """The metrics --check compares: turn times as multiples of the reference turn."""
+    reference_ms = metrics["reference_turn_ms"]
+    derived = {
+        "turn_p50_x": metrics["turn_p50_ms"] / reference_ms,
+        "turn_mean_x": metrics["turn_mean_ms"] / reference_ms,
+        "turns_per_ref": metrics["turns_per_s"] * reference_ms / 1000,
+    }
+    return {name: value for name, value in {**metrics, **derived}.items() if name in CHECKED}
+
+
+def regressions(results, baseline, tolerance, floor_ms=5.0):
+    """
+    Returns a line per metric that is worse than the baseline by more than
+    `tolerance`. Millisecond metrics may also be `floor_ms` worse, since a few
+    milliseconds of scheduler noise is a large fraction of a small metric.
+    """
+    failures = []
+    for app, metrics in results.items():
+        for name, value in metrics.items():
+            expected = baseline.get(app, {}).get(name)
+            if expected is None:
+                continue
+            if name in HIGHER_IS_BETTER:
+                worse = value < expected * (1 - tolerance)
+            else:
+                worse = value > expected * (1 + tolerance) + (floor_ms if name.endswith("_ms") else 0)
+            if worse:
+                failures.append(f"{app}.{name}: {value:.2f} vs baseline {expected:.2f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake time to first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="fake time per streamed word (s)")
+    parser.add_argument("--stt-latency", type=float, default=0.02)
+    parser.add_argument("--mic-speed", type=float, default=20.0, help="WAV playback speed, 0 = unpaced")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--floor-ms", type=float, default=5.0, help="absolute slack on millisecond metrics")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        wav = write_answer_wav(os.path.join(tmp, "answer.wav"))
+        for app in args.scenarios:
+            results[app] = measure(app, args, wav)
+            print(f"\n{app}")
+            for name, value in {**results[app], **checked_metrics(results[app])}.items():
+                print(f"  {name:<20} {value:10.2f}")
+
+    checked = {app: checked_metrics(metrics) for app, metrics in results.items()}
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding='utf-8') as f:
+            json.dump({app: {k: round(v, 3) for k, v in metrics.items()} for app, metrics in checked.items()},
+                      f, indent=4)
+        print(f"\n✅ Baseline written to {args.baseline}")
+    elif args.check:
+        with open(args.baseline, encoding='utf-8') as f:
+            failures = regressions(checked, json.load(f), args.tolerance, args.floor_ms)
+        if failures:
+            print(f"\n❌ Regressions beyond {args.tolerance:.0%}:")
+            for line in failures:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
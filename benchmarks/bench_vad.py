@@ -0,0 +1,93 @@
+"""
+End-of-answer detection: dead time after an answer vs. premature cutoffs.
+
+Writes WAV fixtures for candidates with different pause habits (several
+answers each, made of voiced bursts separated by mid-answer pauses) and
+replays them through vad.listen_vad with fixed pause thresholds and with the
+adaptive Endpointer. Each candidate is one session, so the adaptive policy
+learns across their answers as it would in an interview.
+
+Dead time is how long the endpointer waited after the true end of speech;
+a premature cutoff is an answer that was ended during a mid-answer pause.
+
+    python -m benchmarks.bench_vad --answers 8
+"""
+import os
+import random
+import argparse
+import tempfile
+import statistics
+
+from benchmarks.fakes import FakeSpeechBackend, WavMicrophone, write_speech_wav
+from vad import Endpointer, get_vad, listen_vad
+
+# Range of mid-answer pauses (seconds) for each kind of candidate
+SPEAKERS = {
+    "brisk": (0.2, 0.5),
+    "measured": (0.4, 0.9),
+    "hesitant": (0.7, 1.5),
+}
+
+POLICIES = {
+    "fixed 0.8s (sr default)": lambda: Endpointer(initial_pause=0.8, adaptive=False),
+    "fixed 2.0s (app_memory)": lambda: Endpointer(initial_pause=2.0, adaptive=False),
+    "adaptive": lambda: Endpointer(),
+}
+
+
+def write_fixtures(directory, answers, seed):
+    """Returns {speaker: [(path, speech_end), ...]}."""
+    rng = random.Random(seed)
+    fixtures = {}
+    for speaker, (shortest, longest) in SPEAKERS.items():
+        fixtures[speaker] = []
+        for i in range(answers):
+            bursts = [rng.uniform(0.4, 1.5) for _ in range(rng.randint(3, 7))]
+            pauses = [rng.uniform(shortest, longest) for _ in bursts[1:]]
+            path = os.path.join(directory, f"{speaker}_{i}.wav")
+            speech_end = write_speech_wav(path, bursts, pauses, lead=0.5, tail=3.0, seed=i)
+            fixtures[speaker].append((path, speech_end))
+    return fixtures
+
+
+def run_session(policy, answers, vad_name):
+    """Returns (dead times, premature cutoffs) over one candidate's answers."""
+    endpointer = POLICIES[policy]()
+    dead_times, premature = [], 0
+    for path, speech_end in answers:
+        with WavMicrophone(path, speed=0) as source:
+            listen_vad(source, FakeSpeechBackend(latency=0), endpointer, get_vad(vad_name))
+        # Allow one frame of slack for where the VAD puts the end of the last word
+        if endpointer.position < speech_end - 0.05:
+            premature += 1
+        else:
+            dead_times.append(endpointer.position - speech_end)
+    return dead_times, premature
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--answers", type=int, default=8, help="answers per candidate")
+    parser.add_argument("--vad", default=None, help="energy or webrtc (default: VAD env var or energy)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = write_fixtures(tmp, args.answers, args.seed)
+        print(f"{'policy':<26} {'speaker':<10} {'dead mean s':>11} {'dead p90 s':>10} {'cut off':>8}")
+        for policy in POLICIES:
+            all_dead, all_premature = [], 0
+            for speaker, answers in fixtures.items():
+                dead_times, premature = run_session(policy, answers, args.vad)
+                all_dead += dead_times
+                all_premature += premature
+                mean = statistics.fmean(dead_times) if dead_times else float("nan")
+                p90 = sorted(dead_times)[int(len(dead_times) * 0.9)] if dead_times else float("nan")
+                print(f"{policy:<26} {speaker:<10} {mean:11.2f} {p90:10.2f} {premature:>3}/{len(answers):<4}")
+            total = sum(len(answers) for answers in fixtures.values())
+            print(f"{policy:<26} {'all':<10} {statistics.fmean(all_dead):11.2f} {'':>10} "
+                  f"{all_premature:>3}/{total:<4}\n")
+
+
+if __name__ == "__main__":
+    main()
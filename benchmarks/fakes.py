@@ -0,0 +1,337 @@
+"""Deterministic stand-ins for the external services, for benchmarking offline."""
+import math
+import time
+import wave
+import random
+import struct
+import asyncio
+import threading
+
+import speech_recognition as sr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from recognizers import SpeechBackend
+
+FEEDBACK = (
+    "That's a clear and direct answer, which is a good start. "
+    "You could make it stronger by adding one concrete detail that supports it. "
+    "Now for your next question: {followup}"
+)
+
+
+class FakeLLMError(Exception):
+    """Raised by FakeChatModel to simulate a failed API call."""
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers with canned feedback after a configurable delay.
+
+    Latency is drawn from a normal distribution around `latency`, and a
+    `failure_rate` fraction of calls raise FakeLLMError. `seed` makes the
+    sequence of delays and failures repeatable. When streamed, `latency` is
+    the time to the first token and every further word takes `token_latency`.
+    """
+
+    latency: float = 0.5
+    jitter: float = 0.0
+    token_latency: float = 0.0
+    failure_rate: float = 0.0
+    seed: int = 0
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _delay(self):
+        delay = max(0.0, self._rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        failed = self._rng.random() < self.failure_rate
+        return delay, failed
+
+    def _text(self, messages):
+        prompt = messages[-1].content if messages else ""
+        followup = "No further questions."
+        for line in prompt.splitlines():
+            for label in ("NEXT QUESTION IN QUEUE:", "Next question:"):
+                if line.strip().startswith(label):
+                    followup = line.strip()[len(label):].strip()
+        return FEEDBACK.format(followup=followup)
+
+    def _reply(self, messages):
+        text = self._text(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _tokens(self, messages):
+        words = self._text(messages).split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, failed = self._delay()
+        time.sleep(delay)
+        if failed:
+            raise FakeLLMError("simulated API failure")
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, failed = self._delay()
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeLLMError("simulated API failure")
+        return self._reply(messages)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, failed = self._delay()
+        time.sleep(delay)
+        if failed:
+            raise FakeLLMError("simulated API failure")
+        for i, token in enumerate(self._tokens(messages)):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, failed = self._delay()
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeLLMError("simulated API failure")
+        for i, token in enumerate(self._tokens(messages)):
+            if i and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FaultyChatModel(FakeChatModel):
+    """
+    FakeChatModel with the faults a hosted model shows, for exercising llm_client.
+
+    On top of FakeChatModel's latency and failure_rate: a `slow_rate` fraction
+    of calls take `slow_latency` seconds (the long tail), a `hang_rate`
+    fraction take `hang_seconds` (a stuck request), calls number
+    `outage_start` to `outage_start + outage_calls - 1` all fail (an outage,
+    which should open the circuit breaker), and a `break_rate` fraction of
+    streams fail half way through.
+    """
+
+    slow_rate: float = 0.0
+    slow_latency: float = 5.0
+    hang_rate: float = 0.0
+    hang_seconds: float = 60.0
+    outage_start: float = 0.0
+    outage_seconds: float = 0.0
+    break_rate: float = 0.0
+    _first_call: float = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "faulty-fake-chat"
+
+    def _fault(self):
+        """(delay, failed, broken) for the next call."""
+        now = time.monotonic()
+        with self._lock:
+            if self._first_call is None:
+                self._first_call = now
+            delay, failed = super()._delay()
+            roll = self._rng.random()
+            broken = self._rng.random() < self.break_rate
+        if roll < self.hang_rate:
+            delay = self.hang_seconds
+        elif roll < self.hang_rate + self.slow_rate:
+            delay = self.slow_latency
+        if self.outage_start <= now - self._first_call < self.outage_start + self.outage_seconds:
+            failed = True
+        return delay, failed, broken
+
+    def _delay(self):
+        delay, failed, _ = self._fault()
+        return delay, failed
+
+    def _chunks(self, messages, broken):
+        tokens = self._tokens(messages)
+        break_at = len(tokens) // 2 if broken else None
+        for i, token in enumerate(tokens):
+            if i == break_at:
+                raise FakeLLMError("simulated stream interruption")
+            yield i, ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, failed, broken = self._fault()
+        time.sleep(delay)
+        if failed:
+            raise FakeLLMError("simulated API failure")
+        for i, chunk in self._chunks(messages, broken):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, failed, broken = self._fault()
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeLLMError("simulated API failure")
+        for i, chunk in self._chunks(messages, broken):
+            if i and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield chunk
+
+
+class FakeSpeechBackend(SpeechBackend):
+    """Speech backend that returns a fixed transcript after `latency` seconds."""
+
+    name = "fake"
+
+    def __init__(self, latency=0.2, transcript="because I want to travel with family"):
+        self.latency = latency
+        self.transcript = transcript
+
+    def finish(self):
+        time.sleep(self.latency)
+        return self.transcript
+
+
+class FakeStreamingBackend(SpeechBackend):
+    """
+    Streaming backend with a fixed transcript, revealed one speech segment
+    at a time: a segment's words show up in the partial transcript once the
+    VAD closes it (end_segment), the way whisper commits segments. finish()
+    takes `latency` seconds, the time to transcribe the last bit.
+    """
+
+    name = "fake-streaming"
+
+    def __init__(self, segments, latency=0.2):
+        self.segments = list(segments)
+        self.latency = latency
+
+    def start(self, sample_rate, sample_width=2):
+        super().start(sample_rate, sample_width)
+        self.revealed = 0
+
+    def accept(self, chunk):
+        return " ".join(self.segments[:self.revealed])
+
+    def end_segment(self):
+        self.revealed = min(len(self.segments), self.revealed + 1)
+
+    def finish(self):
+        time.sleep(self.latency)
+        return " ".join(self.segments)
+
+
+def write_speech_wav(path, bursts, pauses=(), lead=1.0, tail=1.0, rate=16000, seed=0):
+    """
+    Writes a WAV of voiced bursts (seconds each) separated by `pauses`, with
+    quiet background noise throughout. Returns the time speech ends.
+    """
+    rng = random.Random(seed)
+    layout = [(lead, False)]
+    for i, burst in enumerate(bursts):
+        layout.append((burst, True))
+        if i < len(bursts) - 1:
+            layout.append((pauses[i], False))
+    layout.append((tail, False))
+
+    frames = bytearray()
+    t = 0.0
+    speech_end = 0.0
+    for seconds, voiced in layout:
+        for _ in range(int(seconds * rate)):
+            sample = rng.randint(-60, 60)
+            if voiced:
+                sample += int(6000 * math.sin(2 * math.pi * 180 * t) * (0.6 + 0.4 * math.sin(2 * math.pi * 3 * t)))
+            frames += struct.pack("<h", sample)
+            t += 1 / rate
+        if voiced:
+            speech_end = t
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(bytes(frames))
+    return speech_end
+
+
+def write_answer_wav(path, speech_seconds=1.5, silence_seconds=1.0, rate=16000):
+    """
+    Writes a WAV that a recognizer hears as one answer: quiet background
+    noise, a loud voiced section, then quiet again.
+    """
+    write_speech_wav(path, [speech_seconds], lead=silence_seconds, tail=silence_seconds, rate=rate)
+    return path
+
+
+class _LoopingWavStream:
+    def __init__(self, frames, sample_rate, sample_width, speed):
+        self.frames = frames
+        self.position = 0
+        self.bytes_per_second = sample_rate * sample_width
+        self.speed = speed
+
+    def read(self, size):
+        out = bytearray()
+        while len(out) < size:
+            piece = self.frames[self.position:self.position + size - len(out)]
+            out += piece
+            self.position = (self.position + len(piece)) % len(self.frames)
+        # Pace reads like a real device, `speed` times faster than real time
+        if self.speed:
+            time.sleep(size / self.bytes_per_second / self.speed)
+        return bytes(out)
+
+    def close(self):
+        pass
+
+
+class WavMicrophone(sr.AudioSource):
+    """
+    Drop-in for sr.Microphone that plays a mono WAV file on a loop, so every
+    listen() hears the recorded answer again. `speed` paces reads (1.0 is
+    real time, 0 reads as fast as possible).
+    """
+
+    def __init__(self, path, chunk_size=1024, speed=1.0):
+        with wave.open(path, 'rb') as f:
+            if f.getnchannels() != 1:
+                raise ValueError("WavMicrophone needs a mono WAV file")
+            self.SAMPLE_RATE = f.getframerate()
+            self.SAMPLE_WIDTH = f.getsampwidth()
+            self._frames = f.readframes(f.getnframes())
+        self.CHUNK = chunk_size
+        self.speed = speed
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = _LoopingWavStream(self._frames, self.SAMPLE_RATE, self.SAMPLE_WIDTH, self.speed)
+        return self
+
+    def __exit__(self, *exc):
+        self.stream = None
+
+
+class NullTTS:
+    """Speech sink that only counts what it was asked to say, optionally taking `seconds_per_word`."""
+
+    def __init__(self, seconds_per_word=0.0):
+        self.seconds_per_word = seconds_per_word
+        self.calls = 0
+        self.chars = 0
+        self._lock = threading.Lock()
+
+    def speak(self, text):
+        with self._lock:
+            self.calls += 1
+            self.chars += len(text)
+        if self.seconds_per_word:
+            time.sleep(len(text.split()) * self.seconds_per_word)
+
+    def synthesize(self, text, voice=None, rate=150):
+        self.speak(text)
+        return b""
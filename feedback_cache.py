@@ -0,0 +1,183 @@
+import re
+import math
+import time
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+from tts_stream import chunk_text
+
+WORD = re.compile(r"[a-z0-9']+")
+
+# Answers that differ only in these words mean opposite things, so they never match
+NEGATIONS = {"no", "not", "never", "don't", "dont", "didn't", "haven't", "havent", "can't", "cannot", "won't"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback_cache (
+    question TEXT NOT NULL,
+    answer_key TEXT NOT NULL,
+    feedback TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (question, answer_key)
+);
+"""
+
+
+def normalize_answer(text):
+    """Lowercases and strips punctuation and extra whitespace."""
+    return " ".join(WORD.findall(text.lower()))
+
+
+def embed(text):
+    """Character trigram counts of a normalized answer; tolerant to small wording changes."""
+    padded = f" {text} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def cosine(a, a_norm, b, b_norm):
+    if not a_norm or not b_norm:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b.get(gram, 0) for gram, count in a.items()) / (a_norm * b_norm)
+
+
+class FeedbackCache:
+    """
+    Reuses LLM feedback for near-identical answers to the same question.
+
+    Entries live in an in-memory LRU with a TTL and are mirrored to SQLite so
+    the cache survives restarts. Answers are matched exactly after
+    normalization first, then by cosine similarity against the other cached
+    answers for the same question.
+    """
+
+    def __init__(self, path="feedback_cache.db", threshold=0.9, max_entries=5000,
+                 ttl=7 * 24 * 3600, embed=embed):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed = embed
+        self.entries = OrderedDict()
+        self.by_question = {}
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._miss_latency = None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._load()
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT question, answer_key, feedback, created_at FROM feedback_cache "
+            "WHERE created_at > ? ORDER BY created_at DESC LIMIT ?",
+            (time.time() - self.ttl, self.max_entries)
+        ).fetchall()
+        for question, answer_key, feedback, created_at in reversed(rows):
+            self._remember(question, answer_key, feedback, created_at)
+
+    def _remember(self, question, answer_key, feedback, created_at):
+        vector = self.embed(answer_key)
+        key = (question, answer_key)
+        self.entries[key] = {
+            "feedback": feedback,
+            "created_at": created_at,
+            "vector": vector,
+            "norm": math.sqrt(sum(c * c for c in vector.values())),
+            "negations": NEGATIONS.intersection(answer_key.split()),
+        }
+        self.entries.move_to_end(key)
+        self.by_question.setdefault(question, set()).add(key)
+
+    def _forget(self, key):
+        self.entries.pop(key, None)
+        self.by_question.get(key[0], set()).discard(key)
+        with self._db:
+            self._db.execute("DELETE FROM feedback_cache WHERE question = ? AND answer_key = ?", key)
+
+    def get(self, question, answer):
+        """Returns cached feedback for the answer, or None."""
+        answer_key = normalize_answer(answer)
+        now = time.time()
+        with self._lock:
+            key = (question, answer_key)
+            if key not in self.entries:
+                key = self._nearest(question, answer_key)
+            if key is not None and now - self.entries[key]["created_at"] > self.ttl:
+                self._forget(key)
+                key = None
+            if key is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            if key[1] != answer_key:
+                self.near_hits += 1
+            self.saved_seconds += self._miss_latency or 0.0
+            return self.entries[key]["feedback"]
+
+    def _nearest(self, question, answer_key):
+        vector = self.embed(answer_key)
+        norm = math.sqrt(sum(c * c for c in vector.values()))
+        negations = NEGATIONS.intersection(answer_key.split())
+        best, best_score = None, self.threshold
+        for key in self.by_question.get(question, ()):
+            entry = self.entries[key]
+            if entry["negations"] != negations:
+                continue
+            score = cosine(vector, norm, entry["vector"], entry["norm"])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def put(self, question, answer, feedback, latency=None):
+        answer_key = normalize_answer(answer)
+        now = time.time()
+        with self._lock:
+            if latency is not None:
+                # Moving average of what a miss costs, used to estimate time saved by hits
+                self._miss_latency = latency if self._miss_latency is None else 0.8 * self._miss_latency + 0.2 * latency
+            self._remember(question, answer_key, feedback, now)
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO feedback_cache (question, answer_key, feedback, created_at) VALUES (?, ?, ?, ?)",
+                    (question, answer_key, feedback, now)
+                )
+            while len(self.entries) > self.max_entries:
+                self._forget(next(iter(self.entries)))
+
+    def stream(self, question, answer, make_stream):
+        """
+        Yields cached feedback as a single chunk on a hit; otherwise passes the
+        LLM stream through and caches the full text once it completes (unless
+        part of it came from a fallback).
+        """
+        cached = self.get(question, answer)
+        if cached is not None:
+            yield cached
+            return
+        start = time.perf_counter()
+        parts = []
+        fallback = False
+        for chunk in make_stream():
+            parts.append(chunk_text(chunk))
+            # Local fallback text (llm_client) stands in for a failed call and is not kept
+            fallback = fallback or bool(getattr(chunk, "response_metadata", {}).get("fallback"))
+            yield chunk
+        if not fallback:
+            self.put(question, answer, "".join(parts), latency=time.perf_counter() - start)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 2),
+            "entries": len(self.entries),
+            "threshold": self.threshold,
+        }
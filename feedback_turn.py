@@ -0,0 +1,77 @@
+"""
+Feedback for one answer, as the apps produce it.
+
+app_memory.py and app.py stream it (local first pass, then cached or
+streamed LLM feedback, spoken sentence by sentence); app_new.py asks for it whole (a
+local reply for trivial answers, else the cache or one LLM call).
+benchmarks/bench_turns.py drives these same functions, so what it measures
+is the apps' own turn code rather than a copy of it.
+"""
+import time
+
+from local_feedback import assess, first_pass, instant_reply
+from prompts import feedback_inputs
+from tracing import span
+
+
+def cache_key(question, followup_question):
+    return f"{question}\n{followup_question}"
+
+
+def llm_stream(runnable, session_id, question, answer, followup_question):
+    """The feedback runnable's stream for one answer, in the session's history."""
+    return runnable.stream(
+        feedback_inputs(question, answer, followup_question),
+        config={"configurable": {"session_id": session_id}}
+    )
+
+
+def stream_feedback(local_feedback, feedback_cache, question, answer, followup_question, make_stream):
+    """
+    app_memory.py and app.py: a local reply or first-pass sentence, then the cached
+    feedback or make_stream(). Cache hits skip the LLM (and so are not added
+    to the session history).
+    """
+    return local_feedback.stream(question, answer, followup_question, lambda: feedback_cache.stream(
+        cache_key(question, followup_question),
+        answer,
+        make_stream
+    ))
+
+
+def feedback(question, answer, followup_question, feedback_cache, get_runnable, session_id,
+             key_points=(), show=None):
+    """
+    app_new.py: an instant local reply for trivial answers; otherwise a
+    first-pass sentence passed to show(), then the cached feedback or one
+    call to the runnable from get_runnable(). Returns None when
+    get_runnable() returns None (no API key).
+    """
+    # Empty, unrecognized or one-word answers are answered locally, without the LLM
+    assessment = assess(answer, key_points, question=question)
+    if assessment["trivial"]:
+        return instant_reply(assessment, followup_question)
+    # A first local impression is shown while the LLM works on the full feedback
+    if show:
+        show(first_pass(assessment))
+
+    runnable = get_runnable()
+    if runnable is None:
+        return None
+
+    # Reuse feedback for near-identical answers instead of calling the LLM again
+    key = cache_key(question, followup_question)
+    cached = feedback_cache.get(key, answer)
+    if cached is not None:
+        return cached
+
+    start = time.perf_counter()
+    with span("llm.invoke"):
+        result = runnable.invoke(
+            feedback_inputs(question, answer, followup_question),
+            config={"configurable": {"session_id": session_id}}
+        )
+    # Local fallback text stands in for a failed call and is not cached
+    if not result.response_metadata.get("fallback"):
+        feedback_cache.put(key, answer, result.content, latency=time.perf_counter() - start)
+    return result.content
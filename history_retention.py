@@ -0,0 +1,283 @@
+"""
+Retention for memory.db: archive finished sessions and give their pages back.
+
+Every interview appends to message_store and nothing was ever deleted, so
+the file and every history query kept growing. Sessions that have been
+inactive for longer than max_age_days are written to gzipped JSONL files,
+one per day the session started (archive/messages_YYYY-MM-DD.jsonl.gz, a new
+gzip member per run), and only then deleted from the hot tables, one short
+transaction per session. Freed pages are returned to the filesystem with
+PRAGMA incremental_vacuum in small steps, so live sessions only ever wait
+for one step.
+
+New databases are created with auto_vacuum=INCREMENTAL by HistoryStore. An
+existing file needs one full VACUUM to switch over, which `--convert` does
+(it blocks writers for its duration, so run it while no interview is live).
+
+    python history_retention.py --max-age-days 30 [--db memory.db] [--archive-dir archive] [--convert]
+"""
+import os
+import re
+import gzip
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+import statistics
+from collections import defaultdict
+
+from history_store import SCHEMA
+from tracing import span
+
+ARCHIVE_DIR = "archive"
+SESSION_TIME = re.compile(r"session_(\d+)$")
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def db_size(conn, path):
+    """Database size in KB, on disk (including the WAL) and as free pages inside the file."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    on_disk = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    return {"file_kb": round(on_disk / 1024, 1), "free_kb": round(free * page_size / 1024, 1)}
+
+
+def query_latency(conn, sessions=20, repeats=5):
+    """Median ms to load a whole session's history (as HistoryStore.load does) for the most recent sessions."""
+    recent = [session_id for (session_id,) in conn.execute(
+        "SELECT session_id FROM session_activity ORDER BY last_active DESC LIMIT ?", (sessions,)
+    )]
+    timings = []
+    for _ in range(repeats):
+        for session_id in recent:
+            start = time.perf_counter()
+            rows = conn.execute("SELECT message FROM message_store WHERE session_id = ? ORDER BY id", (session_id,))
+            [json.loads(message) for (message,) in rows]
+            timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3) if timings else None
+
+
+def _backfill_activity(conn):
+    # Sessions written before session_activity existed: date them from a session_<unix time>
+    # id, otherwise from now, so they become eligible max_age_days after they were first seen
+    now = time.time()
+    missing = conn.execute(
+        "SELECT DISTINCT session_id FROM message_store "
+        "WHERE session_id NOT IN (SELECT session_id FROM session_activity)"
+    ).fetchall()
+    rows = []
+    for (session_id,) in missing:
+        match = SESSION_TIME.search(session_id or "")
+        started = float(match.group(1)) if match else now
+        rows.append((session_id, started, started))
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO session_activity (session_id, started, last_active) VALUES (?, ?, ?)", rows)
+    return len(rows)
+
+
+def expired_sessions(conn, max_age_days, active=()):
+    """(session_id, started) of sessions inactive for longer than max_age_days, oldest first."""
+    cutoff = time.time() - max_age_days * 86400
+    # message_store ids are max(rowid) + 1, so deleting the newest row would let ids be
+    # reused and incremental readers (analytics) would skip them; keep that session
+    newest = conn.execute(
+        "SELECT session_id FROM message_store WHERE id = (SELECT MAX(id) FROM message_store)"
+    ).fetchone()
+    keep = set(active) | ({newest[0]} if newest else set())
+    return [
+        (session_id, started) for session_id, started in conn.execute(
+            "SELECT session_id, started FROM session_activity WHERE last_active < ? ORDER BY last_active", (cutoff,)
+        ) if session_id not in keep
+    ]
+
+
+def _archive_day(archive_dir, day, sessions):
+    """Appends one gzip member with every message (and summary) of `sessions`; fsynced before returning."""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"messages_{day}.jsonl.gz")
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            for session_id, rows, summary in sessions:
+                # The stored message is already JSON, so it is embedded as is rather than re-encoded
+                for row_id, message in rows:
+                    f.write(f'{{"id": {row_id}, "session_id": {json.dumps(session_id)}, "message": {message}}}\n'.encode())
+                if summary:
+                    f.write((json.dumps({"session_id": session_id, "summary": summary[0], "covered_id": summary[1]})
+                             + "\n").encode())
+        raw.flush()
+        os.fsync(raw.fileno())
+    return path
+
+
+def archive_expired(conn, archive_dir=ARCHIVE_DIR, max_age_days=30, active=(), dry_run=False, batch=20, pause=0.02):
+    """
+    Archives and deletes expired sessions. A session is only deleted after
+    its archive file is on disk; if the process dies in between it is
+    archived again on the next run, so readers should dedupe on message id.
+    """
+    expired = expired_sessions(conn, max_age_days, active)
+    by_day = defaultdict(list)
+    for session_id, started in expired:
+        by_day[time.strftime("%Y-%m-%d", time.gmtime(started))].append(session_id)
+
+    archived = messages = 0
+    for day, session_ids in sorted(by_day.items()):
+        sessions = []
+        for session_id in session_ids:
+            rows = conn.execute(
+                "SELECT id, message FROM message_store WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+            summary = conn.execute(
+                "SELECT summary, covered_id FROM history_summary WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            sessions.append((session_id, rows, summary))
+            messages += len(rows)
+        if dry_run:
+            archived += len(sessions)
+            continue
+        _archive_day(archive_dir, day, sessions)
+        # Deleted in short transactions with pauses in between: a live turn that finds the
+        # database locked sleeps in SQLite's busy handler, so back-to-back writes would starve it
+        for start in range(0, len(sessions), batch):
+            with conn:
+                for session_id, rows, _ in sessions[start:start + batch]:
+                    # Bounded by the last archived id, so nothing written since is lost
+                    last_id = rows[-1][0] if rows else 0
+                    conn.execute("DELETE FROM message_store WHERE session_id = ? AND id <= ?", (session_id, last_id))
+                    conn.execute("DELETE FROM history_summary WHERE session_id = ?", (session_id,))
+                    conn.execute("DELETE FROM session_activity WHERE session_id = ?", (session_id,))
+                    archived += 1
+            time.sleep(pause)
+    return {"sessions": archived, "messages": messages}
+
+
+def incremental_vacuum(conn, pages=128, pause=0.02, stop=None):
+    """Frees up to `pages` pages per short write transaction, pausing between them for live writers."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    freed = 0
+    while (free := conn.execute("PRAGMA freelist_count").fetchone()[0]) and not (stop and stop.is_set()):
+        step = min(free, pages)
+        # Each sqlite3 step of incremental_vacuum frees one page and returns no row, and the
+        # driver only steps once, so the pragma is issued once per page inside the transaction
+        conn.execute("BEGIN IMMEDIATE")
+        for _ in range(step):
+            conn.execute("PRAGMA incremental_vacuum(1)")
+        conn.execute("COMMIT")
+        freed += step
+        time.sleep(pause)
+    return freed
+
+
+def convert_to_incremental(conn):
+    """Switches an existing file to auto_vacuum=INCREMENTAL with one full (blocking) VACUUM."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def run_maintenance(path="memory.db", archive_dir=ARCHIVE_DIR, max_age_days=30, active=(), convert=False,
+                    dry_run=False, stop=None):
+    """One archive + vacuum pass; returns size and query latency before and after."""
+    conn = _connect(path)
+    try:
+        # Make sure the tables exist for a database HistoryStore has not opened yet
+        conn.executescript(SCHEMA)
+        _backfill_activity(conn)
+        with span("history.maintenance"):
+            report = {"before": {**db_size(conn, path), "load_ms": query_latency(conn)}}
+            report["archived"] = archive_expired(conn, archive_dir, max_age_days, active, dry_run)
+            if convert and not dry_run:
+                report["converted"] = convert_to_incremental(conn)
+            report["vacuumed_pages"] = 0 if dry_run else incremental_vacuum(conn, stop=stop)
+            # Fold the WAL back into the file so the freed space shows up on disk
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            report["after"] = {**db_size(conn, path), "load_ms": query_latency(conn)}
+        if not dry_run and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            report["hint"] = "auto_vacuum is off for this file; run with --convert once to reclaim space"
+        return report
+    finally:
+        conn.close()
+
+
+class HistoryMaintenance:
+    """
+    Runs run_maintenance on a daemon thread every `interval` seconds, first
+    after `delay` so it stays out of the way of startup. `active()` returns
+    the session ids that must not be archived (sessions still open).
+    """
+
+    def __init__(self, path="memory.db", archive_dir=ARCHIVE_DIR, max_age_days=30, interval=3600, delay=60,
+                 active=None):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.max_age_days = max_age_days
+        self.interval = interval
+        self.delay = delay
+        self.active = active or (lambda: ())
+        self.last_report = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="history-maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Jitter so several processes sharing a file don't all start at once
+        wait = self.delay + random.uniform(0, self.delay / 4)
+        while not self._stop.wait(wait):
+            try:
+                self.last_report = run_maintenance(self.path, self.archive_dir, self.max_age_days,
+                                                   set(self.active()), stop=self._stop)
+            except sqlite3.Error as e:
+                print(f"⚠️ History maintenance failed: {e}")
+            wait = self.interval
+
+
+def read_archive(session_id, archive_dir=ARCHIVE_DIR):
+    """Archived message payloads of one session, oldest first."""
+    found = {}
+    for filename in sorted(os.listdir(archive_dir)) if os.path.isdir(archive_dir) else ():
+        if not filename.endswith(".jsonl.gz"):
+            continue
+        with gzip.open(os.path.join(archive_dir, filename), "rt", encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record["session_id"] == session_id and "id" in record:
+                    found[record["id"]] = record["message"]
+    return [found[row_id] for row_id in sorted(found)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", default="memory.db")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--max-age-days", type=float, default=30)
+    parser.add_argument("--convert", action="store_true", help="switch the file to incremental vacuum (one full VACUUM)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    report = run_maintenance(args.db, args.archive_dir, args.max_age_days, convert=args.convert, dry_run=args.dry_run)
+    before, after = report["before"], report["after"]
+    print(f"🗄️ Archived {report['archived']['sessions']} sessions ({report['archived']['messages']} messages)"
+          f"{' (dry run)' if args.dry_run else ''} to {args.archive_dir}/")
+    print(f"💾 Size: {before['file_kb']} KB ({before['free_kb']} KB free) -> {after['file_kb']} KB ({after['free_kb']} KB free)")
+    print(f"⏱️ Session load: {before['load_ms']} ms -> {after['load_ms']} ms")
+    if "hint" in report:
+        print(f"💡 {report['hint']}")
@@ -0,0 +1,159 @@
+import json
+import time
+import queue
+import sqlite3
+import threading
+import contextlib
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+from tracing import span
+
+# Same layout SQLChatMessageHistory creates, so existing memory.db files keep working
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_store (
+    id INTEGER NOT NULL,
+    session_id TEXT,
+    message TEXT,
+    PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS ix_message_store_session_id ON message_store (session_id, id);
+CREATE TABLE IF NOT EXISTS history_summary (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    covered_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_activity (
+    session_id TEXT PRIMARY KEY,
+    started REAL NOT NULL,
+    last_active REAL NOT NULL
+);
+"""
+
+
+class HistoryStore:
+    """
+    Shared access to the message_store table in a SQLite file.
+
+    Connections are pooled and opened once in WAL mode, so readers never
+    block the writer and no turn pays for opening a new engine. A connection
+    is borrowed for one statement or transaction and handed back, so the
+    pool only grows to the number of calls running at the same time, not
+    the number of threads that ever made one.
+    """
+
+    def __init__(self, path="memory.db"):
+        self.path = path
+        self._pool = queue.LifoQueue()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        # Borrowed by whichever thread needs it next, never used by two at once
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        # Only takes effect on a new file; lets history_retention give freed pages back in small steps
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrows a pooled connection (opening one only when all are in use)."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def load(self, session_id):
+        with span("history.load"), self.connection() as conn:
+            rows = conn.execute(
+                "SELECT message FROM message_store WHERE session_id = ? ORDER BY id",
+                (session_id,)
+            )
+            return [json.loads(message) for (message,) in rows]
+
+    def load_after(self, session_id, after_id=0):
+        """Returns (id, payload) pairs newer than after_id."""
+        with span("history.load"), self.connection() as conn:
+            rows = conn.execute(
+                "SELECT id, message FROM message_store WHERE session_id = ? AND id > ? ORDER BY id",
+                (session_id, after_id)
+            )
+            return [(row_id, json.loads(message)) for row_id, message in rows]
+
+    def append(self, session_id, payloads):
+        """Writes all payloads, and when the session was last active, in a single transaction."""
+        now = time.time()
+        with self.connection() as conn, conn, span("history.write"):
+            conn.executemany(
+                "INSERT INTO message_store (session_id, message) VALUES (?, ?)",
+                [(session_id, json.dumps(payload)) for payload in payloads]
+            )
+            conn.execute(
+                "INSERT INTO session_activity (session_id, started, last_active) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET last_active = excluded.last_active",
+                (session_id, now, now)
+            )
+
+    def clear(self, session_id):
+        with self.connection() as conn, conn:
+            conn.execute("DELETE FROM message_store WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM history_summary WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM session_activity WHERE session_id = ?", (session_id,))
+
+    def load_summary(self, session_id):
+        """Returns the rolling summary and the last message id folded into it."""
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT summary, covered_id FROM history_summary WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        return row if row else ("", 0)
+
+    def save_summary(self, session_id, summary, covered_id):
+        with self.connection() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO history_summary (session_id, summary, covered_id) VALUES (?, ?, ?)",
+                (session_id, summary, covered_id)
+            )
+
+
+class SQLiteChatHistory(BaseChatMessageHistory):
+    """Chat history for one session, backed by a shared HistoryStore."""
+
+    def __init__(self, session_id, store):
+        self.session_id = session_id
+        self.store = store
+
+    @property
+    def messages(self):
+        return messages_from_dict(self.store.load(self.session_id))
+
+    def add_messages(self, messages):
+        # RunnableWithMessageHistory hands over the human/AI pair together
+        self.store.append(self.session_id, [message_to_dict(m) for m in messages])
+
+    def clear(self):
+        self.store.clear(self.session_id)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_history_store(path="memory.db"):
+    """Returns the process-wide store for a database file."""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = HistoryStore(path)
+        return _stores[path]
@@ -0,0 +1,103 @@
+import re
+
+from langchain_core.messages import HumanMessage, messages_from_dict
+
+from history_store import SQLiteChatHistory
+
+SENTENCE = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def summarize_turns(summary, messages, max_tokens=300):
+    """
+    Folds messages into the rolling summary without an LLM call.
+
+    Keeps the first sentence of every message and drops the oldest sentences
+    once the summary outgrows max_tokens.
+    """
+    sentences = [s for s in SENTENCE.split(summary) if s]
+    for message in messages:
+        role = "Coach" if message.type == "ai" else "Candidate"
+        first = SENTENCE.split(" ".join(message.content.split()), 1)[0]
+        if first:
+            sentences.append(f"{role}: {first}")
+    while len(sentences) > 1 and estimate_tokens(" ".join(sentences)) > max_tokens:
+        sentences.pop(0)
+    return " ".join(sentences)
+
+
+def make_llm_summarizer(llm):
+    """Builds a summarize function that asks the LLM to update the summary."""
+    def summarize(summary, messages, max_tokens=300):
+        transcript = "\n".join(f"{m.type}: {m.content}" for m in messages)
+        result = llm.invoke(
+            f"Current summary of the interview so far:\n{summary or '(empty)'}\n\n"
+            f"New exchanges:\n{transcript}\n\n"
+            f"Rewrite the summary to include the new exchanges in under {max_tokens * 3 // 4} words. "
+            "Keep the candidate's recurring strengths and weaknesses."
+        )
+        return " ".join(result.content.split())
+    return summarize
+
+
+class WindowedChatHistory(SQLiteChatHistory):
+    """
+    Chat history that only replays the last max_turns exchanges to the LLM.
+
+    Older exchanges are folded into a rolling summary stored next to
+    message_store, and the replayed messages are trimmed to token_budget.
+    Full history is still written to message_store as before.
+    """
+
+    def __init__(self, session_id, store, max_turns=3, token_budget=1200,
+                 summarize=summarize_turns, count_tokens=estimate_tokens, log_tokens=True):
+        super().__init__(session_id, store)
+        self.log_tokens = log_tokens
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+
+    @property
+    def messages(self):
+        summary, covered_id = self.store.load_summary(self.session_id)
+        rows = self.store.load_after(self.session_id, covered_id)
+        recent = messages_from_dict([payload for _, payload in rows[max(len(rows) - self.max_turns * 2, 0):]])
+
+        header = [HumanMessage(f"Summary of the interview so far: {summary}")] if summary else []
+        total = sum(self.count_tokens(m.content) for m in header + recent)
+        # Drop the oldest exchanges until the window fits the budget
+        while recent and total > self.token_budget:
+            for message in recent[:2]:
+                total -= self.count_tokens(message.content)
+            recent = recent[2:]
+        if header and total > self.token_budget:
+            header[0].content = header[0].content[:self.token_budget * 4]
+        return header + recent
+
+    def add_messages(self, messages):
+        # The window this turn's prompt was built from, before the new pair lands
+        window = sum(self.count_tokens(m.content) for m in self.messages) if self.log_tokens else 0
+        super().add_messages(messages)
+        self._fold_old_turns()
+        if self.log_tokens:
+            self._log_prompt_tokens(messages, window)
+
+    def _fold_old_turns(self):
+        summary, covered_id = self.store.load_summary(self.session_id)
+        rows = self.store.load_after(self.session_id, covered_id)
+        overflow = rows[:-self.max_turns * 2] if self.max_turns else rows
+        if not overflow:
+            return
+        summary = self.summarize(summary, messages_from_dict([payload for _, payload in overflow]),
+                                 max_tokens=self.token_budget // 3)
+        self.store.save_summary(self.session_id, summary, overflow[-1][0])
+
+    def _log_prompt_tokens(self, messages, window):
+        usage = getattr(messages[-1], "usage_metadata", None) or {}
+        prompt = usage.get("input_tokens", "n/a")
+        print(f"📏 Prompt tokens this turn: {prompt} (history window ~{window}/{self.token_budget})")
@@ -0,0 +1,248 @@
+import time
+import asyncio
+import functools
+import contextvars
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from tts_stream import SentenceSplitter, chunk_text
+from response_log import ResponseLog, export
+from tracing import span, set_session
+
+
+class InterviewEngine:
+    """
+    Runs an interview as overlapping asyncio stages: capture -> feedback -> persist.
+
+    Microphone capture and speech share one dedicated audio thread so the TTS
+    engine and the mic are always driven from the same thread and never at the
+    same time. LLM generation runs on the default executor and its sentences are
+    spoken as they arrive, and persistence (one appended line per turn in the
+    session's ResponseLog, a new session's unless `response_log` is given)
+    runs in its own stage so capturing the next answer never waits on file
+    I/O. The log is exported to output_file at the end.
+
+    With prefetch=True the next question is asked straight after an answer is
+    captured, and the feedback for that answer is generated while the
+    candidate is already answering the next one. It is spoken once that
+    answer is in, before the question after it (the last one before the
+    outro), and it doesn't announce a next question, which was already asked.
+
+    With choose_next(question, answer) the interview is adaptive: after each
+    answer it returns the next question (or None to finish), which is appended
+    to `questions`. It needs the answer first, so it can't be combined with prefetch.
+
+    speech_seconds(), when given, says how long the last answer was spoken
+    for; it is logged with each turn along with the feedback latency.
+    speech_ended() returns the perf_counter time the last answer's speech
+    ended, and the time from there to the first spoken feedback sentence is
+    reported as answer_to_audio.
+
+    With speculate (a speculative.SpeculativeFeedback) the engine tells it
+    the question and follow-up before each answer is captured; the app feeds
+    it partial transcripts and takes its draft in stream_feedback. The draft
+    needs the follow-up before the answer and is spoken straight away, so
+    this can't be combined with prefetch or choose_next.
+    """
+
+    def __init__(self, questions, listen, stream_feedback, speak, speak_question=None,
+                 output_file="interview_responses.json", wait_for_next=None, prefetch=False, choose_next=None,
+                 speech_seconds=None, speech_ended=None, speculate=None, response_log=None):
+        if prefetch and choose_next:
+            raise ValueError("prefetch needs the next question before the answer, so it can't be adaptive")
+        if speculate and (prefetch or choose_next):
+            raise ValueError("speculative feedback is spoken right away and needs the next question up front")
+        self.questions = list(questions)
+        self.choose_next = choose_next
+        self.listen = listen
+        self.speech_seconds = speech_seconds
+        self.speech_ended = speech_ended
+        self.speculate = speculate
+        self.stream_feedback = stream_feedback
+        self.speak = speak
+        # Used for the fixed question texts, which may be pre-rendered
+        self.speak_question = speak_question or speak
+        # A log of its own unless the app passes one (to pick the session id or directory)
+        self.response_log = response_log or ResponseLog(f"session_{int(time.time())}")
+        self.output_file = output_file
+        self.wait_for_next = wait_for_next
+        self.prefetch = prefetch
+        # Prefetched feedback waiting for a gap between answers to be spoken
+        self._deferred = []
+        self.responses = []
+        self.stage_times = defaultdict(list)
+        self.wall_time = 0.0
+        self._audio = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio")
+
+    async def _timed(self, stage, func, *args, executor=None):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            with span(f"turn.{stage}"):
+                # Run in a copy of this context so spans in the worker keep the session and parent
+                call = functools.partial(contextvars.copy_context().run, func, *args)
+                return await loop.run_in_executor(executor, call)
+        finally:
+            self.stage_times[stage].append(time.perf_counter() - start)
+
+    async def say(self, text):
+        await self._timed("tts", self.speak, text, executor=self._audio)
+
+    async def ask(self, question):
+        await self._timed("tts", self.speak_question, question, executor=self._audio)
+
+    async def _capture_stage(self, answers):
+        i = 0
+        while True:
+            # Wait before looking at the list; an adaptive interview grows it after each answer
+            await self._ready.wait()
+            self._ready.clear()
+            if i >= len(self.questions):
+                break
+            question = self.questions[i]
+            print(f"\n🧠 Question: {question}")
+            if self.speculate:
+                self.speculate.begin(question, self.questions[i + 1] if i + 1 < len(self.questions)
+                                     else "No further questions.")
+            answer = await self._timed("capture", self.listen, executor=self._audio)
+            seconds = self.speech_seconds() if self.speech_seconds else None
+            ended = self.speech_ended() if self.speech_ended else None
+            await answers.put((i, question, answer, seconds, ended))
+
+            # In prefetch mode ask the next question right away; feedback for
+            # this answer is generated while the candidate answers it
+            if self.prefetch:
+                if i + 1 >= len(self.questions):
+                    break
+                await self._speak_deferred()
+                await self.ask(self.questions[i + 1])
+                self._ready.set()
+            i += 1
+        await answers.put(None)
+
+    async def _feedback_stage(self, answers, results):
+        while (item := await answers.get()) is not None:
+            i, question, answer, seconds, ended = item
+            started = time.perf_counter()
+            if self.choose_next and i + 1 == len(self.questions):
+                next_question = await self._timed("select", self.choose_next, question, answer)
+                if next_question:
+                    self.questions.append(next_question)
+            last = i + 1 >= len(self.questions)
+            next_question = "No further questions." if last else self.questions[i + 1]
+
+            if self.prefetch:
+                # Spoken later, after the next question has been asked and answered
+                feedback = await self._feedback(question, answer, "No further questions.", spoken=False)
+                self._deferred.append(feedback)
+            else:
+                feedback = await self._feedback(question, answer, next_question, ended=ended)
+            print(f"🤖 Feedback: {feedback}")
+            await results.put({
+                "question": question,
+                "answer": answer,
+                "feedback": feedback,
+                "speech_seconds": seconds,
+                "latency": round(time.perf_counter() - started, 3)
+            })
+
+            if not self.prefetch:
+                if not last and self.wait_for_next:
+                    await self._timed("wait", self.wait_for_next)
+                self._ready.set()
+        await results.put(None)
+
+    async def _speak_deferred(self):
+        while self._deferred:
+            await self.say("About your previous answer: " + self._deferred.pop(0))
+
+    async def _feedback(self, question, answer, next_question, spoken=True, ended=None):
+        loop = asyncio.get_running_loop()
+        sentences = asyncio.Queue()
+        parts = []
+        started = time.perf_counter()
+
+        # Runs on a worker thread and hands finished sentences back to the loop
+        def produce():
+            splitter = SentenceSplitter()
+            try:
+                for chunk in self.stream_feedback(question, answer, next_question):
+                    text = chunk_text(chunk)
+                    parts.append(text)
+                    for sentence in splitter.feed(text):
+                        loop.call_soon_threadsafe(sentences.put_nowait, sentence)
+                for sentence in splitter.flush():
+                    loop.call_soon_threadsafe(sentences.put_nowait, sentence)
+            finally:
+                loop.call_soon_threadsafe(sentences.put_nowait, None)
+
+        generation = self._timed("llm", produce)
+        generation = asyncio.ensure_future(generation)
+        first_audio = None
+        while (sentence := await sentences.get()) is not None:
+            if spoken:
+                if first_audio is None:
+                    first_audio = time.perf_counter() - started
+                    self.stage_times["first_audio"].append(first_audio)
+                    if ended is not None:
+                        self.stage_times["answer_to_audio"].append(time.perf_counter() - ended)
+                await self.say(sentence)
+        await generation
+        return "".join(parts)
+
+    async def _persist_stage(self, results):
+        while (item := await results.get()) is not None:
+            self.responses.append(item)
+            await self._timed("persist", self.response_log.append, item)
+
+    async def run(self, intro=(), outro=None):
+        set_session(self.response_log.session_id)
+        start = time.perf_counter()
+        self._ready = asyncio.Event()
+        answers = asyncio.Queue()
+        results = asyncio.Queue()
+
+        try:
+            for text in intro:
+                await self.say(text)
+            if self.questions:
+                await self.ask(self.questions[0])
+            self._ready.set()
+
+            tasks = [
+                asyncio.ensure_future(self._capture_stage(answers)),
+                asyncio.ensure_future(self._feedback_stage(answers, results)),
+                asyncio.ensure_future(self._persist_stage(results)),
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            finally:
+                self.response_log.close()
+
+            if self.output_file:
+                await self._timed("export", export, self.response_log.session_id,
+                                  self.output_file, self.response_log.directory)
+
+            await self._speak_deferred()
+            if outro:
+                await self.say(outro)
+            self.wall_time = time.perf_counter() - start
+            return self.responses
+        finally:
+            # The audio worker goes too when a stage or the outro fails
+            self._audio.shutdown(wait=False)
+
+    def report(self):
+        """Prints per-stage wall time and how much the overlapping stages saved."""
+        print("\n📊 Stage timings")
+        serial = 0.0
+        for stage, times in self.stage_times.items():
+            total = sum(times)
+            print(f"  {stage:<12} n={len(times):<3} total={total:7.2f}s  mean={total / len(times):6.2f}s")
+            if stage not in ("first_audio", "answer_to_audio"):
+                serial += total
+        print(f"  Session took {self.wall_time:.2f}s, {serial:.2f}s if every stage ran back to back")
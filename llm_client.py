@@ -0,0 +1,428 @@
+"""
+Resilient client for the feedback LLM: deadlines, retries, hedging and a circuit breaker.
+
+A Gemini reply usually starts within a second or two, but the tail is long
+and one stuck request used to stall the whole interview. ResilientLLM wraps
+the `feedback_prompt | llm` runnable (or the RunnableWithMessageHistory
+around it) and, for every call:
+
+- gives each attempt `attempt_timeout` seconds to produce its first token,
+  the whole call `deadline` seconds, and a started stream `stall_timeout`
+  seconds between chunks;
+- retries errors and timeouts with full-jitter exponential backoff, as
+  batch_eval does;
+- hedges: when the first attempt has not answered within the observed p95
+  time to first token, a second request is sent and whichever answers first
+  is streamed;
+- counts consecutive failures in a circuit breaker. While it is open, calls
+  go straight to the fallback: a cheaper model if one was given, otherwise
+  the local feedback tier, so the interview always moves on.
+
+Attempts are streamed on daemon threads and the loser of a hedge is closed
+at its first chunk, so only the winner's exchange reaches the chat history.
+A thread stuck inside a hung request can only end when the client's own
+request timeout fires (prompts.feedback_llm sets one), so at most
+`max_attempts` attempts run at once; past that, hedges are skipped and
+calls fall back as if the model had failed.
+If a stream breaks after it started, what was said stays and a local
+sentence moves on to the next question. Local fallback chunks carry
+response_metadata["fallback"] = "local" (FeedbackCache does not store them).
+stats() has latency percentiles and counters; calls are traced as llm.call
+and llm.attempt spans.
+
+    python -m benchmarks.bench_llm
+"""
+import math
+import time
+import queue
+import random
+import asyncio
+import logging
+import functools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessageChunk
+
+from local_feedback import assess, fallback_reply, move_on
+from tracing import span
+
+# Cheaper model the apps fall back to while the circuit is open
+FALLBACK_MODEL = "gemini-2.0-flash-lite"
+
+
+# Set on an attempt's thread while it closes its stream (see _Attempt._run)
+_closing = threading.local()
+
+
+class _ClosedStreamFilter(logging.Filter):
+    """
+    Drops the callback error RunnableWithMessageHistory logs when _Attempt
+    closes a stream before its output; records from anywhere else pass.
+    """
+
+    def filter(self, record):
+        if not getattr(_closing, "active", False):
+            return True
+        args = record.args if isinstance(record.args, tuple) else ()
+        return not (len(args) == 3 and args[0] == "RootListenersTracer" and "Got None" in str(args[2]))
+
+
+# Losing hedges and abandoned attempts are closed on purpose, so their error is expected
+logging.getLogger("langchain_core.callbacks.manager").addFilter(_ClosedStreamFilter())
+
+
+class LLMTimeout(Exception):
+    """An attempt produced no first token, or no next chunk, in time."""
+
+
+def percentile(values, p):
+    """Nearest-rank percentile, None for no values."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * p / 100) - 1)]
+
+
+class LatencyWindow:
+    """The last `size` latencies (seconds), for percentiles."""
+
+    def __init__(self, size=200):
+        self.values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.values.append(seconds)
+
+    def percentile(self, p):
+        with self._lock:
+            values = list(self.values)
+        return percentile(values, p)
+
+    def __len__(self):
+        return len(self.values)
+
+    def summary(self):
+        return {f"p{p}_ms": round(value * 1000, 1) if value is not None else None
+                for p in (50, 95, 99) for value in [self.percentile(p)]}
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures. After `cooldown` seconds one
+    trial call is let through (half open); its outcome closes or reopens it.
+    """
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opens = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.opens += 1
+
+
+class _Attempt:
+    """One streamed request on a daemon thread, posting (attempt, kind, payload) to a shared queue."""
+
+    def __init__(self, runnable, inputs, config, events, number, timeout, hedge=False, release=None):
+        self.number = number
+        self.hedge = hedge
+        self.live = True
+        self.started = time.monotonic()
+        self.expires = self.started + timeout
+        self.cancelled = threading.Event()
+        # Run in a copy of the caller's context so spans keep the session and parent
+        thread = threading.Thread(target=contextvars.copy_context().run, name="llm-attempt", daemon=True,
+                                  args=(self._run, runnable, inputs, config, events, release))
+        thread.start()
+
+    def _run(self, runnable, inputs, config, events, release):
+        try:
+            with span("llm.attempt", attempt=self.number, hedge=self.hedge):
+                stream = runnable.stream(inputs, config)
+                try:
+                    for chunk in stream:
+                        if self.cancelled.is_set():
+                            return
+                        events.put((self, "chunk", chunk))
+                    events.put((self, "done", None))
+                except Exception as e:
+                    events.put((self, "error", e))
+                finally:
+                    # Closing a losing or abandoned stream ends it before its history is written
+                    # (the callback error RunnableWithMessageHistory logs for it is filtered out)
+                    _closing.active = True
+                    try:
+                        stream.close()
+                    finally:
+                        _closing.active = False
+        finally:
+            if release:
+                release()
+
+    def cancel(self):
+        self.live = False
+        self.cancelled.set()
+
+
+def local_fallback(key_points=None, first_pass_spoken=False):
+    """
+    A local_fallback for ResilientLLM: the local tier's feedback on the answer
+    in `inputs` (leaving out the first-pass sentence if the app already spoke
+    it) and the move to the next question.
+    """
+    def reply(inputs):
+        question = inputs.get("question", "")
+        assessment = assess(inputs.get("answer", ""), key_points(question) if key_points else (), question=question)
+        return fallback_reply(assessment, inputs.get("followup_question"), include_first_pass=not first_pass_spoken)
+    return reply
+
+
+class ResilientLLM:
+    """
+    Wraps a runnable with deadlines, retries, hedging and a circuit breaker.
+
+    `fallback` is an optional cheaper runnable taking the same inputs;
+    `local_fallback(inputs)` returns the text used when no model answers.
+    stream(), invoke() and ainvoke() take the same arguments as the runnable.
+    """
+
+    def __init__(self, runnable, fallback=None, local_fallback=local_fallback(), attempt_timeout=8.0,
+                 deadline=15.0, stall_timeout=10.0, max_retries=2, base_delay=0.5, hedge=True,
+                 hedge_percentile=95, min_hedge_delay=0.5, initial_hedge_delay=4.0, min_samples=20,
+                 failure_threshold=5, cooldown=30.0, max_workers=64, max_attempts=16):
+        self.runnable = runnable
+        self.fallback = fallback
+        self.local_fallback = local_fallback
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.stall_timeout = stall_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        # Attempt threads alive at once, hung ones included
+        self._slots = threading.BoundedSemaphore(max_attempts)
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        # Time to first token per attempt (drives the hedge delay), and per call as the caller sees it
+        self.attempt_latency = LatencyWindow()
+        self.first_token = LatencyWindow()
+        self.total = LatencyWindow()
+        self.counts = dict.fromkeys(("calls", "retries", "hedges", "hedge_wins", "errors", "timeouts",
+                                     "broken_streams", "saturated", "model_fallbacks", "local_fallbacks"), 0)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def hedge_delay(self):
+        """Seconds to wait for a first token before sending a hedged request."""
+        if len(self.attempt_latency) < self.min_samples:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, self.attempt_latency.percentile(self.hedge_percentile))
+
+    def _backoff(self, retry):
+        # Full jitter, as in batch_eval.score
+        return random.uniform(0, self.base_delay * 2 ** (retry - 1))
+
+    def _failed(self, attempt, error, primary):
+        attempt.cancel()
+        self._count("timeouts" if isinstance(error, LLMTimeout) else "errors")
+        if primary:
+            self.breaker.failure()
+
+    def _first_chunk(self, runnable, inputs, config, primary):
+        """
+        Races attempts until one produces a chunk. Returns (events, attempts,
+        winner, chunk), with winner None when every attempt failed or the
+        call ran out of time.
+        """
+        events = queue.Queue()
+        start = time.monotonic()
+        deadline = start + self.deadline
+        retries = 0 if primary else self.max_retries
+        hedging = primary and self.hedge and self.breaker.state == "closed"
+
+        def launch(hedge=False):
+            if not self._slots.acquire(blocking=False):
+                # Too many requests still hanging: no new attempt, as if this one had failed
+                self._count("saturated")
+                return None
+            attempts.append(_Attempt(runnable, inputs, config, events, len(attempts), self.attempt_timeout, hedge,
+                                     release=self._slots.release))
+            return time.monotonic() + self.hedge_delay() if hedging and not hedge else None
+
+        attempts = []
+        hedge_at = launch()
+        retry_at = None
+        while True:
+            now = time.monotonic()
+            wake = min([deadline] + [a.expires for a in attempts if a.live] + [t for t in (hedge_at, retry_at) if t])
+            try:
+                attempt, kind, payload = events.get(timeout=max(0.0, wake - now))
+            except queue.Empty:
+                pass
+            else:
+                if attempt.live:
+                    if kind == "chunk":
+                        return events, attempts, attempt, payload
+                    self._failed(attempt, payload if kind == "error" else ValueError("empty response"), primary)
+
+            now = time.monotonic()
+            if now >= deadline:
+                for attempt in attempts:
+                    if attempt.live:
+                        self._failed(attempt, LLMTimeout("call deadline exceeded"), primary)
+                return events, attempts, None, None
+            for attempt in attempts:
+                if attempt.live and now >= attempt.expires:
+                    self._failed(attempt, LLMTimeout("no first token in time"), primary)
+
+            live = any(attempt.live for attempt in attempts)
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if live:
+                    self._count("hedges")
+                    launch(hedge=True)
+            if not live:
+                hedge_at = None
+                if retry_at is None:
+                    # Once the breaker has opened there is no point in retrying
+                    if retries >= self.max_retries or (primary and self.breaker.state == "open"):
+                        return events, attempts, None, None
+                    retries += 1
+                    retry_at = now + self._backoff(retries)
+                elif now >= retry_at:
+                    retry_at = None
+                    self._count("retries")
+                    hedge_at = launch()
+
+    def _relay(self, events, winner, first, inputs, primary):
+        """Yields the winner's chunks; a stream that breaks is finished by the local tier."""
+        yield first
+        while True:
+            try:
+                attempt, kind, payload = events.get(timeout=self.stall_timeout)
+            except queue.Empty:
+                kind, payload = "error", LLMTimeout("stream stalled")
+            else:
+                if attempt is not winner:
+                    continue
+            if kind == "chunk":
+                yield payload
+                continue
+            if kind == "done":
+                return True
+            self._count("broken_streams")
+            self._failed(winner, payload, primary)
+            yield self._local_chunk(" " + move_on(inputs.get("followup_question")))
+            return False
+
+    def _local_chunk(self, text):
+        return AIMessageChunk(content=text, response_metadata={"fallback": "local"})
+
+    def _fallback(self, inputs, config):
+        if self.fallback is not None:
+            self._count("model_fallbacks")
+            events, attempts, winner, first = self._first_chunk(self.fallback, inputs, config, primary=False)
+            try:
+                if winner is not None:
+                    yield from self._relay(events, winner, first, inputs, primary=False)
+                    return
+            finally:
+                for attempt in attempts:
+                    attempt.cancel()
+        self._count("local_fallbacks")
+        yield self._local_chunk(self.local_fallback(inputs))
+
+    def stream(self, inputs, config=None):
+        """Streams the reply: the model's chunks, or a fallback's."""
+        self._count("calls")
+        start = time.monotonic()
+        if not self.breaker.allow():
+            yield from self._fallback(inputs, config)
+            return
+        # The span covers the race to the first token only: a generator can be resumed
+        # from another context, where the span's context variable could not be reset
+        with span("llm.call") as call:
+            events, attempts, winner, first = self._first_chunk(self.runnable, inputs, config, primary=True)
+            call.set(attempts=len(attempts), hedged=bool(winner and winner.hedge), ok=winner is not None)
+        try:
+            if winner is None:
+                yield from self._fallback(inputs, config)
+                return
+            now = time.monotonic()
+            self.attempt_latency.add(now - winner.started)
+            self.first_token.add(now - start)
+            self.breaker.success()
+            if winner.hedge:
+                self._count("hedge_wins")
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+            if (yield from self._relay(events, winner, first, inputs, primary=True)):
+                self.total.add(time.monotonic() - start)
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def invoke(self, inputs, config=None):
+        """The whole reply as one message."""
+        message = None
+        for chunk in self.stream(inputs, config):
+            if isinstance(chunk, str):
+                chunk = AIMessageChunk(content=chunk)
+            message = chunk if message is None else message + chunk
+        return message
+
+    async def ainvoke(self, inputs, config=None):
+        # Attempts block on their streams, so calls wait on a dedicated pool sized for the
+        # server's concurrent LLM calls rather than the event loop's small default executor
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm")
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, self.invoke, inputs, config))
+
+    def stats(self):
+        return {
+            **self.counts,
+            "first_token": self.first_token.summary(),
+            "total": self.total.summary(),
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+            "circuit": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+        }
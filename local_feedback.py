@@ -0,0 +1,179 @@
+"""
+Fast local feedback tier that runs before (or instead of) the LLM.
+
+Rule-based checks take well under a millisecond: answer length, coverage of
+the question's expected key points, filler-word rate and speaking rate.
+Failed recognitions and trivial answers ("[Unrecognized speech]", or "No"
+to an open question) get an instant local reply and never reach the LLM. A
+short answer to a yes/no question ("No, never.") is a real answer and goes
+to the LLM as usual. Other answers get one spoken
+sentence of local feedback right away while the LLM response is generated.
+"""
+import re
+import time
+
+# Placeholders the apps use when speech recognition fails
+FAILED_ANSWERS = {"[Unrecognized speech]", "[Speech service error]", ""}
+
+# "like" is left out: "I would like to" is not a filler, and a transcript can't tell them apart
+FILLERS = {"um", "uh", "erm", "er", "hmm", "basically", "literally"}
+FILLER_PHRASES = re.compile(r"\b(?:you know|i mean|sort of|kind of)\b")
+
+# Questions that a bare "yes" or "no" answers
+YES_NO = re.compile(r"^(?:do|does|did|have|has|had|is|are|was|were|will|would|can|could|should|shall|may|am)\b")
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "is", "are", "was", "were",
+    "be", "it", "that", "this", "as", "at", "by", "from", "your", "you", "my", "i", "do", "how", "what",
+}
+
+WORD = re.compile(r"[a-z0-9']+")
+
+# Comfortable speaking pace in words per minute
+SLOW_WPM = 90
+FAST_WPM = 190
+
+
+def content_words(text):
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _stem(word):
+    # Crude prefix match so "deploy", "deployed" and "deployment" count as the same point
+    return word[:5]
+
+
+def covered(key_point, answer_stems):
+    words = content_words(key_point)
+    if not words:
+        return False
+    hits = sum(_stem(word) in answer_stems for word in words)
+    return hits * 2 >= len(words)
+
+
+def yes_no(question):
+    return bool(question and YES_NO.match(question.strip().lower()))
+
+
+def assess(answer, key_points=(), speech_seconds=None, min_words=2, question=None):
+    """
+    Scores an answer locally; returns a dict of the checks that ran. Answers
+    under `min_words` words are trivial, unless `question` is a yes/no question.
+    """
+    text = answer.strip()
+    words = WORD.findall(text.lower())
+    lowered = " ".join(words)
+    fillers = sum(word in FILLERS for word in words) + len(FILLER_PHRASES.findall(lowered))
+    failed = text in FAILED_ANSWERS
+    result = {
+        "failed": failed,
+        "words": len(words),
+        "trivial": failed or (len(words) < min_words and not yes_no(question)),
+        "filler_rate": fillers / len(words) if words else 0.0,
+        "wpm": len(words) / speech_seconds * 60 if speech_seconds else None,
+        "key_points": len(key_points),
+        "missed": [],
+    }
+    if key_points:
+        stems = {_stem(word) for word in content_words(text)}
+        result["missed"] = [point for point in key_points if not covered(point, stems)]
+    result["coverage"] = 1 - len(result["missed"]) / len(key_points) if key_points else None
+    return result
+
+
+def instant_reply(assessment, followup_question):
+    """The whole feedback for a failed or trivial answer."""
+    if assessment["failed"]:
+        opening = "I couldn't catch that answer, so let's keep going and you can come back to it later."
+    else:
+        opening = ("That answer was very short. Try to answer in full sentences and "
+                   "give a reason or an example to back it up.")
+    if followup_question and followup_question != "No further questions.":
+        return f"{opening} Now for your next question: {followup_question}"
+    return opening
+
+
+def fallback_reply(assessment, followup_question, include_first_pass=True):
+    """Feedback when no model answered in time, so the interview can still move on."""
+    if assessment["trivial"]:
+        return instant_reply(assessment, followup_question)
+    parts = [first_pass(assessment)] if include_first_pass else []
+    parts.append("I can't give you more detailed feedback on this one, so let's keep going.")
+    if followup_question and followup_question != "No further questions.":
+        parts.append(f"Now for your next question: {followup_question}")
+    return " ".join(parts)
+
+
+def move_on(followup_question):
+    """Closes feedback that was cut off part way."""
+    if followup_question and followup_question != "No further questions.":
+        return f"Let's move on. Now for your next question: {followup_question}"
+    return "Let's leave it there."
+
+
+def first_pass(assessment):
+    """One sentence of local feedback, spoken while the LLM works on the full reply."""
+    if assessment["coverage"] is not None:
+        total = assessment["key_points"]
+        hit = total - len(assessment["missed"])
+        if hit == total:
+            return "Good, you touched on all the main points I was listening for."
+        if hit == 0:
+            return f"You missed the main points I was listening for, such as {assessment['missed'][0]}."
+        return f"You covered {hit} of the {total} main points; you didn't mention {assessment['missed'][0]}."
+    if assessment["filler_rate"] > 0.08:
+        return "Try to cut down on filler words like um and uh; pausing briefly sounds more confident."
+    if assessment["wpm"] is not None and assessment["wpm"] > FAST_WPM:
+        return "You spoke quite fast there, so slow down a little to sound more composed."
+    if assessment["wpm"] is not None and assessment["wpm"] < SLOW_WPM:
+        return "Your pace was a little slow, so try to keep your answer flowing."
+    if assessment["words"] < 25:
+        return "That was a fairly brief answer, so adding a concrete detail would help."
+    return "Thanks, that was a well developed answer."
+
+
+class LocalFeedback:
+    """
+    Wraps an LLM feedback stream with the local tier.
+
+    `key_points(question)` returns the expected key points for a question (or
+    an empty list) and `speech_seconds()` how long the last answer was spoken
+    for (or None); both are optional.
+    """
+
+    def __init__(self, key_points=None, speech_seconds=None, min_words=2):
+        self.key_points = key_points or (lambda question: ())
+        self.speech_seconds = speech_seconds or (lambda: None)
+        self.min_words = min_words
+        self.instant = 0
+        self.first_passes = 0
+        self.check_seconds = 0.0
+
+    def assess(self, question, answer):
+        start = time.perf_counter()
+        assessment = assess(answer, self.key_points(question), self.speech_seconds(), self.min_words, question)
+        self.check_seconds += time.perf_counter() - start
+        return assessment
+
+    def stream(self, question, answer, followup_question, make_stream):
+        """
+        Yields an instant reply for trivial answers; otherwise a first-pass
+        sentence followed by the LLM stream from make_stream().
+        """
+        assessment = self.assess(question, answer)
+        if assessment["trivial"]:
+            self.instant += 1
+            yield instant_reply(assessment, followup_question)
+            return
+        self.first_passes += 1
+        # The trailing space lets the sentence splitter release it straight away
+        yield first_pass(assessment) + " "
+        yield from make_stream()
+
+    def stats(self):
+        checks = self.instant + self.first_passes
+        return {
+            "instant": self.instant,
+            "first_passes": self.first_passes,
+            "mean_check_ms": round(self.check_seconds / checks * 1000, 3) if checks else 0.0,
+        }
@@ -0,0 +1,162 @@
+"""
+Feedback prompt assembly: static parts rendered once, per-turn parts kept small.
+
+The system text (feedback_template, with its example response) never
+changes within a process. It is compacted and turned into a fixed
+SystemMessage once per template, so every turn sends the byte-identical
+prefix. That is what Gemini's implicit prefix caching keys on.
+
+Each turn adds only the history window and one human message. The history
+stores the question and answer of each turn as its input (rather than the
+placeholder the apps used to pass). The next question is left out there
+because the coach's reply already names it.
+
+    python prompts.py                        # per-turn prompt tokens for each app
+    python prompts.py --check                # exit 1 if a turn is over its budget
+
+tests/test_prompts.py runs the same check, so a template or history window
+change that goes over budget fails the tests.
+"""
+import re
+import sys
+import argparse
+import functools
+
+# langchain is imported inside the functions, so importing this module stays cheap for the apps
+
+HUMAN_TURN = "Question: {question}\nAnswer: {answer}"
+NEXT_QUESTION = "\nNext question: {followup_question}"
+
+# Client-side limit on one request, so a hung request ends and frees its ResilientLLM attempt slot
+REQUEST_TIMEOUT = 20
+
+# Per-turn prompt budget (estimated tokens) for each app's template, checked by --check
+BUDGETS = {"app_memory.py": 2000, "app_new.py": 2000}
+
+
+def compact(text):
+    """Strips the indentation and blank-line runs of a triple-quoted template."""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def turn_message(question, answer):
+    """What the history keeps of the candidate's side of a turn."""
+    return HUMAN_TURN.format(question=question, answer=answer)
+
+
+def feedback_inputs(question, answer, followup_question):
+    """Inputs for a feedback_prompt() chain; `input` is what RunnableWithMessageHistory stores."""
+    return {"question": question, "answer": answer, "followup_question": followup_question,
+            "input": turn_message(question, answer)}
+
+
+@functools.lru_cache(maxsize=None)
+def feedback_prompt(template, history=True):
+    """
+    ChatPromptTemplate for feedback with the system text pre-rendered.
+    Built once per (template, history) per process.
+    """
+    from langchain_core.messages import SystemMessage
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    messages = [SystemMessage(content=compact(template))]
+    if history:
+        messages.append(MessagesPlaceholder(variable_name="history"))
+    # The answer comes last but for the next question, so a speculative draft's prompt
+    # (speculative.py) and the final one share everything up to the end of the drafted answer
+    messages.append(("human", HUMAN_TURN + NEXT_QUESTION))
+    return ChatPromptTemplate.from_messages(messages)
+
+
+def feedback_llm(model, api_key=None, **llm_kwargs):
+    """ChatGoogleGenerativeAI for `model`, with a request timeout and no client-side retries."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    if api_key:
+        llm_kwargs["google_api_key"] = api_key
+    # ResilientLLM does the retrying (with hedging and deadlines); the client only gives up
+    llm_kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    llm_kwargs.setdefault("max_retries", 0)
+    return ChatGoogleGenerativeAI(model=model, **llm_kwargs)
+
+
+def feedback_chain(model, template, history=True, api_key=None, **llm_kwargs):
+    """feedback_prompt() | feedback_llm() for `model`."""
+    return feedback_prompt(template, history) | feedback_llm(model, api_key, **llm_kwargs)
+
+
+def turn_tokens(template, history_messages, question, answer, followup_question):
+    """Estimated prompt tokens of one turn, split into system, history and turn."""
+    from history_window import estimate_tokens
+
+    system = estimate_tokens(compact(template))
+    history = sum(estimate_tokens(m.content) for m in history_messages)
+    turn = estimate_tokens((HUMAN_TURN + NEXT_QUESTION).format(
+        question=question, answer=answer, followup_question=followup_question))
+    return {"system": system, "history": history, "turn": turn, "total": system + history + turn}
+
+
+# A long (about two minutes spoken) answer and a full-length reply, the worst case per turn
+LONG_ANSWER = " ".join(["I would start by clarifying the requirements with the stakeholders and then "
+                        "walk through how I designed, tested and deployed the solution step by step,"] * 8)
+REPLY = ("I like how you walked through your approach step by step. Try to quantify the impact with one "
+         "concrete metric so the interviewer remembers it. Now for your next question: {followup}")
+
+
+def simulate(app, questions):
+    """
+    Per-turn prompt tokens for `app`'s template over an interview of long
+    answers, with the app's own history window (HISTORY_TURNS, HISTORY_TOKEN_BUDGET).
+    """
+    import os
+    import tempfile
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from batch_eval import read_constant
+    from history_store import HistoryStore
+    from history_window import WindowedChatHistory
+
+    template = read_constant(app, "feedback_template")
+    max_turns = read_constant(app, "HISTORY_TURNS")
+    token_budget = read_constant(app, "HISTORY_TOKEN_BUDGET")
+    with tempfile.TemporaryDirectory() as tmp:
+        history = WindowedChatHistory("budget", HistoryStore(os.path.join(tmp, "memory.db")),
+                                      max_turns=max_turns, token_budget=token_budget, log_tokens=False)
+        turns = []
+        for i, question in enumerate(questions):
+            followup = questions[i + 1] if i + 1 < len(questions) else "No further questions."
+            turns.append(turn_tokens(template, history.messages, question, LONG_ANSWER, followup))
+            history.add_messages([HumanMessage(content=turn_message(question, LONG_ANSWER)),
+                                  AIMessage(content=REPLY.format(followup=followup))])
+    return turns
+
+
+def check(budgets=BUDGETS):
+    """Prints per-turn prompt tokens for each app; returns the turns over budget."""
+    from question_bank import get_question_bank
+
+    banks = {"app_memory.py": "ml", "app_new.py": "visa"}
+    over = []
+    for app, budget in budgets.items():
+        turns = simulate(app, get_question_bank().questions(banks[app]))
+        print(f"\n📏 {app} (budget {budget} tokens per turn)")
+        print(f"  {'turn':>4} {'system':>7} {'history':>8} {'turn':>6} {'total':>6}")
+        for i, tokens in enumerate(turns, 1):
+            flag = " ❌" if tokens["total"] > budget else ""
+            print(f"  {i:>4} {tokens['system']:>7} {tokens['history']:>8} {tokens['turn']:>6} {tokens['total']:>6}{flag}")
+            if tokens["total"] > budget:
+                over.append(f"{app} turn {i}: {tokens['total']} tokens > {budget}")
+    return over
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--check", action="store_true", help="exit non-zero when a turn is over its budget")
+    args = parser.parse_args()
+
+    over = check()
+    if over:
+        print("\n❌ Prompt budget exceeded:\n  " + "\n  ".join(over))
+        sys.exit(1 if args.check else 0)
+    print("\n✅ Every turn is within its prompt budget")
@@ -0,0 +1,192 @@
+"""
+Pre-rendered audio for the fixed interview questions.
+
+Every question in the question bank is synthesized once, offline, into a single
+bundle file plus a JSON index of byte offsets. At runtime the bundle is
+memory-mapped and a lookup is a zero-copy slice. Each build writes a new
+bundle file named after its content and the index names the bundle it
+belongs to, so replacing the index is the single switch-over: a reader
+always gets an index and the bundle its offsets are for. Entries are keyed by a hash
+of (voice, rate, text), so editing a question simply stops it from matching
+until the bundle is rebuilt.
+
+    python question_audio.py build
+"""
+import io
+import os
+import sys
+import glob
+import json
+import mmap
+import time
+import hashlib
+
+BUNDLE_PATH = "question_audio.bin"
+INDEX_PATH = "question_audio.json"
+
+
+def collect_question_banks():
+    """Every question of every bank in the question store, keyed by bank."""
+    from question_bank import get_question_bank
+
+    store = get_question_bank()
+    return {bank: store.all_questions(bank) for bank in store.banks()}
+
+
+def audio_key(text, voice=None, rate=150):
+    return hashlib.sha1(f"{voice}|{rate}|{text}".encode('utf-8')).hexdigest()
+
+
+class QuestionAudioBundle:
+    """Read-only, memory-mapped view of a built bundle."""
+
+    def __init__(self, bundle_path=BUNDLE_PATH, index_path=INDEX_PATH):
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+        self.voice = index["voice"]
+        self.rate = index["rate"]
+        self.entries = index["entries"]
+        # Indexes from before bundles were versioned name none
+        if "bundle" in index:
+            bundle_path = os.path.join(os.path.dirname(os.path.abspath(index_path)), index["bundle"])
+        self.bundle_path = bundle_path
+        with open(bundle_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._view = memoryview(self._map)
+
+    def lookup(self, text, voice=None, rate=150):
+        """Returns the audio for text as a memoryview, or None if it isn't in the bundle."""
+        entry = self.entries.get(audio_key(text, voice, rate))
+        if entry is None:
+            return None
+        offset, length = entry[0], entry[1]
+        return self._view[offset:offset + length]
+
+    def missing(self, texts, voice=None, rate=150):
+        return [text for text in texts if audio_key(text, voice, rate) not in self.entries]
+
+    def close(self):
+        self._view.release()
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                # Audio handed out by lookup() is still in use; the map closes once it is dropped
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_bundle(bundle_path=BUNDLE_PATH, index_path=INDEX_PATH):
+    """Opens the bundle, or returns None if it hasn't been built yet."""
+    if not os.path.exists(index_path):
+        return None
+    try:
+        return QuestionAudioBundle(bundle_path, index_path)
+    except FileNotFoundError:
+        return None
+
+
+def _versioned(bundle_path, digest):
+    root, ext = os.path.splitext(bundle_path)
+    return f"{root}.{digest[:12]}{ext}"
+
+
+def build_bundle(banks=None, voice=None, rate=150, bundle_path=BUNDLE_PATH, index_path=INDEX_PATH):
+    """
+    Renders every question into the bundle. Audio for questions that haven't
+    changed is copied over from the previous bundle instead of re-synthesized.
+    """
+    from tts_audio import synthesize
+
+    banks = banks or collect_question_banks()
+    previous = load_bundle(bundle_path, index_path)
+    texts = list(dict.fromkeys(text for questions in banks.values() for text in questions))
+
+    entries = {}
+    rendered = reused = 0
+    digest = hashlib.sha1()
+    tmp_bundle = bundle_path + ".tmp"
+    data = None
+    try:
+        with open(tmp_bundle, 'wb') as out:
+            for text in texts:
+                data = previous.lookup(text, voice, rate) if previous else None
+                if data is None:
+                    data = synthesize(text, voice, rate)
+                    rendered += 1
+                else:
+                    reused += 1
+                entries[audio_key(text, voice, rate)] = [out.tell(), len(data), text]
+                out.write(data)
+                digest.update(data)
+            # The last view into the previous bundle has to go before its map is closed
+            data = None
+    finally:
+        if previous:
+            previous.close()
+
+    # The new bundle gets its own name, so the old one stays intact for readers
+    # still using the old index; replacing the index is what switches them over
+    new_bundle = _versioned(bundle_path, digest.hexdigest())
+    os.replace(tmp_bundle, new_bundle)
+    tmp_index = index_path + ".tmp"
+    with open(tmp_index, 'w', encoding='utf-8') as f:
+        json.dump({"voice": voice, "rate": rate, "bundle": os.path.basename(new_bundle), "entries": entries},
+                  f, indent=1)
+    os.replace(tmp_index, index_path)
+    _remove_stale(bundle_path, keep=new_bundle)
+    return rendered, reused
+
+
+def _remove_stale(bundle_path, keep):
+    """Deletes bundles of earlier builds (a running app keeps its open map on POSIX)."""
+    root, ext = os.path.splitext(bundle_path)
+    for path in glob.glob(f"{glob.escape(root)}.*{ext}") + [bundle_path]:
+        if os.path.exists(path) and not os.path.samefile(path, keep):
+            try:
+                os.remove(path)
+            except OSError:
+                # Still mapped by a running app on Windows; the next build removes it
+                pass
+
+
+def play(data):
+    """Plays bundle audio through pygame's mixer and waits for it to finish."""
+    import pygame
+
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    channel = pygame.mixer.Sound(file=io.BytesIO(data)).play()
+    while channel.get_busy():
+        time.sleep(0.01)
+
+
+def make_question_speaker(speak, voice=None, rate=150):
+    """Returns a speak function that plays pre-rendered audio for bundled questions."""
+    bundle = load_bundle()
+
+    def speak_question(text):
+        data = bundle.lookup(text, voice, rate) if bundle else None
+        if data is None:
+            return speak(text)
+        try:
+            play(data)
+        except Exception:
+            speak(text)
+
+    return speak_question
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build"]:
+        sys.exit("usage: python question_audio.py build")
+    start = time.perf_counter()
+    rendered, reused = build_bundle()
+    print(f"✅ Question audio bundle built in {time.perf_counter() - start:.1f}s "
+          f"({rendered} rendered, {reused} reused) -> {BUNDLE_PATH}")
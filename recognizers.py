@@ -0,0 +1,291 @@
+import os
+import json
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+from audioop_compat import audioop
+from audio_buffer import PcmConverter, UtteranceBuffer
+from tracing import span
+
+
+class SpeechBackend:
+    """
+    Speech-to-text backend fed with 16-bit mono PCM chunks while the candidate speaks.
+
+    Call start() before an utterance, accept() for every chunk (it returns the
+    partial transcript so far) and finish() once speech has ended. finish()
+    raises sr.UnknownValueError when nothing was recognized, like the
+    speech_recognition recognizers do.
+
+    Chunks may be memoryviews into a capture buffer that is reused for the
+    next chunk, so a backend has to copy whatever it keeps.
+    """
+
+    name = "base"
+
+    def start(self, sample_rate, sample_width=2):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+    def accept(self, chunk):
+        return ""
+
+    def end_segment(self):
+        """Called when the candidate pauses mid-answer; a good place to cut a segment."""
+
+    def finish(self):
+        raise NotImplementedError
+
+    def transcribe(self, audio, chunk_seconds=1.0):
+        """Transcribes a complete sr.AudioData, fed in chunks sliced from it without copying."""
+        with span("stt.transcribe", backend=self.name):
+            self.start(audio.sample_rate, audio.sample_width)
+            data = memoryview(audio.get_raw_data()).cast("B")
+            step = int(audio.sample_rate * chunk_seconds) * audio.sample_width
+            for offset in range(0, len(data), step):
+                self.accept(data[offset:offset + step])
+            return self.finish()
+
+
+class GoogleBackend(SpeechBackend):
+    """
+    The Google Web Speech API. Needs the network and only runs once speech
+    has ended, so the answer is kept as 16 kHz mono in a buffer allocated
+    once for `max_seconds` and reused for every answer.
+    """
+
+    name = "google"
+
+    def __init__(self, recognizer=None, max_seconds=180):
+        self.recognizer = recognizer or sr.Recognizer()
+        self.buffer = UtteranceBuffer(max_seconds)
+
+    def start(self, sample_rate, sample_width=2):
+        super().start(sample_rate, sample_width)
+        self.converter = PcmConverter(sample_rate, sample_width, target_rate=self.buffer.sample_rate)
+        self.buffer.reset()
+
+    def accept(self, chunk):
+        self.buffer.append(self.converter.convert(chunk))
+        return ""
+
+    def finish(self):
+        audio = sr.AudioData(self.buffer.view(), self.buffer.sample_rate, 2)
+        return self.recognizer.recognize_google(audio)
+
+
+class VoskBackend(SpeechBackend):
+    """
+    Offline streaming recognition with Vosk. Audio is decoded as it arrives,
+    so finish() only has to flush the last few hundred milliseconds.
+    """
+
+    name = "vosk"
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path or os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
+
+    def _model(self):
+        import vosk
+
+        with self._models_lock:
+            if self.model_path not in self._models:
+                vosk.SetLogLevel(-1)
+                self._models[self.model_path] = vosk.Model(self.model_path)
+            return self._models[self.model_path]
+
+    def start(self, sample_rate, sample_width=2):
+        import vosk
+
+        super().start(sample_rate, sample_width)
+        self.decoder = vosk.KaldiRecognizer(self._model(), sample_rate)
+        self.committed = []
+
+    def accept(self, chunk):
+        if self.sample_width != 2:
+            chunk = audioop.lin2lin(chunk, self.sample_width, 2)
+        if self.decoder.AcceptWaveform(bytes(chunk)):
+            self._commit(json.loads(self.decoder.Result()).get("text", ""))
+            return " ".join(self.committed)
+        partial = json.loads(self.decoder.PartialResult()).get("partial", "")
+        return " ".join(self.committed + ([partial] if partial else []))
+
+    def _commit(self, text):
+        if text:
+            self.committed.append(text)
+
+    def finish(self):
+        self._commit(json.loads(self.decoder.FinalResult()).get("text", ""))
+        transcript = " ".join(self.committed)
+        if not transcript:
+            raise sr.UnknownValueError()
+        return transcript
+
+
+class WhisperCppBackend(SpeechBackend):
+    """
+    Offline recognition with whisper.cpp (pywhispercpp). Whisper works on whole
+    segments, so audio is cut into pieces (at pauses when the VAD reports them
+    through end_segment(), otherwise every segment_seconds) that are
+    transcribed on a worker thread while the candidate keeps talking; finish()
+    only has to transcribe the final, partial segment.
+    """
+
+    name = "whisper"
+    SAMPLE_RATE = 16000
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model=None, segment_seconds=5):
+        self.model_name = model or os.getenv("WHISPER_MODEL", "base.en")
+        self.segment_bytes = int(segment_seconds * self.SAMPLE_RATE) * 2
+        self.min_segment_bytes = self.SAMPLE_RATE * 2
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
+
+    def _model(self):
+        from pywhispercpp.model import Model
+
+        with self._models_lock:
+            if self.model_name not in self._models:
+                self._models[self.model_name] = Model(self.model_name, print_progress=False, print_realtime=False)
+            return self._models[self.model_name]
+
+    def start(self, sample_rate, sample_width=2):
+        super().start(sample_rate, sample_width)
+        self._model()
+        self.pending = bytearray()
+        self.segments = []
+        self.converter = PcmConverter(sample_rate, sample_width, target_rate=self.SAMPLE_RATE)
+
+    def _transcribe(self, pcm):
+        import numpy as np
+
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        return " ".join(segment.text.strip() for segment in self._model().transcribe(samples))
+
+    def _submit(self):
+        self.segments.append(self._worker.submit(self._transcribe, bytes(self.pending)))
+        self.pending = bytearray()
+
+    def accept(self, chunk):
+        self.pending += self.converter.convert(chunk)
+        if len(self.pending) >= self.segment_bytes:
+            self._submit()
+        return " ".join(f.result() for f in self.segments if f.done())
+
+    def end_segment(self):
+        # Cutting at a pause keeps words whole; very short pieces transcribe badly
+        if len(self.pending) >= self.min_segment_bytes:
+            self._submit()
+
+    def finish(self):
+        if self.pending:
+            self._submit()
+        transcript = " ".join(text for text in (f.result() for f in self.segments) if text)
+        if not transcript:
+            raise sr.UnknownValueError()
+        return transcript
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+    "whisper": WhisperCppBackend,
+}
+
+
+def get_backend(name=None, **kwargs):
+    """
+    Creates the backend named by `name` or the STT_BACKEND env var (default: google).
+    vosk and whisper are imported on first use and come from requirements-offline.txt.
+    """
+    name = name or os.getenv("STT_BACKEND", "google")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown speech backend '{name}', expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+def _adjust_threshold(recognizer, energy, seconds):
+    # recognizer.listen()'s asymmetric moving average of the ambient energy
+    if recognizer.dynamic_energy_threshold:
+        damping = recognizer.dynamic_energy_adjustment_damping ** seconds
+        target = energy * recognizer.dynamic_energy_ratio
+        recognizer.energy_threshold = recognizer.energy_threshold * damping + target * (1 - damping)
+
+
+def listen_streaming(recognizer, source, backend, on_partial=None, timeout=None, phrase_time_limit=None):
+    """
+    Feeds microphone audio to the backend chunk by chunk while the candidate
+    is still speaking and returns the final transcript.
+
+    Phrases are detected as recognizer.listen() does (energy threshold,
+    pause_threshold, phrase_threshold), but the stream is read here:
+    listen(stream=True) repeats a phrase's last chunk and has already yielded
+    short noise bursts by the time it discards them. Here a phrase reaches the
+    backend only once it is longer than phrase_threshold, and each chunk once.
+    """
+    seconds = source.CHUNK / source.SAMPLE_RATE
+    pause_chunks = math.ceil(recognizer.pause_threshold / seconds)
+    phrase_chunks = math.ceil(recognizer.phrase_threshold / seconds)
+    pre_roll = deque(maxlen=max(1, math.ceil(recognizer.non_speaking_duration / seconds)))
+    # Chunks of a phrase not yet long enough to count as speech; None while waiting for one
+    held = None
+    streaming = False
+    elapsed = start = 0.0
+    phrase = pauses = 0
+
+    def feed(chunk):
+        partial = backend.accept(chunk)
+        if partial and on_partial:
+            on_partial(partial)
+
+    backend.start(source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+    with span("mic.listen", backend=backend.name):
+        while True:
+            chunk = source.stream.read(source.CHUNK)
+            if not chunk:
+                break
+            elapsed += seconds
+            energy = audioop.rms(chunk, source.SAMPLE_WIDTH)
+            loud = energy > recognizer.energy_threshold
+            if held is None and not streaming:
+                if timeout and elapsed > timeout:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+                if loud:
+                    held, start, phrase, pauses = list(pre_roll) + [chunk], elapsed, 0, 0
+                    pre_roll.clear()
+                else:
+                    pre_roll.append(chunk)
+                    _adjust_threshold(recognizer, energy, seconds)
+                continue
+            if phrase_time_limit and elapsed - start > phrase_time_limit:
+                break
+            phrase += 1
+            pauses = 0 if loud else pauses + 1
+            if streaming:
+                feed(chunk)
+            else:
+                held.append(chunk)
+            if pauses > pause_chunks:
+                if streaming:
+                    break
+                # Too short to be speech: drop it and wait for the answer to start
+                held = None
+                continue
+            if not streaming and phrase - pauses >= phrase_chunks:
+                streaming = True
+                for part in held:
+                    feed(part)
+                held = None
+        # The stream ended (or hit phrase_time_limit) during a short phrase: it is all there is
+        for part in held or ():
+            feed(part)
+    # Time left between end of speech and a usable transcript
+    with span("stt.finish", backend=backend.name):
+        return backend.finish()
@@ -0,0 +1,96 @@
+"""
+Append-only response logs, one JSONL file per session.
+
+Each turn is one appended line, so saving costs the same on the last
+question as on the first and a crash loses nothing that was already
+answered. `export` compacts a log into the interview_responses.json format.
+
+    python response_log.py export session_1745000000 [interview_responses.json]
+"""
+import os
+import sys
+import json
+import time
+
+from tracing import traced
+
+LOG_DIR = "responses"
+
+
+def log_path(session_id, directory=LOG_DIR):
+    return os.path.join(directory, f"{session_id}.jsonl")
+
+
+class ResponseLog:
+    """
+    Appends responses for one session. Every line is flushed to the OS right
+    away; fsync is batched to every `fsync_every` lines or `fsync_interval`
+    seconds, whichever comes first.
+    """
+
+    def __init__(self, session_id, directory=LOG_DIR, fsync_every=4, fsync_interval=2.0):
+        os.makedirs(directory, exist_ok=True)
+        self.session_id = session_id
+        self.directory = directory
+        self.path = log_path(session_id, directory)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._file = open(self.path, "a", encoding='utf-8')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @traced("persist.append")
+    def append(self, response):
+        self._file.write(json.dumps(response, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_log(path):
+    """Returns the logged responses, ignoring a torn last line left by a crash."""
+    responses = []
+    if not os.path.exists(path):
+        return responses
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                responses.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return responses
+
+
+@traced("persist.export")
+def export(session_id, output="interview_responses.json", directory=LOG_DIR):
+    """Writes a session's log as a JSON list, atomically replacing `output`."""
+    responses = read_log(log_path(session_id, directory))
+    tmp = output + ".tmp"
+    with open(tmp, "w", encoding='utf-8') as f:
+        json.dump(responses, f, indent=4)
+    os.replace(tmp, output)
+    return output
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4) or sys.argv[1] != "export":
+        sys.exit("usage: python response_log.py export <session_id> [output.json]")
+    print(f"✅ Exported to {export(*sys.argv[2:])}")
@@ -0,0 +1,381 @@
+"""
+Interview server: many independent interview sessions in one process.
+
+Clients create a session, then post each answer as text (JSON) or as a WAV
+upload, over HTTP or a WebSocket. Speech recognition and synthesis run on
+bounded thread pools, LLM calls are capped by a semaphore, and every session
+has its own question cursor, chat history and response log.
+
+    python server.py --port 8080
+
+    POST   /sessions                  -> {"session_id", "question"}
+    POST   /sessions/{id}/answer      JSON {"text": ...} or audio/wav body
+    GET    /sessions/{id}             -> responses so far
+    DELETE /sessions/{id}
+    GET    /sessions/{id}/ws          WebSocket: send JSON {"text"} or binary WAV
+    GET    /stats                     -> open sessions, capture buffer memory and LLM tail latency
+
+Sessions with no request for --session-idle-minutes are closed.
+"""
+import io
+import json
+import time
+import uuid
+import wave
+import base64
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+from aiohttp import web, WSMsgType
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+from audio_buffer import buffer_stats
+from history_window import WindowedChatHistory
+from local_feedback import assess, instant_reply
+from prompts import feedback_inputs, feedback_prompt
+from recognizers import get_backend
+from response_log import ResponseLog, LOG_DIR
+from tracing import span, set_session
+
+NO_FOLLOWUP = "No further questions."
+
+
+class UnknownSession(LookupError):
+    """No open session has this id (never created, closed or expired)."""
+
+
+class InterviewFinished(Exception):
+    """Every question of the session has been answered."""
+
+
+class BadAnswer(ValueError):
+    """An answer body that is not a JSON {"text"} object or a mono WAV file."""
+
+
+def build_feedback_runnable(llm, store, template):
+    """The app_memory.py feedback chain, with windowed history from `store`."""
+    return RunnableWithMessageHistory(
+        feedback_prompt(template) | llm,
+        lambda session_id: WindowedChatHistory(session_id, store, log_tokens=False),
+        input_messages_key="input",
+        history_messages_key="history",
+    )
+
+
+def read_wav(data):
+    """Returns an sr.AudioData for an uploaded WAV file, sharing the upload's memory."""
+    stream = io.BytesIO(data)
+    try:
+        with wave.open(stream, 'rb') as f:
+            if f.getnchannels() != 1:
+                raise BadAnswer("expected a mono WAV upload: audio must be mono")
+            # wave stops at the start of the data chunk, so the PCM can be sliced out without a copy
+            start = stream.tell()
+            size = f.getnframes() * f.getsampwidth()
+            return sr.AudioData(memoryview(data)[start:start + size], f.getframerate(), f.getsampwidth())
+    except (wave.Error, EOFError) as e:
+        raise BadAnswer(f"expected a mono WAV upload: {str(e) or 'truncated file'}") from e
+
+
+def read_text(data):
+    """The answer text of a JSON {"text": ...} body."""
+    try:
+        body = json.loads(data)
+    except ValueError as e:
+        raise BadAnswer(f"invalid JSON: {e}") from e
+    if not isinstance(body, dict) or not isinstance(body.get("text"), str):
+        raise BadAnswer('expected a JSON object with a "text" string')
+    return body["text"]
+
+
+class Session:
+    """Per-candidate state. Turns within one session are serialized by its lock."""
+
+    def __init__(self, session_id, questions, response_log):
+        self.session_id = session_id
+        self.questions = questions
+        self.index = 0
+        self.responses = []
+        self.response_log = response_log
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+
+    @property
+    def question(self):
+        return self.questions[self.index] if self.index < len(self.questions) else None
+
+
+class InterviewServer:
+    """Transport-independent core: sessions, worker pools and the turn pipeline."""
+
+    def __init__(self, runnable, questions, stt_backend=get_backend, synthesize=None,
+                 stt_workers=4, tts_workers=2, max_llm_calls=32, log_dir=LOG_DIR, idle_timeout=1800):
+        self.runnable = runnable
+        self.questions = questions
+        self.stt_backend = stt_backend
+        self.synthesize = synthesize
+        self.log_dir = log_dir
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self._stt_pool = ThreadPoolExecutor(max_workers=stt_workers, thread_name_prefix="stt")
+        # One backend per STT worker, so capture buffers are allocated once per thread, not per answer
+        self._stt_local = threading.local()
+        self._tts_pool = ThreadPoolExecutor(max_workers=tts_workers, thread_name_prefix="tts")
+        self._llm_slots = asyncio.Semaphore(max_llm_calls)
+
+    def create_session(self):
+        session_id = f"session_{uuid.uuid4().hex[:12]}"
+        session = Session(session_id, list(self.questions), ResponseLog(session_id, self.log_dir))
+        self.sessions[session_id] = session
+        return {"session_id": session_id, "question": session.question}
+
+    def close_session(self, session_id):
+        session = self.sessions.pop(session_id)
+        session.response_log.close()
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise UnknownSession(f"unknown session {session_id}")
+        session.last_active = time.monotonic()
+        return session
+
+    def expire_idle(self):
+        """Closes sessions idle for longer than idle_timeout; returns how many."""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [session_id for session_id, session in self.sessions.items()
+                   if session.last_active < cutoff and not session.lock.locked()]
+        for session_id in expired:
+            self.close_session(session_id)
+        return len(expired)
+
+    def _stt(self, audio):
+        backend = getattr(self._stt_local, "backend", None)
+        if backend is None:
+            backend = self._stt_local.backend = self.stt_backend()
+        return backend.transcribe(audio)
+
+    async def _transcribe(self, audio):
+        loop = asyncio.get_running_loop()
+        try:
+            with span("turn.stt"):
+                return await loop.run_in_executor(self._stt_pool, self._stt, audio)
+        except sr.UnknownValueError:
+            return "[Unrecognized speech]"
+        except sr.RequestError:
+            return "[Speech service error]"
+
+    async def answer(self, session_id, text=None, audio=None, speak=False):
+        """Runs one turn: STT (for audio), LLM feedback, optional TTS and persistence."""
+        session = self.get(session_id)
+        set_session(session_id)
+        async with session.lock:
+            question = session.question
+            if question is None:
+                raise InterviewFinished("interview already finished")
+            timings = {}
+            start = time.perf_counter()
+
+            if audio is not None:
+                text = await self._transcribe(audio)
+                timings["stt"] = time.perf_counter() - start
+
+            next_index = session.index + 1
+            followup = session.questions[next_index] if next_index < len(session.questions) else NO_FOLLOWUP
+            llm_start = time.perf_counter()
+            # Empty, unrecognized or one-word answers are answered locally without an LLM call
+            assessment = assess(text, question=question)
+            if assessment["trivial"]:
+                feedback = instant_reply(assessment, followup)
+                timings["local"] = time.perf_counter() - llm_start
+            else:
+                async with self._llm_slots:
+                    with span("turn.llm"):
+                        result = await self.runnable.ainvoke(
+                            feedback_inputs(question, text, followup),
+                            config={"configurable": {"session_id": session_id}}
+                        )
+                feedback = result.content
+                timings["llm"] = time.perf_counter() - llm_start
+
+            response = {"question": question, "answer": text, "feedback": feedback,
+                        "latency": round(time.perf_counter() - llm_start, 3)}
+            reply = {**response, "next_question": session.questions[next_index] if next_index < len(session.questions) else None}
+            if speak and self.synthesize:
+                tts_start = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                with span("turn.tts"):
+                    reply["audio"] = await loop.run_in_executor(self._tts_pool, self.synthesize, feedback)
+                timings["tts"] = time.perf_counter() - tts_start
+
+            # File writes (and batched fsyncs) stay off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, session.response_log.append, response)
+            session.responses.append(response)
+            session.index = next_index
+            timings["total"] = time.perf_counter() - start
+            reply["timings"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+            return reply
+
+    def shutdown(self):
+        for session_id in list(self.sessions):
+            self.close_session(session_id)
+        self._stt_pool.shutdown(wait=False)
+        self._tts_pool.shutdown(wait=False)
+
+
+def _json_reply(reply):
+    if "audio" in reply:
+        reply = {**reply, "audio": base64.b64encode(reply["audio"]).decode('ascii')}
+    return reply
+
+
+# Errors of the transport-independent core, as HTTP statuses
+ERROR_STATUS = {UnknownSession: web.HTTPNotFound, InterviewFinished: web.HTTPConflict, BadAnswer: web.HTTPBadRequest}
+SERVER_ERRORS = tuple(ERROR_STATUS)
+
+
+@web.middleware
+async def map_errors(request, handler):
+    try:
+        return await handler(request)
+    except SERVER_ERRORS as e:
+        raise next(status for error, status in ERROR_STATUS.items() if isinstance(e, error))(text=str(e))
+
+
+def create_app(server, expire_every=60):
+    routes = web.RouteTableDef()
+
+    @routes.post("/sessions")
+    async def create_session(request):
+        return web.json_response(server.create_session())
+
+    @routes.get("/stats")
+    async def stats(request):
+        stats = {"sessions": len(server.sessions), "audio_buffers": buffer_stats()}
+        if hasattr(server.runnable, "stats"):
+            stats["llm"] = server.runnable.stats()
+        return web.json_response(stats)
+
+    @routes.get("/sessions/{session_id}")
+    async def get_session(request):
+        session = server.get(request.match_info["session_id"])
+        return web.json_response({"session_id": session.session_id, "question": session.question,
+                                  "responses": session.responses})
+
+    @routes.delete("/sessions/{session_id}")
+    async def delete_session(request):
+        server.get(request.match_info["session_id"])
+        server.close_session(request.match_info["session_id"])
+        return web.json_response({"closed": True})
+
+    @routes.post("/sessions/{session_id}/answer")
+    async def answer(request):
+        speak = request.query.get("speak") == "1"
+        if request.content_type == "application/json":
+            text = read_text(await request.read())
+            reply = await server.answer(request.match_info["session_id"], text=text, speak=speak)
+        else:
+            audio = read_wav(await request.read())
+            reply = await server.answer(request.match_info["session_id"], audio=audio, speak=speak)
+        return web.json_response(_json_reply(reply))
+
+    @routes.get("/sessions/{session_id}/ws")
+    async def websocket(request):
+        session_id = request.match_info["session_id"]
+        server.get(session_id)
+        speak = request.query.get("speak") == "1"
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for message in ws:
+            try:
+                if message.type == WSMsgType.TEXT:
+                    reply = await server.answer(session_id, text=read_text(message.data), speak=speak)
+                elif message.type == WSMsgType.BINARY:
+                    reply = await server.answer(session_id, audio=read_wav(message.data), speak=speak)
+                else:
+                    continue
+            except SERVER_ERRORS as e:
+                await ws.send_json({"error": str(e)})
+                continue
+            audio = reply.pop("audio", None)
+            await ws.send_json(reply)
+            if audio is not None:
+                await ws.send_bytes(audio)
+        return ws
+
+    async def expire_sessions():
+        while True:
+            await asyncio.sleep(expire_every)
+            server.expire_idle()
+
+    async def start(app):
+        app["expiry"] = asyncio.create_task(expire_sessions())
+
+    async def shutdown(app):
+        app["expiry"].cancel()
+        server.shutdown()
+
+    app = web.Application(client_max_size=32 * 1024 ** 2, middlewares=[map_errors])
+    app.add_routes(routes)
+    app.on_startup.append(start)
+    app.on_cleanup.append(shutdown)
+    return app
+
+
+def build_runnable(store, template, max_llm_calls=32, make_llm=None):
+    """
+    The server's feedback runnable: Gemini behind ResilientLLM, with the
+    fallback model. make_llm(model) builds each chat model (feedback_llm by default).
+    """
+    from llm_client import FALLBACK_MODEL, ResilientLLM
+    from prompts import feedback_llm
+
+    make_llm = make_llm or feedback_llm
+    # Resilient calls, with the cheaper model as fallback (see llm_client.py)
+    return ResilientLLM(
+        build_feedback_runnable(make_llm("gemini-2.0-flash"), store, template),
+        fallback=build_feedback_runnable(make_llm(FALLBACK_MODEL), store, template),
+        max_workers=max_llm_calls, max_attempts=max_llm_calls * 2,
+    )
+
+
+def main():
+    from dotenv import load_dotenv
+    from batch_eval import read_constant
+    from history_store import get_history_store
+    from history_retention import HistoryMaintenance
+    from question_bank import get_question_bank
+    from tts_audio import synthesize
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--stt-workers", type=int, default=4)
+    parser.add_argument("--tts-workers", type=int, default=2)
+    parser.add_argument("--max-llm-calls", type=int, default=32)
+    parser.add_argument("--session-idle-minutes", type=float, default=30,
+                        help="close sessions that have had no request for this long")
+    parser.add_argument("--history-max-age-days", type=float, default=30,
+                        help="archive sessions inactive for longer than this out of memory.db")
+    args = parser.parse_args()
+
+    load_dotenv()
+    store = get_history_store("memory.db")
+    template = read_constant("app_memory.py", "feedback_template")
+    runnable = build_runnable(store, template, args.max_llm_calls)
+    server = InterviewServer(
+        runnable, get_question_bank().questions("ml"), synthesize=synthesize,
+        stt_workers=args.stt_workers, tts_workers=args.tts_workers, max_llm_calls=args.max_llm_calls,
+        idle_timeout=args.session_idle_minutes * 60
+    )
+    # Archive old sessions and reclaim their pages in the background; open sessions are never touched
+    HistoryMaintenance("memory.db", max_age_days=args.history_max_age_days,
+                       active=lambda: list(server.sessions)).start()
+    web.run_app(create_app(server), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Speculative feedback: start drafting while the candidate is still answering.
+
+Feedback generation normally starts only once the endpointer has waited
+out the final pause and the speech backend has produced the full
+transcript, so the LLM's time to first token stacks on top of both. With
+a streaming backend (vosk, whisper) the partial transcript is known while
+the candidate speaks. Once they have been silent for `hold_seconds`
+(shorter than the end-of-answer pause) feedback is drafted from the
+transcript so far on a background thread. At that point they may be
+finished or only pausing.
+
+When the final transcript arrives, take() decides what happens to the draft:
+
+- It is used if the final transcript has the same words as the drafted
+  text, apart from trailing fillers ("um", "uh"). Words the model never saw
+  could change what the answer means, so any other tail discards the draft.
+  Its buffered chunks are replayed and the rest streams as it arrives, so
+  the head start it got during the pause (and the STT finish) is kept.
+- A used draft gets `first_token_timeout` seconds from take() to say
+  something and `stall_timeout` seconds between chunks. If it says nothing
+  in time, feedback comes from the final transcript; if it stalls midway,
+  a local sentence moves on (marked as a local fallback, so FeedbackCache
+  does not store it).
+- Otherwise it is cancelled and feedback comes from the final transcript
+  as before. The draft and the final prompt are identical up to the end
+  of the drafted answer, so a model-side prefix cache can reuse that part.
+
+When the candidate goes on and pauses again with `min_new_words` more
+words, a new draft replaces the old one. Drafts must not write chat history;
+`commit(question, answer, followup_question, text)` records the exchange
+once a draft has been used and fully streamed. With the Google backend
+there are no partials, so nothing is drafted.
+"""
+import re
+import time
+import threading
+import contextvars
+
+from local_feedback import FILLERS, move_on
+from tracing import span
+from tts_stream import chunk_text
+
+WORD = re.compile(r"[a-z0-9']+")
+
+
+def _words(text):
+    return WORD.findall(text.lower())
+
+
+class _Draft:
+    """One draft streaming on a daemon thread into a buffer that take() can replay."""
+
+    def __init__(self, make_stream, question, answer, followup_question):
+        self.question = question
+        self.followup_question = followup_question
+        self.words = _words(answer)
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cancelled = threading.Event()
+        self._changed = threading.Condition()
+        threading.Thread(target=contextvars.copy_context().run, name="feedback-draft", daemon=True,
+                         args=(self._run, make_stream, question, answer, followup_question)).start()
+
+    def _run(self, make_stream, question, answer, followup_question):
+        try:
+            with span("llm.draft", words=len(self.words)):
+                stream = make_stream(question, answer, followup_question)
+                try:
+                    for chunk in stream:
+                        if self.cancelled.is_set():
+                            return
+                        with self._changed:
+                            self.chunks.append(chunk)
+                            self._changed.notify_all()
+                finally:
+                    close = getattr(stream, "close", None)
+                    if close:
+                        close()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def replay(self, first_token_timeout, stall_timeout):
+        """Yields the buffered chunks, then the rest as they arrive; TimeoutError when it stalls."""
+        i = 0
+        while True:
+            with self._changed:
+                timeout = first_token_timeout if i == 0 else stall_timeout
+                if not self._changed.wait_for(lambda: i < len(self.chunks) or self.done, timeout):
+                    self.cancel()
+                    raise TimeoutError("feedback draft stalled")
+                if i >= len(self.chunks):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                chunk = self.chunks[i]
+            i += 1
+            yield chunk
+
+
+class SpeculativeFeedback:
+    """
+    Drafts feedback from partial transcripts. `draft(question, answer,
+    followup_question)` returns a chunk stream for a draft, and it must not
+    write chat history.
+
+    Per answer:
+    - begin() is called before listening;
+    - update() is called with every partial transcript;
+    - pause() is called with the length of the current silence;
+    - take() is called with the final transcript.
+    """
+
+    def __init__(self, draft, commit=None, hold_seconds=0.4, min_words=8, min_new_words=5,
+                 first_token_timeout=4.0, stall_timeout=10.0):
+        self.draft = draft
+        self.commit = commit
+        self.hold_seconds = hold_seconds
+        self.min_words = min_words
+        self.min_new_words = min_new_words
+        self.first_token_timeout = first_token_timeout
+        self.stall_timeout = stall_timeout
+        self.drafts = 0
+        self.replaced = 0
+        self.hits = 0
+        self.misses = 0
+        self.ready_seconds = 0.0
+        self._question = None
+        self._followup = None
+        self._text = ""
+        self._current = None
+        self._lock = threading.Lock()
+
+    def begin(self, question, followup_question):
+        """Starts a new answer; any draft left from the last one is dropped."""
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel()
+            self._current = None
+            self._question = question
+            self._followup = followup_question
+            self._text = ""
+
+    def update(self, partial):
+        self._text = partial
+
+    def pause(self, seconds):
+        """Called on each silent frame; drafts once the pause is long enough and the text has grown."""
+        if seconds < self.hold_seconds or self._question is None:
+            return
+        text = self._text
+        words = len(_words(text))
+        with self._lock:
+            if words < self.min_words or (self._current is not None and
+                                          words - len(self._current.words) < self.min_new_words):
+                return
+            if self._current is not None:
+                self._current.cancel()
+                self.replaced += 1
+            self.drafts += 1
+            self._current = _Draft(self.draft, self._question, text, self._followup)
+
+    def take(self, question, answer, followup_question, make_stream):
+        """The feedback stream for the final answer: the draft if it still fits, else make_stream()."""
+        with self._lock:
+            draft, self._current = self._current, None
+            self._question = None
+        if draft is None:
+            return make_stream()
+        words = _words(answer)
+        tail = words[len(draft.words):]
+        if (draft.error is None and draft.question == question and draft.followup_question == followup_question
+                and words[:len(draft.words)] == draft.words and all(word in FILLERS for word in tail)):
+            self.hits += 1
+            return self._use(draft, question, answer, followup_question, make_stream)
+        draft.cancel()
+        self.misses += 1
+        return make_stream()
+
+    def _use(self, draft, question, answer, followup_question, make_stream):
+        start = time.perf_counter()
+        parts = []
+        try:
+            for chunk in draft.replay(self.first_token_timeout, self.stall_timeout):
+                if not parts:
+                    self.ready_seconds += time.perf_counter() - start
+                parts.append(chunk_text(chunk))
+                yield chunk
+        except Exception:
+            # A draft that failed or hung before saying anything is simply not used
+            if not parts:
+                self.hits -= 1
+                self.misses += 1
+                yield from make_stream()
+                return
+            from langchain_core.messages import AIMessageChunk
+
+            # Same as ResilientLLM's broken stream: what was said stays and a local sentence moves on
+            text = " " + move_on(followup_question)
+            parts.append(text)
+            yield AIMessageChunk(content=text, response_metadata={"fallback": "local"})
+        if self.commit:
+            self.commit(question, answer, followup_question, "".join(parts))
+
+    def stats(self):
+        return {
+            "drafts": self.drafts,
+            "replaced": self.replaced,
+            "hits": self.hits,
+            "misses": self.misses,
+            "wasted_drafts": self.drafts - self.hits,
+            "mean_hit_wait_ms": round(self.ready_seconds / self.hits * 1000, 1) if self.hits else None,
+        }
@@ -0,0 +1,19 @@
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from history_store import HistoryStore  # noqa: E402
+
+
+def test_connections_are_reused_across_threads(tmp_path):
+    store = HistoryStore(str(tmp_path / "memory.db"))
+    for i in range(10):
+        thread = threading.Thread(target=store.append, args=("s", [{"turn": i}]))
+        thread.start()
+        thread.join()
+    assert store.load("s") == [{"turn": i} for i in range(10)]
+    # One call at a time never needs a second connection
+    assert store._pool.qsize() == 1
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import prompts  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def in_repo(monkeypatch):
+    # The apps and the question bank are read from the repository root
+    monkeypatch.chdir(ROOT)
+
+
+def test_every_turn_within_budget():
+    assert prompts.check() == []
+
+
+def test_over_budget_is_reported():
+    assert prompts.check({"app_memory.py": 100})
+
+
+def test_history_keeps_the_turn_not_a_placeholder():
+    inputs = prompts.feedback_inputs("Why this role?", "Because I like it", "Next?")
+    assert inputs["input"] == "Question: Why this role?\nAnswer: Because I like it"
+    assert "Next?" not in inputs["input"]
@@ -0,0 +1,41 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch_eval import read_constant  # noqa: E402
+from benchmarks.fakes import FakeChatModel  # noqa: E402
+from history_store import HistoryStore  # noqa: E402
+from server import BadAnswer, InterviewServer, build_runnable, read_wav  # noqa: E402
+
+QUESTIONS = ["Why did you choose this particular time to travel?", "Have you traveled abroad before?"]
+
+
+def test_main_runnable_answers_a_turn(tmp_path):
+    store = HistoryStore(str(tmp_path / "memory.db"))
+    template = read_constant(os.path.join(ROOT, "app_memory.py"), "feedback_template")
+    runnable = build_runnable(store, template, max_llm_calls=2,
+                              make_llm=lambda model: FakeChatModel(latency=0.0))
+    server = InterviewServer(runnable, QUESTIONS, log_dir=str(tmp_path / "logs"))
+
+    async def turn():
+        session_id = server.create_session()["session_id"]
+        return session_id, await server.answer(session_id, text="I want to see my sister graduate this June.")
+
+    try:
+        session_id, reply = asyncio.run(turn())
+    finally:
+        server.shutdown()
+    assert "next question" in reply["feedback"].lower()
+    assert reply["next_question"] == QUESTIONS[1]
+    # The turn went through the windowed history, so the store holds it
+    assert len(store.load(session_id)) == 2
+
+
+def test_truncated_wav_is_named():
+    with pytest.raises(BadAnswer, match="truncated file"):
+        read_wav(b"RIFF")
@@ -0,0 +1,178 @@
+"""
+Lightweight span tracing for the interview turn.
+
+Spans are written as JSON lines with OpenTelemetry-style fields (trace_id is
+the interview session, times in unix nanoseconds). Tracing is off unless
+INTERVIEW_TRACE is set to an output path or enable() is called; while off,
+span() returns a shared no-op object, so instrumented code pays one global
+lookup per span.
+
+    INTERVIEW_TRACE=spans.jsonl python app_memory.py
+    python tracing.py report spans.jsonl
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import secrets
+import threading
+import contextvars
+from collections import defaultdict
+
+_session = contextvars.ContextVar("trace_session", default=None)
+_parent = contextvars.ContextVar("trace_parent", default=None)
+_exporter = None
+
+
+class JsonlExporter:
+    """Buffers finished spans and appends them to a JSONL file in batches."""
+
+    def __init__(self, path, batch_size=64):
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def export(self, record):
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def _write(self, batch):
+        if batch:
+            with open(self.path, "a", encoding='utf-8') as f:
+                f.write("".join(json.dumps(record) + "\n" for record in batch))
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.exporter = _exporter
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = _parent.get()
+        self._token = _parent.set(self.span_id)
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ns = time.perf_counter_ns() - self._start
+        _parent.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.exporter.export({
+            "name": self.name,
+            "trace_id": self.attributes.pop("session", None) or _session.get(),
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.start_ns + duration_ns,
+            "duration_ms": duration_ns / 1e6,
+            "attributes": self.attributes,
+        })
+        return False
+
+
+def enable(path="spans.jsonl"):
+    global _exporter
+    _exporter = JsonlExporter(path)
+    atexit.register(_exporter.flush)
+
+
+def disable():
+    global _exporter
+    if _exporter is not None:
+        _exporter.flush()
+    _exporter = None
+
+
+def flush():
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def set_session(session_id):
+    """Tags spans started from this context (and copies of it) with the session."""
+    _session.set(session_id)
+
+
+def span(name, **attributes):
+    """Times a block: `with span("llm"):`. Pass session=... to tag it explicitly."""
+    if _exporter is None:
+        return _NOOP
+    return Span(name, attributes)
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def wrap(func):
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with Span(name, {}):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+    return wrap
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def report(path):
+    """Prints per-stage latency percentiles from a span file."""
+    durations = defaultdict(list)
+    sessions = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            durations[record["name"]].append(record["duration_ms"])
+            sessions.add(record["trace_id"])
+
+    print(f"{len(sessions)} session(s), {sum(map(len, durations.values()))} spans from {path}\n")
+    print(f"{'stage':<22} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'total s':>9}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        print(f"{name:<22} {len(values):>6} {percentile(values, 50):9.1f} {percentile(values, 90):9.1f} "
+              f"{percentile(values, 99):9.1f} {values[-1]:9.1f} {sum(values) / 1000:9.2f}")
+
+
+if os.getenv("INTERVIEW_TRACE"):
+    enable(os.getenv("INTERVIEW_TRACE"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "report":
+        sys.exit("usage: python tracing.py report spans.jsonl")
+    report(sys.argv[2])
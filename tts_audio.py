@@ -0,0 +1,72 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# pyttsx3 drivers are not thread-safe, so every synthesis goes through one lock
+_engine_lock = threading.Lock()
+
+# RAM-backed scratch space where available; the engine can only write to a path
+_scratch_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def synthesize(text, voice=None, rate=150):
+    """Renders text to audio bytes using a private scratch file that is removed right away."""
+    # Imported on first use so loading this module stays cheap
+    import pyttsx3
+
+    with _engine_lock:
+        engine = pyttsx3.init()
+        engine.setProperty('rate', rate)
+        if voice:
+            engine.setProperty('voice', voice)
+        fd, path = tempfile.mkstemp(suffix=".wav", dir=_scratch_dir)
+        os.close(fd)
+        try:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+
+def audio_format(data):
+    """MIME type for synthesized audio; the container depends on the platform's TTS driver."""
+    if data[:4] == b"RIFF":
+        return "audio/wav"
+    if data[:4] == b"FORM":
+        return "audio/aiff"
+    return "audio/mp3"
+
+
+class AudioCache:
+    """Synthesized audio kept in memory by (text, voice, rate), with LRU eviction."""
+
+    def __init__(self, max_entries=256, synthesize=synthesize):
+        self.max_entries = max_entries
+        self.synthesize = synthesize
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text, voice=None, rate=150):
+        key = (text, voice, rate)
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        data = self.synthesize(text, voice, rate)
+        with self._lock:
+            self.entries[key] = data
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return data
+
+    def prewarm(self, texts, voice=None, rate=150):
+        """Synthesizes texts on a background thread so the first request is instant."""
+        thread = threading.Thread(
+            target=lambda: [self.get(text, voice, rate) for text in texts],
+            daemon=True
+        )
+        thread.start()
+        return thread
@@ -0,0 +1,99 @@
+import re
+import time
+import queue
+import threading
+
+# Sentence boundary: terminal punctuation followed by whitespace
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Marks the end of the LLM stream on the sentence queue
+_DONE = object()
+
+
+class SentenceSplitter:
+    """Buffers streamed text and releases complete sentences as soon as they close."""
+
+    def __init__(self, min_chars=20):
+        # Very short fragments ("Okay.") are merged into the next sentence so
+        # the TTS engine isn't restarted for every couple of words
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            sentence = self.buffer[start:match.start()].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+
+def chunk_text(chunk):
+    """Returns the text of an LLM stream chunk (AIMessageChunk or plain string)."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return content or ""
+
+
+def speak_stream(chunks, speak, started_at=None):
+    """
+    Speaks LLM output sentence by sentence while later tokens are still generating.
+
+    The stream is consumed on a background thread; speech stays on the calling
+    thread because TTS engines like pyttsx3 are not safe to drive from other threads.
+    Returns the full text and a dict of timings in seconds.
+    """
+    started_at = started_at or time.perf_counter()
+    sentences = queue.Queue()
+    parts = []
+    metrics = {}
+
+    def produce():
+        splitter = SentenceSplitter()
+        try:
+            for chunk in chunks:
+                text = chunk_text(chunk)
+                parts.append(text)
+                for sentence in splitter.feed(text):
+                    sentences.put(sentence)
+            for sentence in splitter.flush():
+                sentences.put(sentence)
+        except Exception as e:
+            sentences.put(e)
+        finally:
+            metrics["generation_time"] = time.perf_counter() - started_at
+            sentences.put(_DONE)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    while True:
+        sentence = sentences.get()
+        if sentence is _DONE:
+            break
+        if isinstance(sentence, Exception):
+            producer.join()
+            raise sentence
+        if "time_to_first_audio" not in metrics:
+            metrics["time_to_first_audio"] = time.perf_counter() - started_at
+        speak(sentence)
+
+    producer.join()
+    metrics["turn_latency"] = time.perf_counter() - started_at
+    return "".join(parts), metrics
+
+
+def format_metrics(metrics):
+    first_audio = metrics.get("time_to_first_audio")
+    first_audio = f"{first_audio:.2f}s" if first_audio is not None else "n/a"
+    return f"⏱️ First audio after {first_audio}, turn took {metrics['turn_latency']:.2f}s"
@@ -0,0 +1,237 @@
+"""
+Frame-level voice activity detection and adaptive end-of-speech detection.
+
+speech_recognition ends an answer after a fixed `pause_threshold` of
+silence, so every answer costs that much dead time and slow speakers get cut
+off mid-thought. Here each 30 ms frame is classified as speech or not, and
+the Endpointer learns how long this candidate pauses *inside* answers and
+ends an answer once the silence is clearly longer than that.
+
+VAD=energy (default) uses an adaptive energy model; VAD=webrtc uses
+WebRTC's VAD when the webrtcvad package is installed.
+"""
+import os
+import time
+from collections import deque
+
+import speech_recognition as sr
+
+from audioop_compat import audioop
+from audio_buffer import PcmConverter, RingBuffer
+from tracing import span
+
+
+class EnergyVAD:
+    """
+    Speech when a frame's RMS energy is `ratio` times the noise floor. The
+    floor follows non-speech frames, so it tracks slow changes in the room.
+    """
+
+    name = "energy"
+
+    def __init__(self, frame_ms=30, ratio=3.0, adapt=0.05, min_level=100):
+        self.frame_ms = frame_ms
+        self.ratio = ratio
+        self.adapt = adapt
+        self.min_level = min_level
+
+    def reset(self, sample_rate, sample_width=2, noise_floor=None):
+        self.sample_width = sample_width
+        self.noise = noise_floor
+
+    def is_speech(self, frame):
+        level = audioop.rms(frame, self.sample_width)
+        if self.noise is None:
+            self.noise = level
+        speech = level > max(self.noise * self.ratio, self.min_level)
+        if not speech:
+            self.noise += (level - self.noise) * self.adapt
+        return speech
+
+
+class WebRtcVAD:
+    """WebRTC's GMM-based VAD. `aggressiveness` 0-3 trades missed speech for fewer false alarms."""
+
+    name = "webrtc"
+    RATES = (8000, 16000, 32000, 48000)
+
+    def __init__(self, frame_ms=30, aggressiveness=2):
+        import webrtcvad
+
+        self.frame_ms = frame_ms
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def reset(self, sample_rate, sample_width=2, noise_floor=None):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.rate = sample_rate if sample_rate in self.RATES else 16000
+        self._rate_state = None
+
+    def is_speech(self, frame):
+        if self.sample_width != 2:
+            frame = audioop.lin2lin(frame, self.sample_width, 2)
+        if self.rate != self.sample_rate:
+            frame, self._rate_state = audioop.ratecv(frame, 2, 1, self.sample_rate, self.rate, self._rate_state)
+            # ratecv can be a sample short; webrtcvad needs exact frame sizes
+            size = self.rate * self.frame_ms // 1000 * 2
+            frame = frame[:size].ljust(size, b"\0")
+        return self.vad.is_speech(bytes(frame), self.rate)
+
+
+VADS = {
+    "energy": EnergyVAD,
+    "webrtc": WebRtcVAD,
+}
+
+
+def get_vad(name=None, **kwargs):
+    """Creates the VAD named by `name` or the VAD env var (default: energy)."""
+    name = name or os.getenv("VAD", "energy")
+    if name not in VADS:
+        raise ValueError(f"Unknown VAD '{name}', expected one of {', '.join(VADS)}")
+    return VADS[name](**kwargs)
+
+
+class Endpointer:
+    """
+    Decides when an answer has started, when a speech segment closes and when
+    the answer is over.
+
+    The end-of-answer pause is `margin` times the 90th percentile of the
+    pauses this candidate made inside earlier answers (and at least `margin`
+    times the longest pause in the current one), kept between min_pause and
+    max_pause. Until there is any history it is `initial_pause`. With
+    adaptive=False it is always `initial_pause`, like pause_threshold.
+    """
+
+    SEGMENT = "segment"
+    END = "end"
+
+    def __init__(self, initial_pause=1.0, min_pause=0.5, max_pause=2.0, margin=1.3,
+                 min_speech=0.1, segment_gap=0.25, history=50, adaptive=True):
+        self.initial_pause = initial_pause
+        self.min_pause = min_pause
+        self.max_pause = max_pause
+        self.margin = margin
+        self.min_speech = min_speech
+        self.segment_gap = segment_gap
+        self.adaptive = adaptive
+        self.pauses = deque(maxlen=history)
+        self.begin()
+
+    def begin(self):
+        """Resets the per-answer state before listening for a new answer."""
+        self.started = False
+        self.position = 0.0
+        self.speech_start = None
+        self.speech_end = None
+        self._speech_run = 0.0
+        self._silence = 0.0
+        self._answer_pauses = []
+
+    def learned_pause(self):
+        if not self.pauses:
+            return self.initial_pause
+        pauses = sorted(self.pauses)
+        return pauses[min(len(pauses) - 1, int(len(pauses) * 0.9))] * self.margin
+
+    @property
+    def threshold(self):
+        if not self.adaptive:
+            return self.initial_pause
+        longest = max(self._answer_pauses, default=0.0) * self.margin
+        return min(self.max_pause, max(self.min_pause, self.learned_pause(), longest))
+
+    def update(self, speech, seconds):
+        """Feeds one frame's decision; returns SEGMENT, END or None."""
+        self.position += seconds
+        if speech:
+            if self.started and self._silence >= self.segment_gap:
+                self._answer_pauses.append(self._silence)
+            self._silence = 0.0
+            self._speech_run += seconds
+            if not self.started and self._speech_run >= self.min_speech:
+                self.started = True
+                self.speech_start = self.position - self._speech_run
+            if self.started:
+                self.speech_end = self.position
+            return None
+
+        self._speech_run = 0.0
+        if not self.started:
+            return None
+        before = self._silence
+        self._silence += seconds
+        if self._silence >= self.threshold:
+            return self.END
+        if before < self.segment_gap <= self._silence:
+            return self.SEGMENT
+        return None
+
+    def finish(self):
+        """Learns from the answer that just ended."""
+        self.pauses.extend(self._answer_pauses)
+        # Wall clock (perf_counter) time the last word ended, assuming audio is read in real time
+        self.ended_at = time.perf_counter() - (self.position - self.speech_end)
+
+
+def listen_vad(source, backend, endpointer, vad=None, on_partial=None, timeout=None,
+               phrase_time_limit=None, noise_floor=None, on_pause=None):
+    """
+    Like recognizers.listen_streaming, but endpoints with a VAD instead of
+    the recognizer's fixed pause_threshold. Closed speech segments are
+    handed to backend.end_segment() while the candidate keeps talking, and
+    on_pause(seconds) is called on every silent frame once speech started.
+
+    Audio is converted to 16 kHz mono as it is read and moves through two
+    small ring buffers, so nothing here grows with the length of the answer.
+    """
+    vad = vad or get_vad()
+    converter = PcmConverter(source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+    rate = converter.target_rate
+    frame_seconds = vad.frame_ms / 1000
+    frame_bytes = int(rate * frame_seconds) * 2
+    vad.reset(rate, 2, noise_floor)
+    backend.start(rate, 2)
+    endpointer.begin()
+    # Converted audio waits in `pending` until there is a whole frame, which is read into one reused buffer
+    pending = RingBuffer(frame_bytes + converter.max_output(source.CHUNK))
+    frame = memoryview(bytearray(frame_bytes))
+    # Keep a little audio from before speech was detected so the first word isn't clipped
+    pre_roll = RingBuffer(max(1, int(0.3 / frame_seconds)) * frame_bytes)
+
+    with span("mic.listen", backend=backend.name, vad=vad.name):
+        while True:
+            chunk = source.stream.read(source.CHUNK)
+            if not chunk:
+                # A file-backed or closed source has run dry: the answer ends here
+                # (backend.finish() raises sr.UnknownValueError if nothing was said)
+                if endpointer.started:
+                    endpointer.finish()
+                with span("stt.finish", backend=backend.name):
+                    return backend.finish()
+            pending.write(converter.convert(chunk))
+            while len(pending) >= frame_bytes:
+                pending.read_into(frame)
+                event = endpointer.update(vad.is_speech(frame), frame_seconds)
+                if not endpointer.started:
+                    pre_roll.write(frame)
+                    if timeout and endpointer.position > timeout:
+                        raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+                    continue
+
+                for piece in pre_roll.peek():
+                    backend.accept(piece)
+                pre_roll.clear()
+                partial = backend.accept(frame)
+                if partial and on_partial:
+                    on_partial(partial)
+                if on_pause and endpointer.position > endpointer.speech_end:
+                    on_pause(endpointer.position - endpointer.speech_end)
+                if event == Endpointer.SEGMENT:
+                    backend.end_segment()
+                if event == Endpointer.END or (
+                        phrase_time_limit and endpointer.position - endpointer.speech_start > phrase_time_limit):
+                    endpointer.finish()
+                    with span("stt.finish", backend=backend.name):
+                        return backend.finish()
@@ -0,0 +1,62 @@
+"""
+Lazily built resources that can be warmed up on a background thread.
+
+The apps create the TTS engine, microphone, speech backend and LLM client
+through Lazy so that importing them is cheap, and start() the slow ones
+while the welcome prompt is playing.
+"""
+import time
+import threading
+
+from tracing import span
+
+
+class Lazy:
+    """
+    Builds a value with `factory` on first get(), once, from any thread.
+
+    start() begins building on a daemon thread; a later get() waits for that
+    build instead of starting another one. If the factory raised, get()
+    raises the same error.
+    """
+
+    def __init__(self, factory, name=None):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "resource")
+        self.build_time = None
+        self._value = None
+        self._error = None
+        self._done = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._done
+
+    def start(self):
+        if not self._done:
+            threading.Thread(target=self._build_quietly, name=f"warmup-{self.name}", daemon=True).start()
+        return self
+
+    def _build_quietly(self):
+        try:
+            self.get()
+        except Exception:
+            # Kept in self._error and raised to whoever calls get()
+            pass
+
+    def get(self):
+        if not self._done:
+            with self._lock:
+                if not self._done:
+                    start = time.perf_counter()
+                    try:
+                        with span(f"warmup.{self.name}"):
+                            self._value = self.factory()
+                    except Exception as e:
+                        self._error = e
+                    self.build_time = time.perf_counter() - start
+                    self._done = True
+        if self._error is not None:
+            raise self._error
+        return self._value